@@ -0,0 +1,336 @@
+"""In-memory columnar copy of the sales facts for ad-hoc reports (/analytics).
+
+Optional, enabled with ANALYTICS_STORE=1. Every sale line is kept as one
+position in a set of NumPy arrays (sale, item, customer, seller, day,
+quantity, unit price, subtotal), and reports are computed with vectorized
+kernels (masks and bincount) without querying the OLTP database.
+
+The store loads in a background thread at startup. The sale write routes
+then call ``add_sales`` with the ids they created, which appends their
+lines, or ``sync_sales`` with the ids they updated or deleted, which
+reloads those sales' lines. Memory is about 40 bytes per line: 400 MB for 10M lines.
+"""
+import logging
+import os
+import threading
+from datetime import date
+
+import numpy as np
+from sqlalchemy import Date, cast, func, select
+
+from . import models
+from .database import ReadSessionLocal
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_STORE_ENABLED = os.getenv("ANALYTICS_STORE", "0") == "1"
+
+# Ids are stored as int32: enough for 2**31 - 1 rows per table
+COLUMNS = {
+    "sale_id": np.int32,
+    "item_id": np.int32,
+    "customer_id": np.int32,
+    "user_id": np.int32,  # -1 for sales without seller
+    "day": np.int32,  # days since 1970-01-01 (UTC)
+    "quantity": np.int32,
+    "unit_price": np.float64,
+    "subtotal": np.float64,
+}
+GROUP_BYS = {"none": None, "item": "item_id", "customer": "customer_id",
+             "seller": "user_id", "day": "day"}
+METRICS = ("lines", "quantity", "revenue", "sales")
+LOAD_CHUNK_SIZE = 100000
+
+
+def _day_number(value: date) -> int:
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def _facts_query(dialect: str):
+    if dialect == "sqlite":
+        # Texto 'YYYY-MM-DD', que NumPy convierte sin pasar por objetos date
+        day = func.date(models.Sale.created_at)
+    else:
+        day = cast(models.Sale.created_at, Date)
+    return (
+        select(
+            models.SaleItem.sale_id,
+            models.SaleItem.item_id,
+            models.Sale.customer_id,
+            func.coalesce(models.Sale.user_id, -1),
+            day,
+            models.SaleItem.quantity,
+            models.SaleItem.unit_price,
+            models.SaleItem.subtotal,
+        )
+        .join(models.Sale, models.Sale.id == models.SaleItem.sale_id)
+        # Las líneas de una venta quedan contiguas (ver aggregate)
+        .order_by(models.SaleItem.sale_id, models.SaleItem.id)
+    )
+
+
+def _rows_to_columns(rows):
+    values = list(zip(*rows))
+    columns = {}
+    for (name, dtype), column in zip(COLUMNS.items(), values):
+        if name == "day":
+            column = np.array(column, dtype="datetime64[D]").astype(np.int64)
+        columns[name] = np.asarray(column, dtype=dtype)
+    return columns
+
+
+class SalesFactStore:
+    """Sale lines as growable NumPy columns.
+
+    Appends write past the current length (growing the arrays by doubling)
+    and removals build new arrays, so a query can work on a snapshot taken
+    under the lock while writers carry on.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._lock = threading.Lock()
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._size = 0
+        # Última venta de la carga completa: las creadas después no están
+        self.loaded_through = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self._columns.values())
+
+    def append(self, columns: dict):
+        """Append lines given as a dict of equally long arrays."""
+        count = len(columns["sale_id"])
+        if not count:
+            return
+        with self._lock:
+            size = self._size
+            capacity = len(self._columns["sale_id"])
+            if size + count > capacity:
+                capacity = max(2 * capacity, size + count)
+                for name, column in self._columns.items():
+                    grown = np.empty(capacity, dtype=column.dtype)
+                    grown[:size] = column[:size]
+                    self._columns[name] = grown
+            for name, column in self._columns.items():
+                column[size:size + count] = columns[name]
+            self._size = size + count
+
+    def remove_sales(self, sale_ids):
+        """Drop every line of the given sales; O(lines in the store)."""
+        with self._lock:
+            sale = self._columns["sale_id"][:self._size]
+            keep = ~np.isin(sale, np.asarray(list(sale_ids), dtype=np.int32))
+            kept = int(keep.sum())
+            if kept == self._size:
+                return
+            self._columns = {name: column[:self._size][keep]
+                             for name, column in self._columns.items()}
+            self._size = kept
+
+    def load(self, db, sale_ids=None, chunk_size: int = LOAD_CHUNK_SIZE):
+        """Append the lines of ``sale_ids`` (all sales if None) read from ``db``."""
+        query = _facts_query(db.get_bind().dialect.name)
+        if sale_ids is not None:
+            query = query.where(models.SaleItem.sale_id.in_(sale_ids))
+        result = db.execute(query.execution_options(yield_per=chunk_size))
+        for rows in result.partitions():
+            self.append(_rows_to_columns(rows))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: column[:self._size] for name, column in self._columns.items()}
+
+    def aggregate(self, group_by: str = "none", start: date = None, end: date = None,
+                  order_by: str = "revenue", limit: int = None):
+        """
+        Lines, sales, quantity and revenue per group between two days
+        (inclusive).
+
+        Args:
+            group_by: "none", "item", "customer", "seller" or "day"
+            start: First day, or None
+            end: Last day, or None
+            order_by: Metric for the top-N: "lines", "quantity", "revenue"
+                or "sales"; ignored without ``limit``
+            limit: Return only the top ``limit`` groups
+
+        Returns:
+            List of dicts (key, lines, sales, quantity, revenue). ``key`` is
+            the id (a date for "day", None for "none"); ``sales`` is None
+            when grouping by item. Without ``limit`` the groups are ordered
+            by key.
+        """
+        if group_by not in GROUP_BYS:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BYS)}")
+        if order_by not in METRICS:
+            raise ValueError(f"order_by must be one of {', '.join(METRICS)}")
+        if group_by == "item" and order_by == "sales" and limit is not None:
+            raise ValueError("order_by sales is not available when grouping by item")
+        if limit is not None and limit < 1:
+            raise ValueError("limit must be positive")
+
+        key_column = GROUP_BYS[group_by]
+        snapshot = self.snapshot()
+        columns = {name: snapshot[name]
+                   for name in ("sale_id", "quantity", "subtotal", key_column) if name}
+        if start is not None or end is not None:
+            day = snapshot["day"]
+            mask = np.ones(len(day), dtype=bool)
+            if start is not None:
+                mask &= day >= _day_number(start)
+            if end is not None:
+                mask &= day <= _day_number(end)
+            columns = {name: column[mask] for name, column in columns.items()}
+
+        sales = None
+        if group_by != "item":
+            # Cada venta se cuenta una vez: en su primera línea
+            sale = columns["sale_id"]
+            starts = np.ones(len(sale), dtype=bool)
+            starts[1:] = sale[1:] != sale[:-1]
+
+        offset = 0
+        if key_column is None:
+            lines = np.array([len(columns["sale_id"])])
+            quantity = np.array([columns["quantity"].sum(dtype=np.int64)])
+            revenue = np.array([columns["subtotal"].sum()])
+            sales = np.array([np.count_nonzero(starts)])
+        else:
+            keys = columns[key_column].astype(np.int64)
+            if len(keys):
+                offset = int(keys.min())
+                keys -= offset
+            size = int(keys.max()) + 1 if len(keys) else 0
+            lines = np.bincount(keys, minlength=size)
+            quantity = np.bincount(keys, weights=columns["quantity"], minlength=size)
+            revenue = np.bincount(keys, weights=columns["subtotal"], minlength=size)
+            if group_by != "item":
+                sales = np.bincount(keys[starts], minlength=size)
+
+        groups = np.flatnonzero(lines)
+        if limit is not None:
+            values = {"lines": lines, "quantity": quantity,
+                      "revenue": revenue, "sales": sales}[order_by]
+            if len(groups) > limit:
+                groups = groups[np.argpartition(-values[groups], limit - 1)[:limit]]
+            # Mayor valor primero; a igual valor, menor clave
+            groups = groups[np.lexsort((groups, -values[groups]))]
+
+        points = []
+        for group in groups.tolist():
+            key = group + offset
+            if group_by == "none":
+                key = None
+            elif group_by == "day":
+                key = np.datetime64(key, "D").item()
+            elif group_by == "seller" and key == -1:
+                key = None
+            points.append({
+                "key": key,
+                "lines": int(lines[group]),
+                "sales": None if sales is None else int(sales[group]),
+                "quantity": int(quantity[group]),
+                "revenue": float(revenue[group]),
+            })
+        return points
+
+
+# Instancia global, creada por start() cuando está habilitada
+store = None
+_loaded = threading.Event()
+_pending_lock = threading.Lock()
+_pending = set()
+# Serializa las recargas: dos a la vez de la misma venta la duplicarían
+_apply_lock = threading.Lock()
+
+
+def is_ready() -> bool:
+    return store is not None and _loaded.is_set()
+
+
+def _apply(target, sale_ids, session_factory, created: bool = False):
+    with _apply_lock:
+        # Una venta nueva solo puede estar ya si la cargó la carga completa
+        if not created or min(sale_ids) <= target.loaded_through:
+            target.remove_sales(sale_ids)
+        with session_factory() as db:
+            target.load(db, sale_ids=list(sale_ids))
+
+
+def _load_all(target, session_factory):
+    global store
+    try:
+        with session_factory() as db:
+            target.load(db)
+        sale = target.snapshot()["sale_id"]
+        target.loaded_through = int(sale.max()) if len(sale) else 0
+        # Ventas cambiadas mientras se cargaba: se recargan para no
+        # perderlas ni duplicarlas
+        with _pending_lock:
+            if target is not store:
+                # start(reload=True) la reemplazó mientras cargaba
+                return
+            pending = set(_pending)
+            _pending.clear()
+            _loaded.set()
+        if pending:
+            _apply(target, pending, session_factory)
+        logger.info(f"Analytics store loaded: {len(target)} lines, "
+                    f"{target.nbytes / 2**20:.0f} MiB")
+    except Exception as e:
+        logger.error(f"Error loading the analytics store: {str(e)}")
+        with _pending_lock:
+            if target is store:
+                # Sin tienda las escrituras dejan de acumularse en _pending
+                # y start() puede volver a intentarlo
+                store = None
+                _pending.clear()
+
+
+def start(session_factory=ReadSessionLocal, reload: bool = False):
+    """
+    Create the store and load it in a background thread, if enabled.
+    ``reload`` replaces a loaded store, e.g. after the sample data reset
+    every table.
+    """
+    global store
+    if not ANALYTICS_STORE_ENABLED or (store is not None and not reload):
+        return
+    with _pending_lock:
+        _loaded.clear()
+        _pending.clear()
+        store = SalesFactStore()
+        target = store
+    threading.Thread(target=_load_all, args=(target, session_factory),
+                     name="analytics-load", daemon=True).start()
+
+
+def _sync(sale_ids, session_factory, created: bool):
+    if not sale_ids:
+        return
+    with _pending_lock:
+        target = store
+        if target is None:
+            return
+        if not _loaded.is_set():
+            _pending.update(sale_ids)
+            return
+    try:
+        _apply(target, set(sale_ids), session_factory, created=created)
+    except Exception as e:
+        # Un fallo aquí no debe afectar a la venta ya guardada
+        logger.error(f"Error updating the analytics store: {str(e)}")
+
+
+def add_sales(sale_ids, session_factory=ReadSessionLocal):
+    """Append the lines of newly created sales."""
+    _sync(sale_ids, session_factory, created=True)
+
+
+def sync_sales(sale_ids, session_factory=ReadSessionLocal):
+    """Reload the lines of sales that were updated or deleted."""
+    _sync(sale_ids, session_factory, created=False)
@@ -1,11 +1,12 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from . import crud, models, schemas
+from . import crud, models, passwords, schemas
+from .principal_cache import Principal, cache as principal_cache
 from .database import get_db
 
 # to get a string like this run:
@@ -14,16 +15,36 @@ SECRET_KEY = "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 480  # 8 hours
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+def _load_user(db: Session, username: str):
+    user = crud.get_user_by_username(db, username)
+    # Devolver la conexión al pool mientras se espera a bcrypt: en una
+    # ráfaga de logins, las conexiones retenidas agotarían el pool y el
+    # checkout bloquearía. El usuario queda cargado.
+    if user:
+        db.expunge(user)
+    db.rollback()
+    return user
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def authenticate_user(db: Session, username: str, password: str):
+    """
+    User with these credentials, or None. The query and the rehash commit
+    run in the threadpool and the bcrypt check in the password pool, so
+    nothing blocks the event loop; a hash with an outdated cost is
+    replaced.
+    """
+    user = await run_in_threadpool(_load_user, db, username)
+    if not user:
+        return None
+    valid, new_hash = await passwords.verify_password_async(password, user.hashed_password)
+    if not valid:
+        return None
+    if new_hash:
+        await run_in_threadpool(crud.set_password_hash, db, user.id, new_hash)
+    return user
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -39,7 +60,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-):
+) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -51,25 +72,31 @@ async def get_current_user(
         if username is None:
             raise credentials_exception
         token_data = schemas.TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
-    user = crud.get_user_by_username(db, username=token_data.username)
-    if user is None:
+        # Tokens emitidos antes de existir "ver" equivalen a la versión 0
+        token_version = int(payload.get("ver", 0))
+    except (JWTError, TypeError, ValueError):
         raise credentials_exception
-    return user
+    principal = principal_cache.get(db, token_data.username, token_version)
+    if principal is None:
+        user = crud.get_user_by_username(db, username=token_data.username)
+        if user is None or (user.token_version or 0) != token_version:
+            raise credentials_exception
+        principal = Principal.from_user(user)
+        principal_cache.put(principal)
+    return principal
 
 
 async def get_current_active_user(
-    current_user: models.User = Depends(get_current_user),
-):
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 
 async def get_current_admin_user(
-    current_user: models.User = Depends(get_current_active_user)
-) -> models.User:
+    current_user: Principal = Depends(get_current_active_user)
+) -> Principal:
     if not current_user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,179 @@
+"""Maintenance commands, run from the backend directory:
+
+    python -m app.cli bootstrap
+    python -m app.cli import-items catalog.csv --key sku
+    python -m app.cli rebuild-rollups
+    python -m app.cli verify-counters --fix
+    python -m app.cli reconcile-balances
+
+`bootstrap` migrates the schema and creates the default admin. The API does
+the same in its lifespan unless AUTO_MIGRATE=0; in production run it once
+per deploy and start the workers with AUTO_MIGRATE=0.
+"""
+import argparse
+import csv
+import json
+import sys
+
+from . import crud, importer, migrations, schemas
+from .database import SessionLocal, engine
+
+
+def migrate():
+    migrations.upgrade(engine)
+
+
+def create_default_admin():
+    db = SessionLocal()
+    try:
+        admin = crud.get_user_by_username(db, "admin")
+        if not admin:
+            crud.create_user(
+                db,
+                schemas.UserCreate(
+                    username="admin",
+                    password="admin",
+                    email="admin@example.com",
+                    is_admin=True
+                )
+            )
+    finally:
+        db.close()
+
+
+def bootstrap(args=None):
+    """Create or upgrade the schema and the default admin; idempotent."""
+    migrate()
+    create_default_admin()
+    return 0
+
+
+def _read_records(path: str, file_format: str):
+    if file_format == "auto":
+        file_format = "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            for index, record in enumerate(csv.DictReader(f)):
+                yield index, record, None
+            return
+        index = 0
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line), None
+            except ValueError as e:
+                yield index, None, f"Invalid JSON: {e}"
+            index += 1
+
+
+def import_items(args):
+    migrations.upgrade(engine)
+    item_import = importer.ItemImport(key=args.key, chunk_size=args.chunk_size)
+    db = SessionLocal()
+    try:
+        for index, record, error in _read_records(args.path, args.format):
+            chunk = item_import.add(index, record, error)
+            if chunk:
+                item_import.write(db, chunk)
+        item_import.write(db, item_import.take_chunk())
+    finally:
+        db.close()
+
+    result = item_import.result()
+    print(f"Inserted: {result['inserted']}, updated: {result['updated']}, "
+          f"rejected: {result['rejected']}")
+    for error in result["errors"]:
+        print(f"  row {error['index']}: {error['error']}", file=sys.stderr)
+    return 1 if result["rejected"] else 0
+
+
+def rebuild_rollups(args):
+    migrations.upgrade(engine)
+    with SessionLocal() as db:
+        days = crud.rebuild_sales_rollup(db)
+    print(f"daily_sales_rollup: {days} days")
+    return 0
+
+
+def verify_counters(args):
+    migrations.upgrade(engine)
+    with SessionLocal() as db:
+        drifted = crud.verify_item_sales_counters(db)
+        for row in drifted:
+            print(f"  item {row['id']} {row['name']!r}: units_sold {row['units_sold']} "
+                  f"(expected {row['expected_units_sold']}), revenue {row['revenue']:.2f} "
+                  f"(expected {row['expected_revenue']:.2f})")
+        print(f"Items with drifted sales counters: {len(drifted)}")
+        if drifted and args.fix:
+            crud.rebuild_item_sales_counters(db)
+            print("Counters rebuilt")
+            return 0
+    return 1 if drifted else 0
+
+
+def reconcile_balances(args):
+    migrations.upgrade(engine)
+    with SessionLocal() as db:
+        sales = crud.verify_sale_amounts_paid(db)
+        for row in sales:
+            print(f"  sale {row['id']}: amount_paid {row['amount_paid']:.2f} "
+                  f"(expected {row['expected_amount_paid']:.2f})")
+        print(f"Sales with drifted amount_paid: {len(sales)}")
+
+        customers = crud.verify_customer_balances(db)
+        for row in customers:
+            print(f"  customer {row['id']} {row['name']!r}: "
+                  f"charged {row['total_charged']:.2f} (expected {row['expected_total_charged']:.2f}), "
+                  f"paid {row['total_paid']:.2f} (expected {row['expected_total_paid']:.2f}), "
+                  f"balance {row['balance']:.2f} (expected {row['expected_balance']:.2f})")
+        print(f"Customers with drifted balances: {len(customers)}")
+
+        if not (sales or customers):
+            return 0
+        if args.fix:
+            crud.rebuild_sale_amounts_paid(db)
+            crud.rebuild_customer_balances(db)
+            print("Balances rebuilt")
+            return 0
+    return 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_bootstrap = commands.add_parser(
+        "bootstrap", help="Migrate the schema and create the default admin")
+    parser_bootstrap.set_defaults(handler=bootstrap)
+
+    parser_import = commands.add_parser(
+        "import-items", help="Insert or update catalog items from a CSV or NDJSON file")
+    parser_import.add_argument("path")
+    parser_import.add_argument("--key", choices=importer.IMPORT_KEYS, default="name")
+    parser_import.add_argument("--chunk-size", type=int, default=1000)
+    parser_import.add_argument("--format", choices=("auto", "csv", "ndjson"), default="auto")
+    parser_import.set_defaults(handler=import_items)
+
+    parser_rollups = commands.add_parser(
+        "rebuild-rollups", help="Recompute the summary tables from the sales")
+    parser_rollups.set_defaults(handler=rebuild_rollups)
+
+    parser_verify = commands.add_parser(
+        "verify-counters", help="Check the running sales counters against sale_items")
+    parser_verify.add_argument("--fix", action="store_true",
+                               help="Rebuild the counters if any drifted")
+    parser_verify.set_defaults(handler=verify_counters)
+
+    parser_reconcile = commands.add_parser(
+        "reconcile-balances", help="Check sale and customer balances against the payments")
+    parser_reconcile.add_argument("--fix", action="store_true",
+                                  help="Rebuild the balances if any drifted")
+    parser_reconcile.set_defaults(handler=reconcile_balances)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Conditional GET (ETag / Last-Modified) for list and stats endpoints.
+
+The CRUD write paths bump the table_versions row of every table they
+change, in the same transaction. A route that declares the tables its
+response is built from gets a weak ETag derived from those versions,
+the path and the query string, and answers ``304 Not Modified`` when
+the client already has it, before the handler touches the ORM.
+
+Usage, after the current_user dependency so that 304 stays
+authenticated::
+
+    _etag: None = Depends(conditional.etag("items"))
+
+The versions are read before the handler runs its queries: a write that
+lands in between only makes the ETag older than the data, which costs
+the client one extra download, never a stale 304. The dependency returns
+those versions, so a route that caches its result (stats_cache) can tie
+the cached value to them::
+
+    versions: tuple = Depends(conditional.etag("customers"))
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+
+from . import crud
+from .database import get_db
+
+# El navegador guarda la respuesta pero la revalida en cada uso
+CACHE_CONTROL = "private, no-cache"
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Comparación débil: W/"x" y "x" son la misma etiqueta
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def etag(*tables: str, db_dependency=get_db, daily: bool = False):
+    """
+    Dependency that sets ETag and Last-Modified, or raises 304.
+
+    Returns ``((table, version), ...)`` in table order.
+
+    Args:
+        tables: Tables the response is built from
+        db_dependency: Session dependency of the route (get_db or
+            get_read_db), so versions and data come from the same database
+        daily: The response also depends on the current (UTC) date, e.g.
+            "the last 30 days"
+    """
+    def check(request: Request, response: Response, db: Session = Depends(db_dependency)):
+        versions = crud.get_table_versions(db, tables)
+        numbers = tuple((table, versions.get(table, (0, None))[0]) for table in sorted(tables))
+        parts = [request.url.path, *map(str, sorted(request.query_params.multi_items()))]
+        parts += [f"{table}:{version}" for table, version in numbers]
+        if daily:
+            parts.append(datetime.now(timezone.utc).date().isoformat())
+        digest = hashlib.sha1("\n".join(parts).encode()).hexdigest()[:20]
+        headers = {"ETag": f'W/"{digest}"', "Cache-Control": CACHE_CONTROL}
+
+        # Sin fecha si alguna tabla nunca se escribió desde que hay versiones
+        updated = [updated_at for _, updated_at in versions.values() if updated_at]
+        last_modified = None
+        if not daily and len(updated) == len(tables):
+            last_modified = max(
+                value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+                for value in updated)
+            headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+        if_none_match = request.headers.get("if-none-match")
+        if_modified_since = request.headers.get("if-modified-since")
+        # If-None-Match manda sobre If-Modified-Since (RFC 9110)
+        if if_none_match is not None:
+            not_modified = _matches(if_none_match, headers["ETag"])
+        else:
+            not_modified = bool(last_modified and if_modified_since
+                                and _not_modified_since(if_modified_since, last_modified))
+        if not_modified:
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return numbers
+
+    return check
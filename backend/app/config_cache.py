@@ -0,0 +1,79 @@
+"""In-process cache of the configurations table.
+
+Every key is loaded at once and served from memory, converted to its type
+(CONFIG_TYPES). crud.create_or_update_configuration bumps the
+"configurations" row of table_versions in the same transaction and drops
+this process' copy. Other processes check that version at most once every
+CONFIG_POLL_SECONDS and reload when it changed, so they see a change
+within that delay.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import select
+
+from . import models
+
+CONFIG_POLL_SECONDS = float(os.getenv("CONFIG_POLL_SECONDS", "5"))
+CONFIG_TABLE = models.Configuration.__tablename__
+# Tipo de cada clave conocida; las demás se devuelven como texto
+CONFIG_TYPES = {
+    "low_stock_threshold": int,
+}
+
+
+def _read_version(db) -> int:
+    return db.scalar(
+        select(models.TableVersion.version)
+        .where(models.TableVersion.table_name == CONFIG_TABLE)
+    ) or 0
+
+
+class ConfigCache:
+    def __init__(self, poll_seconds: float = CONFIG_POLL_SECONDS):
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._values = {}
+        self._version = None
+        self._checked_at = 0.0
+
+    def _load(self, db, version: int):
+        rows = db.execute(select(models.Configuration.key, models.Configuration.value)).all()
+        values = {}
+        for key, value in rows:
+            convert = CONFIG_TYPES.get(key, str)
+            try:
+                values[key] = convert(value)
+            except (TypeError, ValueError):
+                # Un valor mal guardado no debe romper las demás claves
+                continue
+        self._values = values
+        self._version = version
+
+    def _refresh(self, db):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.poll_seconds:
+            return
+        with self._lock:
+            if self._version is not None and now - self._checked_at < self.poll_seconds:
+                return
+            # La versión se lee antes que los valores: si cambian entre
+            # medio, la próxima comprobación vuelve a cargar
+            version = _read_version(db)
+            if version != self._version:
+                self._load(db, version)
+            self._checked_at = now
+
+    def get(self, db, key: str, default=None):
+        """Typed value of ``key``, or ``default`` if it isn't set."""
+        self._refresh(db)
+        return self._values.get(key, default)
+
+    def invalidate(self):
+        """Reload on the next read, e.g. after this process wrote a value."""
+        with self._lock:
+            self._version = None
+
+
+cache = ConfigCache()
@@ -1,8 +1,9 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, or_
-from . import models, schemas, auth
-from .auth import get_password_hash
-from datetime import datetime
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import (Float, String, and_, bindparam, case, delete, event, func, insert,
+                        literal, null, or_, select, tuple_, type_coerce, union_all, update)
+from . import models, schemas, config_cache, passwords, principal_cache
+from .pagination import decode_cursor, encode_cursor, paginate
+from datetime import date, datetime, time, timedelta, timezone
 from typing import List, Optional
 
 
@@ -23,7 +24,7 @@ def get_users(db: Session, skip: int = 0, limit: int = 100):
 
 
 def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = get_password_hash(user.password)
+    hashed_password = passwords.hash_password(user.password)
     db_user = models.User(
         username=user.username,
         email=user.email if user.email else None,
@@ -32,18 +33,17 @@ def create_user(db: Session, user: schemas.UserCreate):
         is_admin=user.is_admin
     )
     db.add(db_user)
+    bump_table_versions(db, models.User.__tablename__)
     db.commit()
     db.refresh(db_user)
     return db_user
 
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user_by_username(db, username)
-    if not user:
-        return False
-    if not auth.verify_password(password, user.hashed_password):
-        return False
-    return user
+def set_password_hash(db: Session, user_id: int, hashed_password: str):
+    """Store a rehash of the same password (cost policy changed)."""
+    db.execute(update(models.User).where(models.User.id == user_id)
+               .values(hashed_password=hashed_password))
+    db.commit()
 
 
 def get_stock(db: Session, stock_id: int):
@@ -88,7 +88,9 @@ def delete_user(db: Session, user_id: int):
     db_user = get_user(db, user_id)
     if db_user:
         db.delete(db_user)
+        bump_table_versions(db, models.User.__tablename__)
         db.commit()
+        principal_cache.cache.invalidate(db_user.username)
         return db_user
     return None
 
@@ -102,7 +104,7 @@ def get_customer_by_email(db: Session, email: str):
     return db.query(models.Customer).filter(models.Customer.email == email).first()
 
 
-def get_customers(db: Session, skip: int = 0, limit: int = 100, search: str = None):
+def _customers_query(db: Session, search: str = None):
     query = db.query(models.Customer)
 
     if search:
@@ -114,13 +116,26 @@ def get_customers(db: Session, skip: int = 0, limit: int = 100, search: str = No
                 models.Customer.phone.ilike(search)
             )
         )
+    return query
+
+
+def get_customers(db: Session, skip: int = 0, limit: int = 100, search: str = None):
+    return _customers_query(db, search).order_by(
+        models.Customer.name, models.Customer.id
+    ).offset(skip).limit(limit).all()
 
-    return query.offset(skip).limit(limit).all()
+
+def get_customers_page(db: Session, limit: int = 100, cursor: str = None, search: str = None):
+    return paginate(
+        _customers_query(db, search),
+        [models.Customer.name, models.Customer.id],
+        cursor=cursor, limit=limit)
 
 
 def create_customer(db: Session, customer: schemas.CustomerCreate):
     db_customer = models.Customer(**customer.model_dump())
     db.add(db_customer)
+    bump_table_versions(db, models.Customer.__tablename__)
     db.commit()
     db.refresh(db_customer)
     return db_customer
@@ -131,6 +146,7 @@ def update_customer(db: Session, customer_id: int, customer: schemas.CustomerCre
     if db_customer:
         for key, value in customer.model_dump().items():
             setattr(db_customer, key, value)
+        bump_table_versions(db, models.Customer.__tablename__)
         db.commit()
         db.refresh(db_customer)
     return db_customer
@@ -140,6 +156,7 @@ def delete_customer(db: Session, customer_id: int):
     db_customer = get_customer(db, customer_id)
     if db_customer:
         db.delete(db_customer)
+        bump_table_versions(db, models.Customer.__tablename__)
         db.commit()
     return db_customer
 
@@ -149,141 +166,271 @@ def get_item(db: Session, item_id: int):
     return db.query(models.Item).filter(models.Item.id == item_id).first()
 
 
-def get_items(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Item).offset(skip).limit(limit).all()
+def _items_query(db: Session, search: str = None):
+    query = db.query(models.Item)
+
+    if search:
+        search_term = f"%{search}%"
+        query = query.filter(
+            or_(
+                models.Item.name.ilike(search_term),
+                models.Item.description.ilike(search_term)
+            )
+        )
+    return query
+
+
+def _items_sort_column(sort_by: str = None):
+    # Solo columnas reales; por defecto se ordena por nombre
+    if sort_by and sort_by in models.Item.__table__.columns:
+        return getattr(models.Item, sort_by)
+    return models.Item.name
+
+
+def get_items(db: Session, skip: int = 0, limit: int = 100, search: str = None,
+              sort_by: str = None, sort_order: str = "asc"):
+    column = _items_sort_column(sort_by)
+    if sort_order == "desc":
+        order = (column.desc(), models.Item.id.desc())
+    else:
+        order = (column.asc(), models.Item.id.asc())
+    return _items_query(db, search).order_by(*order).offset(skip).limit(limit).all()
+
+
+def get_items_page(db: Session, limit: int = 100, cursor: str = None, search: str = None,
+                   sort_by: str = None, sort_order: str = "asc"):
+    return paginate(
+        _items_query(db, search),
+        [_items_sort_column(sort_by), models.Item.id],
+        cursor=cursor, limit=limit, descending=sort_order == "desc")
 
 
 def create_item(db: Session, item: schemas.ItemCreate):
     db_item = models.Item(**item.model_dump())
     db.add(db_item)
+    bump_table_versions(db, models.Item.__tablename__)
     db.commit()
     db.refresh(db_item)
     return db_item
 
 
+def get_item_by_sku(db: Session, sku: str):
+    return db.query(models.Item).filter(models.Item.sku == sku).first()
+
+
 def update_item(db: Session, item_id: int, item: schemas.ItemCreate):
     db_item = get_item(db, item_id)
     if db_item:
-        for key, value in item.model_dump().items():
+        item_data = item.model_dump()
+        # Clientes que no conocen el SKU no lo borran al editar
+        if "sku" not in item.model_fields_set:
+            item_data.pop("sku")
+        for key, value in item_data.items():
             setattr(db_item, key, value)
+        bump_table_versions(db, models.Item.__tablename__)
         db.commit()
         db.refresh(db_item)
     return db_item
 
 
+def _dialect_insert(db: Session, model):
+    """INSERT construct of the session's dialect, for upserts."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+    else:
+        # create_db_engine solo acepta SQLite, PostgreSQL y MySQL
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(model)
+
+
+def _on_conflict_update(statement, index_elements, set_):
+    """
+    Turn a ``_dialect_insert`` statement into an upsert.
+
+    Args:
+        statement: INSERT from ``_dialect_insert``, with its values or SELECT
+        index_elements: Unique columns of the conflict (MySQL uses any
+            unique key of the table)
+        set_: Function of the proposed row (``excluded``) returning the
+            columns to update
+
+    Returns:
+        INSERT ... ON CONFLICT DO UPDATE, or ON DUPLICATE KEY UPDATE on MySQL
+    """
+    if hasattr(statement, "on_duplicate_key_update"):
+        return statement.on_duplicate_key_update(set_(statement.inserted))
+    return statement.on_conflict_do_update(
+        index_elements=index_elements, set_=set_(statement.excluded))
+
+
+def upsert_items(db: Session, items: List[schemas.ItemCreate], key: str = "name"):
+    """
+    Insert or update a chunk of catalog items in one transaction.
+
+    With key="sku" this is a single INSERT ... ON CONFLICT (sku) DO UPDATE.
+    Item names aren't unique, so with key="name" existing names are
+    updated with one executemany UPDATE (every item with that name) and
+    the rest inserted with one executemany INSERT.
+
+    Returns:
+        Dict with inserted and updated counts
+    """
+    # Si una clave se repite en el lote, gana la última fila
+    rows = {getattr(item, key): item.model_dump() for item in items}
+    column = getattr(models.Item, key)
+    existing = set(db.scalars(select(column).where(column.in_(rows))))
+
+    try:
+        if key == "sku":
+            db.execute(
+                _on_conflict_update(
+                    _dialect_insert(db, models.Item),
+                    [models.Item.sku],
+                    lambda excluded: {
+                        "name": excluded.name,
+                        "description": excluded.description,
+                        "price": excluded.price,
+                        "stock": excluded.stock,
+                        "updated_at": func.now(),
+                    },
+                ),
+                list(rows.values()),
+            )
+        else:
+            updates = [row for name, row in rows.items() if name in existing]
+            inserts = [row for name, row in rows.items() if name not in existing]
+            if updates:
+                items_table = models.Item.__table__
+                db.execute(
+                    update(items_table)
+                    .where(items_table.c.name == bindparam("b_name"))
+                    .values(sku=func.coalesce(bindparam("b_sku"), items_table.c.sku),
+                            description=bindparam("b_description"),
+                            price=bindparam("b_price"),
+                            stock=bindparam("b_stock")),
+                    [{f"b_{field}": value for field, value in row.items()}
+                     for row in updates],
+                )
+            if inserts:
+                db.execute(insert(models.Item), inserts)
+        bump_table_versions(db, models.Item.__tablename__)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return {"inserted": len(rows) - len(existing), "updated": len(existing)}
+
+
 def delete_item(db: Session, item_id: int):
     db_item = get_item(db, item_id)
     if db_item:
         db.delete(db_item)
+        bump_table_versions(db, models.Item.__tablename__)
         db.commit()
     return db_item
 
 
 # Sale CRUD operations
 def get_sale(db: Session, sale_id: int):
-    sale = db.query(models.Sale).options(
+    return db.query(models.Sale).options(
         joinedload(models.Sale.customer),
         joinedload(models.Sale.user),
         joinedload(models.Sale.items).joinedload(models.SaleItem.item),
         joinedload(models.Sale.payments)
     ).filter(models.Sale.id == sale_id).first()
 
-    if sale:
-        print(f"\nSale details for ID {sale_id}:")
-        print(
-            f"Customer: {sale.customer.name if sale.customer else 'No customer'}")
-        print(f"User: {sale.user.username if sale.user else 'No user'}")
-        print(f"Items count: {len(sale.items)}")
-        print(f"Total amount: {sale.total_amount}")
-        print(f"Created at: {sale.created_at}")
-        print(f"Paid status: {sale.paid}")
-        print(f"Payments count: {len(sale.payments)}")
-        if sale.payments:
-            print("Payments details:")
-            for payment in sale.payments:
-                print(f"  - Payment ID: {payment.id}")
-                print(f"    Amount: {payment.amount}")
-                print(f"    Date: {payment.payment_date}")
-                print(f"    Description: {payment.description}")
-                print(f"    Sale ID: {payment.sale_id}")
-                print(f"    Customer ID: {payment.customer_id}")
-
-    return sale
+
+def _sale_load_options():
+    # selectinload runs one extra query per relationship instead of joining
+    # all of them, which multiplies rows (items x payments) per sale
+    return (
+        selectinload(models.Sale.customer),
+        selectinload(models.Sale.user),
+        selectinload(models.Sale.items).selectinload(models.SaleItem.item),
+        selectinload(models.Sale.payments),
+    )
+
+
+def _drop_invalid_items(sales):
+    # Filtrar items inválidos (productos eliminados)
+    for sale in sales:
+        valid_items = [item for item in sale.items if item.item is not None]
+        if len(valid_items) != len(sale.items):
+            sale.items = valid_items
+    return sales
 
 
 def get_sales(db: Session, skip: int = 0, limit: int = 100):
-    try:
-        # Verificar el total de ventas en la base de datos
-        total_sales = db.query(models.Sale).count()
-        print(f"\nTotal sales in database: {total_sales}")
+    sales = (
+        db.query(models.Sale)
+        .options(*_sale_load_options())
+        .order_by(models.Sale.created_at.desc(), models.Sale.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    return _drop_invalid_items(sales)
 
-        if total_sales == 0:
-            print("No sales found in database")
-            return []
 
-        # Obtener las ventas con todas las relaciones necesarias
-        query = (
-            db.query(models.Sale)
-            .options(
-                joinedload(models.Sale.customer),
-                joinedload(models.Sale.user),
-                joinedload(models.Sale.items).joinedload(models.SaleItem.item),
-                joinedload(models.Sale.payments)
-            )
-            .order_by(models.Sale.created_at.desc())
-            .offset(skip)
-            .limit(limit)
+def get_sales_page(db: Session, limit: int = 100, cursor: str = None):
+    """
+    Keyset paginated version of get_sales, newest first.
+
+    Returns:
+        Tuple of (sales, next_cursor)
+    """
+    query = db.query(models.Sale).options(*_sale_load_options())
+    sales, next_cursor = paginate(
+        query, [models.Sale.created_at, models.Sale.id],
+        cursor=cursor, limit=limit, descending=True)
+    return _drop_invalid_items(sales), next_cursor
+
+
+def _sales_summary_query(db: Session):
+    line_count = (
+        select(func.count(models.SaleItem.id))
+        .where(models.SaleItem.sale_id == models.Sale.id)
+        .scalar_subquery()
+    )
+    return (
+        db.query(
+            models.Sale.id,
+            models.Sale.created_at,
+            models.Sale.customer_id,
+            models.Customer.name.label("customer_name"),
+            models.User.username.label("seller_username"),
+            models.Sale.total_amount,
+            models.Sale.paid,
+            line_count.label("line_count"),
+            models.Sale.amount_paid,
         )
+        .outerjoin(models.Customer, models.Customer.id == models.Sale.customer_id)
+        .outerjoin(models.User, models.User.id == models.Sale.user_id)
+    )
 
-        # Imprimir la consulta SQL
-        print(
-            f"\nSQL Query: {query.statement.compile(compile_kwargs={'literal_binds': True})}")
-
-        # Ejecutar la consulta
-        sales = query.all()
-        print(f"\nRetrieved {len(sales)} sales from database")
-
-        # Procesar cada venta
-        valid_sales = []
-        for sale in sales:
-            print(f"\nProcessing sale ID: {sale.id}")
-            print(
-                f"Customer: {sale.customer.name if sale.customer else 'No customer'}")
-            print(f"User: {sale.user.username if sale.user else 'No user'}")
-            print(f"Items count: {len(sale.items)}")
-            print(f"Total amount: {sale.total_amount}")
-            print(f"Created at: {sale.created_at}")
-            print(f"Paid status: {sale.paid}")
-            print(f"Payments count: {len(sale.payments)}")
-            if sale.payments:
-                print("Payments details:")
-                for payment in sale.payments:
-                    print(f"  - Payment ID: {payment.id}")
-                    print(f"    Amount: {payment.amount}")
-                    print(f"    Date: {payment.payment_date}")
-                    print(f"    Description: {payment.description}")
-                    print(f"    Sale ID: {payment.sale_id}")
-                    print(f"    Customer ID: {payment.customer_id}")
-
-            # Filtrar items inválidos
-            valid_items = [
-                item for item in sale.items if item.item is not None]
-            if len(valid_items) != len(sale.items):
-                print(
-                    f"Filtered out {len(sale.items) - len(valid_items)} invalid items")
-                sale.items = valid_items
-
-            valid_sales.append(sale)
-            print(f"Added sale {sale.id} to valid sales")
-
-        print(f"\nReturning {len(valid_sales)} valid sales")
-        return valid_sales
 
-    except Exception as e:
-        print(f"Error in get_sales: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
-        return []
+def get_sales_summary(db: Session, skip: int = 0, limit: int = 100):
+    """
+    Flat rows for sales list views, without loading ORM entities.
+    """
+    rows = (
+        _sales_summary_query(db)
+        .order_by(models.Sale.created_at.desc(), models.Sale.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    return [dict(row._mapping) for row in rows]
+
+
+def get_sales_summary_page(db: Session, limit: int = 100, cursor: str = None):
+    return paginate(
+        _sales_summary_query(db), [models.Sale.created_at, models.Sale.id],
+        cursor=cursor, limit=limit, descending=True)
 
 
 def get_pending_sales_by_customer(db: Session, customer_id: int, skip: int = 0, limit: int = 100):
@@ -302,12 +449,7 @@ def get_pending_sales_by_customer(db: Session, customer_id: int, skip: int = 0,
     try:
         query = (
             db.query(models.Sale)
-            .options(
-                joinedload(models.Sale.customer),
-                joinedload(models.Sale.user),
-                joinedload(models.Sale.items).joinedload(models.SaleItem.item),
-                joinedload(models.Sale.payments)
-            )
+            .options(*_sale_load_options())
             .filter(
                 models.Sale.customer_id == customer_id,
                 models.Sale.paid == False
@@ -317,18 +459,7 @@ def get_pending_sales_by_customer(db: Session, customer_id: int, skip: int = 0,
             .limit(limit)
         )
 
-        sales = query.all()
-
-        # Process each sale to ensure valid items
-        valid_sales = []
-        for sale in sales:
-            valid_items = [
-                item for item in sale.items if item.item is not None]
-            if len(valid_items) != len(sale.items):
-                sale.items = valid_items
-            valid_sales.append(sale)
-
-        return valid_sales
+        return _drop_invalid_items(query.all())
 
     except Exception as e:
         print(f"Error in get_pending_sales_by_customer: {str(e)}")
@@ -337,8 +468,179 @@ def get_pending_sales_by_customer(db: Session, customer_id: int, skip: int = 0,
         return []
 
 
+class ItemNotFoundError(ValueError):
+    pass
+
+
+class InsufficientStockError(ValueError):
+    pass
+
+
+def get_items_by_ids(db: Session, item_ids):
+    """Load several items with one IN query, keyed by id."""
+    items = db.query(models.Item).filter(models.Item.id.in_(set(item_ids))).all()
+    return {item.id: item for item in items}
+
+
+def _quantities_by_item(lines):
+    # Un mismo producto puede aparecer en varias líneas
+    quantities = {}
+    for line in lines:
+        quantities[line.item_id] = quantities.get(line.item_id, 0) + line.quantity
+    return quantities
+
+
+def _amounts_by_item(lines):
+    amounts = {}
+    for line in lines:
+        amounts[line.item_id] = amounts.get(line.item_id, 0) + line.quantity * line.unit_price
+    return amounts
+
+
+_items = models.Item.__table__
+
+# Conditional decrement shared by every checkout line. The same UPDATE
+# adds the line to the item's running sales counters (see top products).
+_take_stock_statement = (
+    update(_items)
+    .where(_items.c.id == bindparam("b_item_id"),
+           _items.c.stock >= bindparam("b_quantity"))
+    .values(stock=_items.c.stock - bindparam("b_quantity"),
+            units_sold=_items.c.units_sold + bindparam("b_quantity"),
+            revenue=_items.c.revenue + bindparam("b_revenue"))
+)
+
+
+def _take_stock_batches(db, quantities, amounts) -> list:
+    """
+    Parameters for _take_stock_statement, one entry per execute.
+
+    The whole list goes in one executemany when the driver reports the
+    matched rows of an executemany (supports_sane_multi_rowcount); asyncpg
+    and some other drivers don't, and then each item is its own execute.
+    The sum of the rowcounts is what _check_stock_taken expects.
+    """
+    params = [{"b_item_id": item_id, "b_quantity": quantity, "b_revenue": amounts[item_id]}
+              for item_id, quantity in quantities.items()]
+    if db.get_bind().dialect.supports_sane_multi_rowcount:
+        return [params]
+    return params
+
+
+def _check_stock_taken(updated: int, quantities, items):
+    """Raise InsufficientStockError unless every conditional UPDATE matched."""
+    if updated == len(quantities):
+        return
+    short = next(
+        (items[item_id] for item_id, quantity in quantities.items()
+         if items[item_id].stock < quantity),
+        items[next(iter(quantities))])
+    raise InsufficientStockError(
+        f"Stock insuficiente para el producto {short.name}")
+
+
+def _take_stock(db: Session, quantities, amounts, items):
+    """
+    Decrement stock with a conditional UPDATE per item (WHERE stock >= qty),
+    sent as a single executemany, so two concurrent checkouts can't both
+    sell the last units.
+    """
+    updated = sum(db.execute(_take_stock_statement, batch).rowcount
+                  for batch in _take_stock_batches(db, quantities, amounts))
+    _check_stock_taken(updated, quantities, items)
+
+
+_customers = models.Customer.__table__
+
+# Adds to a customer's account totals, see models.Customer
+_customer_balance_statement = (
+    update(_customers)
+    .where(_customers.c.id == bindparam("b_customer_id"))
+    .values(total_charged=_customers.c.total_charged + bindparam("b_charged"),
+            total_paid=_customers.c.total_paid + bindparam("b_paid"),
+            balance=_customers.c.balance + bindparam("b_balance"),
+            # Una venta o un pago no es una edición de los datos del cliente
+            updated_at=_customers.c.updated_at)
+)
+
+
+def _customer_balance_params(customer_id: int, charged: float = 0, paid: float = 0,
+                             balance: float = 0):
+    return {"b_customer_id": customer_id, "b_charged": charged,
+            "b_paid": paid, "b_balance": balance}
+
+
+def _adjust_customer_balances(db: Session, params):
+    if params:
+        db.execute(_customer_balance_statement, params)
+
+
+def _sale_balance(total_amount: float, paid: bool, paid_on_sale: float = 0):
+    # Lo que una venta suma al saldo del cliente
+    return 0 if paid else total_amount - paid_on_sale
+
+
+_sales = models.Sale.__table__
+
+# What a payment on a sale takes off the customer's balance, from the sale
+# as it was before the payment: nothing if it was already paid, otherwise
+# the payment, at most what was left to pay
+_sale_payment_balance = (
+    select(case(
+        (_sales.c.paid == True, 0),
+        (_sales.c.total_amount - _sales.c.amount_paid < bindparam("b_amount"),
+         _sales.c.total_amount - _sales.c.amount_paid),
+        else_=bindparam("b_amount"),
+    ))
+    .where(_sales.c.id == bindparam("b_sale_id"),
+           _sales.c.customer_id == bindparam("b_customer_id"))
+    .scalar_subquery()
+)
+
+_customer_sale_payment_statement = (
+    update(_customers)
+    .where(_customers.c.id == bindparam("b_customer_id"))
+    .values(total_paid=_customers.c.total_paid + bindparam("b_amount"),
+            balance=_customers.c.balance - func.coalesce(_sale_payment_balance, 0),
+            updated_at=_customers.c.updated_at)
+)
+
+# Conditional update: the sale is marked as paid by the payment completing it
+_sale_payment_statement = (
+    update(_sales)
+    .where(_sales.c.id == bindparam("b_sale_id"),
+           _sales.c.customer_id == bindparam("b_customer_id"))
+    .values(amount_paid=_sales.c.amount_paid + bindparam("b_amount"),
+            paid=case(
+                (_sales.c.amount_paid + bindparam("b_amount") >= _sales.c.total_amount, True),
+                else_=_sales.c.paid))
+)
+
+
+def _payment_statements(payment: schemas.PaymentCreate):
+    """
+    ``(statement, params)`` pairs that apply a payment to the customer and
+    sale totals: two UPDATEs, whatever the payment history of the sale.
+    The customer's balance is updated first, so its subquery sees the
+    sale before the payment.
+    """
+    if not payment.sale_id:
+        return [(_customer_balance_statement, _customer_balance_params(
+            payment.customer_id, paid=payment.amount, balance=-payment.amount))]
+    params = {"b_customer_id": payment.customer_id, "b_sale_id": payment.sale_id,
+              "b_amount": payment.amount}
+    return [(_customer_sale_payment_statement, params), (_sale_payment_statement, params)]
+
+
 def create_sale(db: Session, sale: schemas.SaleCreate, user_id: int = None):
     try:
+        quantities = _quantities_by_item(sale.items)
+        items = get_items_by_ids(db, quantities)
+        for item_id in quantities:
+            if item_id not in items:
+                raise ItemNotFoundError(
+                    f"Producto con ID {item_id} no encontrado")
+
         # Create the sale
         db_sale = models.Sale(
             customer_id=sale.customer_id,
@@ -350,25 +652,23 @@ def create_sale(db: Session, sale: schemas.SaleCreate, user_id: int = None):
         db.flush()  # Get the sale ID without committing
 
         # Create sale items and update stock in a single transaction
-        for item in sale.items:
-            db_item = get_item(db, item.item_id)
-            if not db_item:
-                raise ValueError(
-                    f"Producto con ID {item.item_id} no encontrado")
-
-            # Create sale item
-            db_sale_item = models.SaleItem(
-                sale_id=db_sale.id,
-                item_id=item.item_id,
-                quantity=item.quantity,
-                unit_price=item.unit_price,
-                subtotal=item.quantity * item.unit_price)
-            db.add(db_sale_item)
-
-            # Update item stock
-            db_item.stock -= item.quantity
-            db.add(db_item)
-
+        db.execute(insert(models.SaleItem), [
+            {
+                "sale_id": db_sale.id,
+                "item_id": item.item_id,
+                "quantity": item.quantity,
+                "unit_price": item.unit_price,
+                "subtotal": item.quantity * item.unit_price,
+            }
+            for item in sale.items
+        ])
+        _take_stock(db, quantities, _amounts_by_item(sale.items), items)
+        _add_to_sales_rollup(db, [db_sale.id])
+        _adjust_customer_balances(db, [_customer_balance_params(
+            sale.customer_id, charged=sale.total_amount,
+            balance=_sale_balance(sale.total_amount, sale.paid))])
+
+        bump_table_versions(db, *SALE_TABLES)
         db.commit()
         db.refresh(db_sale)
         return db_sale
@@ -377,19 +677,133 @@ def create_sale(db: Session, sale: schemas.SaleCreate, user_id: int = None):
         raise e
 
 
+def create_sales_bulk(db: Session, sales, user_id: int = None):
+    """
+    Insert a chunk of sales in one transaction.
+
+    Stock is validated for the whole chunk in memory, then sales and sale
+    items are inserted with executemany and stock is taken with the same
+    conditional UPDATE as create_sale.
+
+    Args:
+        db: Database session
+        sales: List of (index, schemas.SaleCreate) pairs
+        user_id: Seller recorded on every sale
+
+    Returns:
+        List of per-record result dicts (index, status, sale_id, error)
+    """
+    item_ids = {line.item_id for _, sale in sales for line in sale.items}
+    customer_ids = {sale.customer_id for _, sale in sales}
+    items = get_items_by_ids(db, item_ids)
+    existing_customers = set(db.scalars(
+        select(models.Customer.id).where(models.Customer.id.in_(customer_ids))))
+
+    # Stock left after the records accepted so far in this chunk
+    remaining = {item_id: item.stock for item_id, item in items.items()}
+    results = []
+    accepted = []
+    for index, sale in sales:
+        quantities = _quantities_by_item(sale.items)
+        error = None
+        if sale.customer_id not in existing_customers:
+            error = "Cliente no encontrado"
+        else:
+            for item_id, quantity in quantities.items():
+                if item_id not in items:
+                    error = f"Producto con ID {item_id} no encontrado"
+                    break
+                if remaining[item_id] < quantity:
+                    error = f"Stock insuficiente para el producto {items[item_id].name}"
+                    break
+        if error:
+            results.append({"index": index, "status": "rejected", "error": error})
+            continue
+        for item_id, quantity in quantities.items():
+            remaining[item_id] -= quantity
+        accepted.append((index, sale))
+        results.append({"index": index, "status": "created"})
+
+    if not accepted:
+        return results
+
+    try:
+        sale_ids = db.scalars(
+            insert(models.Sale).returning(
+                models.Sale.id, sort_by_parameter_order=True),
+            [
+                {
+                    "customer_id": sale.customer_id,
+                    "user_id": user_id,
+                    "total_amount": sale.total_amount,
+                    "paid": sale.paid,
+                }
+                for _, sale in accepted
+            ]
+        ).all()
+
+        db.execute(insert(models.SaleItem), [
+            {
+                "sale_id": sale_id,
+                "item_id": line.item_id,
+                "quantity": line.quantity,
+                "unit_price": line.unit_price,
+                "subtotal": line.quantity * line.unit_price,
+            }
+            for sale_id, (_, sale) in zip(sale_ids, accepted)
+            for line in sale.items
+        ])
+
+        lines = [line for _, sale in accepted for line in sale.items]
+        _take_stock(db, _quantities_by_item(lines), _amounts_by_item(lines), items)
+        _add_to_sales_rollup(db, sale_ids)
+
+        customer_totals = {}
+        for _, sale in accepted:
+            charged, balance = customer_totals.get(sale.customer_id, (0, 0))
+            customer_totals[sale.customer_id] = (
+                charged + sale.total_amount,
+                balance + _sale_balance(sale.total_amount, sale.paid))
+        _adjust_customer_balances(db, [
+            _customer_balance_params(customer_id, charged=charged, balance=balance)
+            for customer_id, (charged, balance) in customer_totals.items()])
+        bump_table_versions(db, *SALE_TABLES)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    sale_ids_by_index = {index: sale_id for sale_id, (index, _) in zip(sale_ids, accepted)}
+    for result in results:
+        if result["status"] == "created":
+            result["sale_id"] = sale_ids_by_index[result["index"]]
+    return results
+
+
 def delete_sale(db: Session, sale_id: int):
     db_sale = get_sale(db, sale_id)
     if db_sale:
         try:
-            # Restore item stock
+            # Restore item stock and sales counters
             for sale_item in db_sale.items:
                 db_item = get_item(db, sale_item.item_id)
                 if db_item:
                     db_item.stock += sale_item.quantity
+                    db_item.units_sold -= sale_item.quantity
+                    db_item.revenue -= sale_item.subtotal
                     db.add(db_item)
 
+            _add_to_sales_rollup(db, [sale_id], sign=-1)
+            # Los pagos de la venta quedan sin venta asociada (sale_id NULL),
+            # como pagos a cuenta del cliente
+            paid_on_sale = db_sale.amount_paid
+            _adjust_customer_balances(db, [_customer_balance_params(
+                db_sale.customer_id, charged=-db_sale.total_amount,
+                balance=-_sale_balance(db_sale.total_amount, db_sale.paid, paid_on_sale)
+                - paid_on_sale)])
             # Delete the sale (this will cascade delete the sale items)
             db.delete(db_sale)
+            bump_table_versions(db, *SALE_CHANGE_TABLES)
             db.commit()
             return db_sale
         except Exception as e:
@@ -404,11 +818,19 @@ def update_sale(db: Session, sale_id: int, sale: schemas.SaleUpdate):
         return None
 
     try:
-        # Restaurar el stock original de los items actuales
+        # Se descuenta la venta del resumen diario y se vuelve a sumar al final
+        _add_to_sales_rollup(db, [sale_id], sign=-1)
+        paid_on_sale = db_sale.amount_paid
+        old_total = db_sale.total_amount
+        old_balance = _sale_balance(db_sale.total_amount, db_sale.paid, paid_on_sale)
+
+        # Restaurar el stock original y los contadores de los items actuales
         for sale_item in db_sale.items:
             db_item = get_item(db, sale_item.item_id)
             if db_item:
                 db_item.stock += sale_item.quantity
+                db_item.units_sold -= sale_item.quantity
+                db_item.revenue -= sale_item.subtotal
                 db.add(db_item)
 
         # Actualizar los items de la venta
@@ -421,8 +843,10 @@ def update_sale(db: Session, sale_id: int, sale: schemas.SaleUpdate):
             if db_item.stock < item.quantity:
                 raise ValueError(f"Not enough stock for item {db_item.name}")
 
-            # Actualizar el stock
+            # Actualizar el stock y los contadores de ventas
             db_item.stock -= item.quantity
+            db_item.units_sold += item.quantity
+            db_item.revenue += item.quantity * item.unit_price
             db.add(db_item)
 
             # Actualizar o crear el item de la venta
@@ -442,9 +866,24 @@ def update_sale(db: Session, sale_id: int, sale: schemas.SaleUpdate):
                 )
                 db.add(new_sale_item)
 
-        # Actualizar el monto total
+        # Las líneas que ya no están en la venta se eliminan; su stock y
+        # sus contadores ya se restauraron arriba
+        new_item_ids = {item.item_id for item in sale.items}
+        for sale_item in list(db_sale.items):
+            if sale_item.item_id not in new_item_ids:
+                db_sale.items.remove(sale_item)
+
+        # Actualizar el monto total; como en un pago, la venta queda pagada
+        # si lo ya pagado cubre el nuevo total
+        paid = sale.paid or paid_on_sale >= sale.total_amount
         db_sale.total_amount = sale.total_amount
-        db_sale.paid = sale.paid
+        db_sale.paid = paid
+        db.flush()
+        _add_to_sales_rollup(db, [sale_id])
+        _adjust_customer_balances(db, [_customer_balance_params(
+            db_sale.customer_id, charged=sale.total_amount - old_total,
+            balance=_sale_balance(sale.total_amount, paid, paid_on_sale) - old_balance)])
+        bump_table_versions(db, *SALE_CHANGE_TABLES)
         db.commit()
         db.refresh(db_sale)
         return db_sale
@@ -454,16 +893,330 @@ def update_sale(db: Session, sale_id: int, sale: schemas.SaleUpdate):
         raise e
 
 
+# Daily sales rollup
+_sales_rollup = models.DailySalesRollup.__table__
+_sales_rollup_columns = ["day", "sale_count", "revenue", "units"]
+
+
+def _sales_by_day(*where, sign: int = 1):
+    """SELECT of the rollup columns for the sales matching ``where``."""
+    units = select(func.coalesce(func.sum(models.SaleItem.quantity), 0)).where(
+        models.SaleItem.sale_id == models.Sale.id).scalar_subquery()
+    day = func.date(models.Sale.created_at)
+    return select(
+        day,
+        func.count(models.Sale.id) * sign,
+        func.coalesce(func.sum(models.Sale.total_amount), 0) * sign,
+        func.coalesce(func.sum(units), 0) * sign,
+    ).where(*where).group_by(day)
+
+
+def _sales_rollup_statement(db, sale_ids, sign: int = 1):
+    statement = _dialect_insert(db, models.DailySalesRollup).from_select(
+        _sales_rollup_columns, _sales_by_day(models.Sale.id.in_(sale_ids), sign=sign))
+    return _on_conflict_update(statement, [_sales_rollup.c.day], lambda excluded: {
+        "sale_count": _sales_rollup.c.sale_count + excluded.sale_count,
+        "revenue": _sales_rollup.c.revenue + excluded.revenue,
+        "units": _sales_rollup.c.units + excluded.units,
+    })
+
+
+def _add_to_sales_rollup(db: Session, sale_ids, sign: int = 1):
+    """
+    Add (sign=1) or subtract (sign=-1) sales to daily_sales_rollup with one
+    INSERT ... SELECT ... ON CONFLICT. Must run inside the transaction that
+    creates, changes or deletes the sales, after their items are written
+    and before they are deleted.
+    """
+    if not sale_ids:
+        return
+    db.execute(_sales_rollup_statement(db, sale_ids, sign))
+    if sign < 0:
+        db.execute(delete(_sales_rollup).where(_sales_rollup.c.sale_count <= 0))
+
+
+def rebuild_sales_rollup(db: Session):
+    """Recompute daily_sales_rollup from all sales; returns the number of days."""
+    try:
+        db.execute(delete(_sales_rollup))
+        db.execute(insert(_sales_rollup).from_select(
+            _sales_rollup_columns, _sales_by_day()))
+        bump_table_versions(db, models.DailySalesRollup.__tablename__)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return db.scalar(select(func.count()).select_from(_sales_rollup))
+
+
+def get_sales_totals(db: Session, start: date = None, end: date = None):
+    """
+    Sale count, revenue and units sold between two days (inclusive, UTC),
+    read from daily_sales_rollup. Without ``start`` it counts from the
+    first sale.
+
+    Returns:
+        Dict with total_sales, total_income and total_units
+    """
+    query = select(
+        func.coalesce(func.sum(_sales_rollup.c.sale_count), 0),
+        func.coalesce(func.sum(_sales_rollup.c.revenue), 0),
+        func.coalesce(func.sum(_sales_rollup.c.units), 0),
+    )
+    if start is not None:
+        query = query.where(_sales_rollup.c.day >= start)
+    if end is not None:
+        query = query.where(_sales_rollup.c.day <= end)
+    total_sales, total_income, total_units = db.execute(query).one()
+    return {
+        "total_sales": total_sales,
+        "total_income": float(total_income),
+        "total_units": total_units,
+    }
+
+
+# Item sales counters (items.units_sold / items.revenue)
+def get_top_products(db: Session, limit: int = 3):
+    """Best selling items, read from the counters through ix_items_units_sold_id."""
+    return db.execute(
+        select(
+            _items.c.id,
+            _items.c.name,
+            _items.c.units_sold.label("total_quantity"),
+            _items.c.revenue.label("total_amount"),
+        )
+        .where(_items.c.units_sold > 0)
+        .order_by(_items.c.units_sold.desc(), _items.c.id.desc())
+        .limit(limit)
+    ).mappings().all()
+
+
+def _item_sales_from_lines():
+    return (
+        select(
+            models.SaleItem.item_id,
+            func.sum(models.SaleItem.quantity).label("units_sold"),
+            func.sum(models.SaleItem.quantity * models.SaleItem.unit_price).label("revenue"),
+        )
+        .group_by(models.SaleItem.item_id)
+        .subquery()
+    )
+
+
+def verify_item_sales_counters(db: Session, tolerance: float = 0.005):
+    """
+    Compare the item counters with the totals recomputed from sale_items.
+
+    Returns:
+        List of dicts (id, name, units_sold, expected_units_sold, revenue,
+        expected_revenue) for the items that drifted
+    """
+    lines = _item_sales_from_lines()
+    expected_units = func.coalesce(lines.c.units_sold, 0)
+    expected_revenue = func.coalesce(lines.c.revenue, 0)
+    return db.execute(
+        select(
+            _items.c.id,
+            _items.c.name,
+            _items.c.units_sold,
+            expected_units.label("expected_units_sold"),
+            _items.c.revenue,
+            expected_revenue.label("expected_revenue"),
+        )
+        .outerjoin(lines, lines.c.item_id == _items.c.id)
+        .where(or_(_items.c.units_sold != expected_units,
+                   func.abs(_items.c.revenue - expected_revenue) > tolerance))
+        .order_by(_items.c.id)
+    ).mappings().all()
+
+
+def rebuild_item_sales_counters(db: Session):
+    """Recompute every item's counters from sale_items; returns the items with sales."""
+    lines = _item_sales_from_lines()
+    try:
+        db.execute(update(_items).values(units_sold=0, revenue=0))
+        updated = db.execute(
+            update(_items)
+            .values(units_sold=lines.c.units_sold, revenue=lines.c.revenue)
+            .where(_items.c.id == lines.c.item_id)
+        ).rowcount
+        bump_table_versions(db, models.Item.__tablename__)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return updated
+
+
+# Customer balances (customers.total_charged / total_paid / balance)
+def get_customer_balance(db: Session, customer_id: int):
+    return db.execute(
+        select(_customers.c.id.label("customer_id"), _customers.c.total_charged,
+               _customers.c.total_paid, _customers.c.balance)
+        .where(_customers.c.id == customer_id)
+    ).mappings().first()
+
+
+def get_top_debtors(db: Session, limit: int = 5):
+    """Customers with the highest balance, read through ix_customers_balance_id."""
+    return db.execute(
+        select(_customers.c.id, _customers.c.name, _customers.c.balance.label("total_debt"))
+        .where(_customers.c.balance > 0)
+        .order_by(_customers.c.balance.desc(), _customers.c.id.desc())
+        .limit(limit)
+    ).mappings().all()
+
+
+def _paid_by_sale():
+    return (
+        select(models.Payment.sale_id, func.sum(models.Payment.amount).label("amount"))
+        .where(models.Payment.sale_id.is_not(None))
+        .group_by(models.Payment.sale_id)
+        .subquery()
+    )
+
+
+def _customer_balances_from_ledger():
+    """Account totals per customer recomputed from sales and payments."""
+    paid_by_sale = _paid_by_sale()
+    sale_due = models.Sale.total_amount - func.coalesce(paid_by_sale.c.amount, 0)
+    sales = (
+        select(
+            models.Sale.customer_id,
+            func.sum(models.Sale.total_amount).label("charged"),
+            func.sum(case((models.Sale.paid == False, sale_due), else_=0)).label("due"),
+        )
+        .outerjoin(paid_by_sale, paid_by_sale.c.sale_id == models.Sale.id)
+        .group_by(models.Sale.customer_id)
+        .subquery()
+    )
+    payments = (
+        select(
+            models.Payment.customer_id,
+            func.sum(models.Payment.amount).label("paid"),
+            func.sum(case((models.Payment.sale_id.is_(None), models.Payment.amount),
+                          else_=0)).label("unallocated"),
+        )
+        .group_by(models.Payment.customer_id)
+        .subquery()
+    )
+    return (
+        select(
+            _customers.c.id,
+            func.coalesce(sales.c.charged, 0).label("total_charged"),
+            func.coalesce(payments.c.paid, 0).label("total_paid"),
+            (func.coalesce(sales.c.due, 0)
+             - func.coalesce(payments.c.unallocated, 0)).label("balance"),
+        )
+        .outerjoin(sales, sales.c.customer_id == _customers.c.id)
+        .outerjoin(payments, payments.c.customer_id == _customers.c.id)
+        .subquery()
+    )
+
+
+def verify_sale_amounts_paid(db: Session, tolerance: float = 0.005):
+    """Sales whose amount_paid doesn't match their payments, as dicts
+    (id, customer_id, amount_paid, expected_amount_paid)."""
+    paid_by_sale = _paid_by_sale()
+    expected = func.coalesce(paid_by_sale.c.amount, 0)
+    return db.execute(
+        select(_sales.c.id, _sales.c.customer_id, _sales.c.amount_paid,
+               expected.label("expected_amount_paid"))
+        .outerjoin(paid_by_sale, paid_by_sale.c.sale_id == _sales.c.id)
+        .where(func.abs(_sales.c.amount_paid - expected) > tolerance)
+        .order_by(_sales.c.id)
+    ).mappings().all()
+
+
+def rebuild_sale_amounts_paid(db: Session):
+    """Recompute sales.amount_paid from the payments; returns the sales with payments."""
+    paid_by_sale = _paid_by_sale()
+    try:
+        db.execute(update(_sales).values(amount_paid=0))
+        updated = db.execute(
+            update(_sales)
+            .values(amount_paid=paid_by_sale.c.amount)
+            .where(_sales.c.id == paid_by_sale.c.sale_id)
+        ).rowcount
+        bump_table_versions(db, models.Sale.__tablename__)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return updated
+
+
+def verify_customer_balances(db: Session, tolerance: float = 0.005):
+    """
+    Compare the stored account totals with the ones recomputed from sales
+    and payments.
+
+    Returns:
+        List of dicts (id, name, stored and expected totals) for the
+        customers that drifted
+    """
+    expected = _customer_balances_from_ledger()
+    return db.execute(
+        select(
+            _customers.c.id,
+            _customers.c.name,
+            _customers.c.total_charged,
+            expected.c.total_charged.label("expected_total_charged"),
+            _customers.c.total_paid,
+            expected.c.total_paid.label("expected_total_paid"),
+            _customers.c.balance,
+            expected.c.balance.label("expected_balance"),
+        )
+        .join(expected, expected.c.id == _customers.c.id)
+        .where(or_(
+            func.abs(_customers.c.total_charged - expected.c.total_charged) > tolerance,
+            func.abs(_customers.c.total_paid - expected.c.total_paid) > tolerance,
+            func.abs(_customers.c.balance - expected.c.balance) > tolerance,
+        ))
+        .order_by(_customers.c.id)
+    ).mappings().all()
+
+
+def rebuild_customer_balances(db: Session):
+    """Recompute every customer's account totals; returns the rows updated."""
+    expected = _customer_balances_from_ledger()
+    try:
+        updated = db.execute(
+            update(_customers)
+            .values(total_charged=expected.c.total_charged,
+                    total_paid=expected.c.total_paid,
+                    balance=expected.c.balance,
+                    updated_at=_customers.c.updated_at)
+            .where(_customers.c.id == expected.c.id)
+        ).rowcount
+        bump_table_versions(db, CUSTOMER_BALANCES)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return updated
+
+
 def update_user(db: Session, user_id: int, user: schemas.UserUpdate):
     db_user = get_user(db, user_id)
     if db_user:
+        old_username = db_user.username
         user_data = user.model_dump(exclude_unset=True)
+        revoke = False
         if 'password' in user_data and user_data['password']:
-            db_user.hashed_password = get_password_hash(user_data['password'])
-            user_data.pop('password')
+            db_user.hashed_password = passwords.hash_password(user_data['password'])
+            revoke = True
+        user_data.pop('password', None)
+        if user_data.get('is_active') is False and db_user.is_active:
+            revoke = True
         for key, value in user_data.items():
             setattr(db_user, key, value)
+        if revoke:
+            # Los tokens emitidos antes dejan de valer
+            db_user.token_version = (db_user.token_version or 0) + 1
+        bump_table_versions(db, models.User.__tablename__)
         db.commit()
+        principal_cache.cache.invalidate(old_username, db_user.username)
         db.refresh(db_user)
     return db_user
 
@@ -471,7 +1224,17 @@ def update_user(db: Session, user_id: int, user: schemas.UserUpdate):
 def get_stock_updates(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.StockUpdate).options(
         joinedload(models.StockUpdate.item)
-    ).order_by(models.StockUpdate.created_at.desc()).offset(skip).limit(limit).all()
+    ).order_by(
+        models.StockUpdate.created_at.desc(), models.StockUpdate.id.desc()
+    ).offset(skip).limit(limit).all()
+
+
+def get_stock_updates_page(db: Session, limit: int = 100, cursor: str = None):
+    query = db.query(models.StockUpdate).options(
+        joinedload(models.StockUpdate.item))
+    return paginate(
+        query, [models.StockUpdate.created_at, models.StockUpdate.id],
+        cursor=cursor, limit=limit, descending=True)
 
 
 def create_stock_update(db: Session, stock_update: schemas.StockUpdateCreate):
@@ -486,46 +1249,359 @@ def create_stock_update(db: Session, stock_update: schemas.StockUpdateCreate):
     # Create the stock update record
     db_stock_update = models.StockUpdate(**stock_update.model_dump())
     db.add(db_stock_update)
+    bump_table_versions(db, *STOCK_UPDATE_TABLES)
     db.commit()
     db.refresh(db_stock_update)
     return db_stock_update
 
 
-def create_payment(db: Session, payment: schemas.PaymentCreate):
-    db_payment = models.Payment(**payment.dict())
-    db.add(db_payment)
-
-    # Si el pago está asociado a una venta, verificar si se completó el pago
-    if payment.sale_id:
-        sale = db.query(models.Sale).filter(
-            models.Sale.id == payment.sale_id).first()
-        if sale:
-            # Calcular el total pagado para esta venta
-            total_paid = db.query(func.sum(models.Payment.amount)).filter(
-                models.Payment.sale_id == sale.id
-            ).scalar() or 0
-
-            # Si el total pagado es mayor o igual al total de la venta, marcar como pagada
-            if total_paid + payment.amount >= sale.total_amount:
-                sale.paid = True
+# Stock delta applied by every line of a bulk adjustment
+_add_stock_statement = (
+    update(_items)
+    .where(_items.c.id == bindparam("b_item_id"))
+    .values(stock=_items.c.stock + bindparam("b_quantity"))
+)
 
-    db.commit()
+
+def create_stock_updates_bulk(db: Session, stock_updates: List[schemas.StockUpdateCreate]):
+    """
+    Apply a list of stock deltas (a delivery, a physical count) in one
+    transaction: one executemany UPDATE with the net delta per item and
+    one executemany INSERT of the stock_updates history rows.
+
+    Returns:
+        List of the affected items with their new stock, ordered by id
+
+    Raises:
+        ItemNotFoundError: if any item_id doesn't exist; nothing is applied
+    """
+    deltas = _quantities_by_item(stock_updates)
+    try:
+        found = set(db.scalars(select(_items.c.id).where(_items.c.id.in_(deltas))))
+        missing = [item_id for item_id in deltas if item_id not in found]
+        if missing:
+            raise ItemNotFoundError(
+                f"Productos no encontrados: {', '.join(map(str, missing))}")
+
+        db.execute(_add_stock_statement, [
+            {"b_item_id": item_id, "b_quantity": delta} for item_id, delta in deltas.items()])
+        db.execute(insert(models.StockUpdate),
+                   [line.model_dump() for line in stock_updates])
+        bump_table_versions(db, *STOCK_UPDATE_TABLES)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return db.execute(
+        select(_items.c.id, _items.c.name, _items.c.stock)
+        .where(_items.c.id.in_(deltas))
+        .order_by(_items.c.id)
+    ).mappings().all()
+
+
+def create_payment(db: Session, payment: schemas.PaymentCreate):
+    try:
+        for statement, params in _payment_statements(payment):
+            db.execute(statement, params)
+        db_payment = models.Payment(**payment.model_dump())
+        db.add(db_payment)
+        bump_table_versions(db, *PAYMENT_TABLES)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
     db.refresh(db_payment)
     return db_payment
 
 
+def get_sale_owner(db: Session, sale_id: int):
+    """Customer id of a sale, or None if the sale doesn't exist."""
+    return db.scalar(select(_sales.c.customer_id).where(_sales.c.id == sale_id))
+
+
 def get_customer_payments(db: Session, customer_id: int, skip: int = 0, limit: int = 100):
     return db.query(models.Payment).filter(
         models.Payment.customer_id == customer_id
     ).order_by(
-        models.Payment.payment_date.desc()
+        models.Payment.payment_date.desc(), models.Payment.id.desc()
     ).offset(skip).limit(limit).all()
 
 
+def get_customer_payments_page(db: Session, customer_id: int, limit: int = 100, cursor: str = None):
+    query = db.query(models.Payment).filter(
+        models.Payment.customer_id == customer_id)
+    return paginate(
+        query, [models.Payment.payment_date, models.Payment.id],
+        cursor=cursor, limit=limit, descending=True)
+
+
+# Customer account statement: sales and payments in one ledger
+def _on_days(db: Session, column, start: date = None, before: date = None):
+    """Conditions for ``start <= column < before`` (UTC days)."""
+    conditions = []
+    if db.get_bind().dialect.name == "sqlite":
+        # Comparar el texto guardado, como en pagination._sort_key
+        column = type_coerce(column, String)
+        if start is not None:
+            conditions.append(column >= start.isoformat())
+        if before is not None:
+            conditions.append(column < before.isoformat())
+        return conditions
+    if start is not None:
+        conditions.append(column >= datetime.combine(start, time.min))
+    if before is not None:
+        conditions.append(column < datetime.combine(before, time.min))
+    return conditions
+
+
+def _after_entry(date_key, kind_order: int, entry_id, after):
+    """Entries of one kind that come after the cursor position ``after``."""
+    after_date, after_kind, after_id = after
+    if kind_order > after_kind:
+        return date_key >= after_date
+    if kind_order < after_kind:
+        return date_key > after_date
+    return tuple_(date_key, entry_id) > tuple_(after_date, after_id)
+
+
+def _customer_ledger(db: Session, customer_id: int, start: date = None, before: date = None,
+                     after=None, limit: int = None):
+    """
+    Sales (debit) and payments (credit) of a customer as one subquery,
+    ordered by (date_key, kind_order, id). A sale marked as paid without
+    payments covering it was settled at the sale, so the rest is credited
+    on the same entry.
+
+    With ``after`` (a cursor position) and ``limit`` each side is cut
+    before the union, so a page reads at most ``limit`` rows of each
+    table through their (customer_id, date, id) indexes.
+    """
+    settled = case(
+        (and_(_sales.c.paid == True, _sales.c.amount_paid < _sales.c.total_amount),
+         _sales.c.total_amount - _sales.c.amount_paid),
+        else_=0,
+    )
+    # Misma clave que pagination: la fecha tal como está guardada
+    sale_date = type_coerce(_sales.c.created_at, String)
+    payment_date = type_coerce(models.Payment.payment_date, String)
+    sales = select(
+        literal("sale").label("kind"),
+        literal(0).label("kind_order"),
+        _sales.c.id,
+        _sales.c.created_at.label("entry_date"),
+        sale_date.label("date_key"),
+        _sales.c.total_amount.label("debit"),
+        type_coerce(settled, Float).label("credit"),
+        null().label("description"),
+        _sales.c.id.label("sale_id"),
+    ).where(_sales.c.customer_id == customer_id,
+            *_on_days(db, _sales.c.created_at, start, before))
+    payments = select(
+        literal("payment"),
+        literal(1),
+        models.Payment.id,
+        models.Payment.payment_date,
+        payment_date,
+        literal(0.0),
+        models.Payment.amount,
+        models.Payment.description,
+        models.Payment.sale_id,
+    ).where(models.Payment.customer_id == customer_id,
+            *_on_days(db, models.Payment.payment_date, start, before))
+
+    if after is not None:
+        sales = sales.where(_after_entry(sale_date, 0, _sales.c.id, after))
+        payments = payments.where(_after_entry(payment_date, 1, models.Payment.id, after))
+    if limit is not None:
+        sales = sales.order_by(sale_date, _sales.c.id).limit(limit)
+        payments = payments.order_by(payment_date, models.Payment.id).limit(limit)
+        # SQLite no admite ORDER BY/LIMIT dentro de cada parte de un UNION
+        sales = select(sales.subquery())
+        payments = select(payments.subquery())
+    return union_all(sales, payments).subquery()
+
+
+def get_customer_statement(db: Session, customer_id: int, start: date = None,
+                           end: date = None, limit: int = 100, cursor: str = None):
+    """
+    One page of a customer's account statement, oldest entry first.
+
+    The first page starts with an "opening" entry holding the balance
+    before ``start``. Each entry carries the running balance, computed with
+    a window function over the page plus the balance the cursor carries
+    from the previous page, so a page costs the same wherever it is in
+    the account.
+
+    Payments count in full; customers.balance leaves out the part of a
+    payment beyond what its sale still owed, so the two differ for
+    overpaid sales.
+
+    Args:
+        db: Database session
+        customer_id: Customer
+        start: First day (inclusive, UTC), or None for the whole history
+        end: Last day (inclusive, UTC), or None
+        limit: Entries per page
+        cursor: Cursor returned with the previous page, for the same
+            customer, start and end
+
+    Returns:
+        ``(entries, next_cursor)``; next_cursor is None on the last page
+    """
+    before = end + timedelta(days=1) if end is not None else None
+    entries = []
+    # El cursor solo vale para el mismo cliente y el mismo rango
+    sort = f"statement:{customer_id}:{start}:{end}"
+    if cursor:
+        *after, opening = decode_cursor(cursor, 4, sort=sort)
+    else:
+        after = None
+        opening = 0.0
+        if start is not None:
+            earlier = _customer_ledger(db, customer_id, before=start)
+            opening = db.scalar(select(
+                func.coalesce(func.sum(earlier.c.debit - earlier.c.credit), 0)))
+        entries.append({
+            "kind": "opening",
+            "entry_date": datetime.combine(start, time.min) if start else None,
+            "debit": 0.0,
+            "credit": 0.0,
+            "balance": float(opening),
+        })
+
+    ledger = _customer_ledger(db, customer_id, start, before, after=after, limit=limit)
+    order = (ledger.c.date_key, ledger.c.kind_order, ledger.c.id)
+    page = select(ledger).order_by(*order).limit(limit).subquery()
+    order = (page.c.date_key, page.c.kind_order, page.c.id)
+    running = literal(float(opening), Float) + func.sum(page.c.debit - page.c.credit).over(
+        order_by=order)
+    rows = db.execute(select(page, running.label("balance")).order_by(*order)).mappings().all()
+    entries.extend(rows)
+
+    next_cursor = None
+    if limit and len(rows) == limit:
+        last = rows[-1]
+        next_cursor = encode_cursor(
+            [last["date_key"], last["kind_order"], last["id"], last["balance"]], sort=sort)
+    return entries, next_cursor
+
+
+# Table versions (see models.TableVersion)
+_table_versions = models.TableVersion.__table__
+
+
+# Versión propia de los saldos de customers (total_charged, total_paid,
+# balance): las ventas y los pagos no cambian los datos del cliente, así
+# que la versión de "customers" (y el ETag de /customers/) no se mueve
+CUSTOMER_BALANCES = "customer_balances"
+
+# Tablas que cambia cada operación de escritura
+SALE_TABLES = tuple(model.__tablename__ for model in (
+    models.Sale, models.SaleItem, models.Item, models.DailySalesRollup)) + (CUSTOMER_BALANCES,)
+# Editar o borrar una venta también cambia sus pagos
+SALE_CHANGE_TABLES = SALE_TABLES + (models.Payment.__tablename__,)
+PAYMENT_TABLES = tuple(model.__tablename__ for model in (
+    models.Payment, models.Sale)) + (CUSTOMER_BALANCES,)
+STOCK_UPDATE_TABLES = (models.StockUpdate.__tablename__, models.Item.__tablename__)
+
+
+def _table_versions_statement(db, table_names):
+    now = datetime.now(timezone.utc)
+    # Orden fijo: dos transacciones no se bloquean en orden inverso
+    statement = _dialect_insert(db, models.TableVersion).values([
+        {"table_name": name, "version": 1, "updated_at": now}
+        for name in sorted(set(table_names))
+    ])
+    return _on_conflict_update(
+        statement, [_table_versions.c.table_name],
+        lambda excluded: {"version": _table_versions.c.version + 1,
+                          "updated_at": excluded.updated_at})
+
+
+# Oyentes de escrituras confirmadas (p. ej. stats_cache)
+_CHANGED_TABLES = "changed_tables"
+_table_change_listeners = []
+
+
+def on_tables_changed(listener):
+    """Call ``listener(tables)`` after every commit that bumped ``tables``."""
+    _table_change_listeners.append(listener)
+
+
+def _note_changed_tables(db, table_names):
+    # Se publican al confirmar; un rollback las descarta
+    db.info.setdefault(_CHANGED_TABLES, set()).update(table_names)
+
+
+def bump_table_versions(db: Session, *table_names: str):
+    """Add one to the version of each table, inside the caller's transaction."""
+    db.execute(_table_versions_statement(db, table_names))
+    _note_changed_tables(db, table_names)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changed_tables(session):
+    tables = session.info.pop(_CHANGED_TABLES, None)
+    if tables:
+        for listener in _table_change_listeners:
+            listener(frozenset(tables))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_tables(session):
+    session.info.pop(_CHANGED_TABLES, None)
+
+
+def get_table_versions(db: Session, table_names) -> dict:
+    """(version, updated_at) per table; tables never written are missing."""
+    rows = db.execute(
+        select(_table_versions.c.table_name, _table_versions.c.version,
+               _table_versions.c.updated_at)
+        .where(_table_versions.c.table_name.in_(list(table_names)))
+    ).all()
+    return {name: (version, updated_at) for name, version, updated_at in rows}
+
+
 def get_configuration(db: Session, key: str):
     return db.query(models.Configuration).filter(models.Configuration.key == key).first()
 
 
+def get_configuration_value(db: Session, key: str, default=None):
+    """Typed value of a configuration key, from the in-process cache."""
+    return config_cache.cache.get(db, key, default)
+
+
+def get_low_stock_threshold(db: Session) -> int:
+    # Valor por defecto si no hay configuración
+    return get_configuration_value(db, "low_stock_threshold", 3)
+
+
+def get_low_stock_items(db: Session, threshold: int, limit: int = None):
+    """Items with stock below ``threshold``, lowest first (ix_items_stock_id)."""
+    query = (
+        db.query(models.Item)
+        .filter(models.Item.stock < threshold)
+        .order_by(models.Item.stock.asc(), models.Item.id.asc())
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def count_low_stock_items(db: Session, threshold: int) -> int:
+    return db.scalar(select(func.count()).select_from(_items).where(_items.c.stock < threshold))
+
+
+def get_record_counts(db: Session):
+    """Number of customers and items, in one round trip."""
+    total_customers, total_items = db.execute(select(
+        select(func.count()).select_from(_customers).scalar_subquery(),
+        select(func.count()).select_from(_items).scalar_subquery(),
+    )).one()
+    return {"total_customers": total_customers, "total_items": total_items}
+
+
 def create_or_update_configuration(db: Session, key: str, value: str, description: str = None):
     config = get_configuration(db, key)
     if config:
@@ -539,6 +1615,8 @@ def create_or_update_configuration(db: Session, key: str, value: str, descriptio
             description=description
         )
         db.add(config)
+    bump_table_versions(db, models.Configuration.__tablename__)
     db.commit()
+    config_cache.cache.invalidate()
     db.refresh(config)
     return config
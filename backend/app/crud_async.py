@@ -0,0 +1,147 @@
+"""Async versions of the hot CRUD operations.
+
+These mirror the functions of the same name in ``crud`` but run on an
+``AsyncSession`` (see ``database.get_async_db``), so routes can move to
+``async def`` one at a time without holding a threadpool slot for the
+whole database round-trip.
+
+An ``AsyncSession`` can't lazy load relationships, so everything a
+response schema needs is loaded eagerly.
+"""
+from sqlalchemy import insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, schemas
+from .crud import (
+    PAYMENT_TABLES,
+    SALE_TABLES,
+    InsufficientStockError,
+    ItemNotFoundError,
+    _amounts_by_item,
+    _check_stock_taken,
+    _customer_balance_params,
+    _customer_balance_statement,
+    _drop_invalid_items,
+    _note_changed_tables,
+    _payment_statements,
+    _quantities_by_item,
+    _sale_balance,
+    _sale_load_options,
+    _sales_rollup_statement,
+    _table_versions_statement,
+    _take_stock_batches,
+    _take_stock_statement,
+)
+
+
+async def get_item(db: AsyncSession, item_id: int):
+    return await db.get(models.Item, item_id)
+
+
+async def get_customers(db: AsyncSession, skip: int = 0, limit: int = 100, search: str = None):
+    query = select(models.Customer)
+
+    if search:
+        search = f"%{search}%"
+        query = query.where(
+            or_(
+                models.Customer.name.ilike(search),
+                models.Customer.email.ilike(search),
+                models.Customer.phone.ilike(search)
+            )
+        )
+
+    result = await db.scalars(
+        query.order_by(models.Customer.name, models.Customer.id)
+        .offset(skip).limit(limit))
+    return result.all()
+
+
+async def get_sale(db: AsyncSession, sale_id: int):
+    result = await db.scalars(
+        select(models.Sale)
+        .options(*_sale_load_options())
+        .where(models.Sale.id == sale_id)
+    )
+    return result.first()
+
+
+async def get_sales(db: AsyncSession, skip: int = 0, limit: int = 100):
+    result = await db.scalars(
+        select(models.Sale)
+        .options(*_sale_load_options())
+        .order_by(models.Sale.created_at.desc(), models.Sale.id.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    return _drop_invalid_items(result.all())
+
+
+async def create_sale(db: AsyncSession, sale: schemas.SaleCreate, user_id: int = None):
+    try:
+        quantities = _quantities_by_item(sale.items)
+        result = await db.scalars(
+            select(models.Item).where(models.Item.id.in_(quantities)))
+        items = {item.id: item for item in result}
+        for item_id in quantities:
+            if item_id not in items:
+                raise ItemNotFoundError(
+                    f"Producto con ID {item_id} no encontrado")
+
+        db_sale = models.Sale(
+            customer_id=sale.customer_id,
+            user_id=user_id,
+            total_amount=sale.total_amount,
+            paid=sale.paid
+        )
+        db.add(db_sale)
+        await db.flush()
+
+        await db.execute(insert(models.SaleItem), [
+            {
+                "sale_id": db_sale.id,
+                "item_id": item.item_id,
+                "quantity": item.quantity,
+                "unit_price": item.unit_price,
+                "subtotal": item.quantity * item.unit_price,
+            }
+            for item in sale.items
+        ])
+
+        # Conditional decrement, see crud._take_stock
+        updated = 0
+        for batch in _take_stock_batches(db, quantities, _amounts_by_item(sale.items)):
+            updated += (await db.execute(_take_stock_statement, batch)).rowcount
+        _check_stock_taken(updated, quantities, items)
+        await db.execute(_sales_rollup_statement(db, [db_sale.id]))
+        await db.execute(_customer_balance_statement, _customer_balance_params(
+            sale.customer_id, charged=sale.total_amount,
+            balance=_sale_balance(sale.total_amount, sale.paid)))
+        await db.execute(_table_versions_statement(db, SALE_TABLES))
+        _note_changed_tables(db, SALE_TABLES)
+
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    # Reload with the relationships needed by schemas.Sale; the items in the
+    # identity map still hold the stock read before the UPDATE
+    db.expunge_all()
+    return await get_sale(db, db_sale.id)
+
+
+async def create_payment(db: AsyncSession, payment: schemas.PaymentCreate):
+    try:
+        for statement, params in _payment_statements(payment):
+            await db.execute(statement, params)
+        db_payment = models.Payment(**payment.model_dump())
+        db.add(db_payment)
+        await db.execute(_table_versions_statement(db, PAYMENT_TABLES))
+        _note_changed_tables(db, PAYMENT_TABLES)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    await db.refresh(db_payment)
+    return db_payment
@@ -0,0 +1,113 @@
+"""Everything the dashboard shows, in one response (/dashboard).
+
+Each widget is an independent read. The widgets run concurrently in the
+thread pool, each on its own read session and so on its own connection.
+The assembled result is kept for DASHBOARD_CACHE_SECONDS, so a burst of
+page loads costs a single round of queries.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi.concurrency import run_in_threadpool
+
+from . import crud
+from .database import ReadSessionLocal
+
+DASHBOARD_CACHE_SECONDS = float(os.getenv("DASHBOARD_CACHE_SECONDS", "10"))
+TOP_PRODUCTS_LIMIT = 3
+TOP_DEBTORS_LIMIT = 5
+LOW_STOCK_LIMIT = 10
+
+
+def _counts(db):
+    # Ventas e ingresos totales salen del resumen diario, no de la tabla sales
+    totals = crud.get_sales_totals(db)
+    return {
+        **crud.get_record_counts(db),
+        "total_sales": totals["total_sales"],
+        "total_revenue": totals["total_income"],
+    }
+
+
+def _monthly(db):
+    today = datetime.now(timezone.utc).date()
+    # 30 días contando hoy: start es inclusivo
+    return crud.get_sales_totals(db, start=today - timedelta(days=29))
+
+
+def _top_products(db):
+    return [dict(row) for row in crud.get_top_products(db, limit=TOP_PRODUCTS_LIMIT)]
+
+
+def _low_stock(db):
+    threshold = crud.get_low_stock_threshold(db)
+    items = crud.get_low_stock_items(db, threshold, limit=LOW_STOCK_LIMIT)
+    return {
+        "threshold": threshold,
+        "count": crud.count_low_stock_items(db, threshold),
+        "items": [
+            {"id": item.id, "name": item.name, "stock": item.stock, "low_stock": True}
+            for item in items
+        ],
+    }
+
+
+def _top_debtors(db):
+    return [dict(row) for row in crud.get_top_debtors(db, limit=TOP_DEBTORS_LIMIT)]
+
+
+WIDGETS = {
+    "counts": _counts,
+    "monthly": _monthly,
+    "top_products": _top_products,
+    "low_stock": _low_stock,
+    "top_debtors": _top_debtors,
+}
+
+
+def _run_widget(widget, session_factory):
+    with session_factory() as db:
+        return widget(db)
+
+
+async def build_dashboard(session_factory=ReadSessionLocal):
+    """Run every widget concurrently and return the combined dict."""
+    results = await asyncio.gather(*(
+        run_in_threadpool(_run_widget, widget, session_factory)
+        for widget in WIDGETS.values()
+    ))
+    return {"generated_at": datetime.now(timezone.utc), **dict(zip(WIDGETS, results))}
+
+
+_cache = {"value": None, "expires": 0.0}
+_cache_lock = asyncio.Lock()
+
+
+def _cached():
+    if _cache["value"] is not None and time.monotonic() < _cache["expires"]:
+        return _cache["value"]
+    return None
+
+
+async def get_dashboard():
+    """
+    The dashboard, from the cache while it's fresh. Concurrent requests
+    after it expires wait for a single rebuild instead of each running
+    the queries.
+    """
+    value = _cached()
+    if value is not None:
+        return value
+    async with _cache_lock:
+        # Otra petición pudo haberlo reconstruido mientras se esperaba el lock
+        value = _cached()
+        if value is None:
+            value = await build_dashboard()
+            _cache.update(value=value, expires=time.monotonic() + DASHBOARD_CACHE_SECONDS)
+    return value
+
+
+def clear_cache():
+    _cache.update(value=None, expires=0.0)
@@ -1,14 +1,223 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
+# Replica used by read-only routes. When unset, SQLite file databases get a
+# separate mode=ro connection pool on the same file and server databases
+# fall back to the primary.
+SQLALCHEMY_READ_DATABASE_URL = os.getenv("DATABASE_READ_URL")
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "default")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Performance profiles, selected with DATABASE_PROFILE. For SQLite the
+# settings are PRAGMAs applied to every new connection; for server
+# databases they are QueuePool arguments.
+DATABASE_PROFILES = {
+    "default": {
+        "sqlite": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64 * 1024,  # negative means KiB: 64 MiB
+            "busy_timeout": 5000,  # ms
+            "temp_store": "MEMORY",
+        },
+        "server": {
+            "pool_size": 10,
+            "max_overflow": 20,
+            "pool_timeout": 30,
+            "pool_recycle": 1800,
+            "pool_pre_ping": True,
+        },
+    },
+    # Sync to disk on every commit, for deployments without a UPS/backups
+    "durable": {
+        "sqlite": {
+            "journal_mode": "WAL",
+            "synchronous": "FULL",
+            "mmap_size": 0,
+            "cache_size": -16 * 1024,
+            "busy_timeout": 10000,
+            "temp_store": "DEFAULT",
+        },
+        "server": {
+            "pool_size": 5,
+            "max_overflow": 5,
+            "pool_timeout": 30,
+            "pool_recycle": 900,
+            "pool_pre_ping": True,
+        },
+    },
+    # Many POS terminals writing at once
+    "high_concurrency": {
+        "sqlite": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 1024 * 1024 * 1024,
+            "cache_size": -256 * 1024,
+            "busy_timeout": 15000,
+            "temp_store": "MEMORY",
+        },
+        "server": {
+            "pool_size": 30,
+            "max_overflow": 30,
+            "pool_timeout": 10,
+            "pool_recycle": 1800,
+            "pool_pre_ping": True,
+        },
+    },
+}
+
+# Drivers used for the async engine when ASYNC_DATABASE_URL isn't set
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+# Databases with a native upsert (see crud._dialect_insert)
+SUPPORTED_DATABASES = ("sqlite", "postgresql", "mysql")
+
+
+def get_backend(url: str) -> str:
+    """Return ``"sqlite"`` or ``"server"`` for a database URL."""
+    return "sqlite" if make_url(url).get_backend_name() == "sqlite" else "server"
+
+
+def get_profile_settings(url: str, profile: str = DATABASE_PROFILE) -> dict:
+    if profile not in DATABASE_PROFILES:
+        raise ValueError(
+            f"Unknown DATABASE_PROFILE {profile!r}, "
+            f"expected one of {', '.join(DATABASE_PROFILES)}")
+    return dict(DATABASE_PROFILES[profile][get_backend(url)])
+
+
+def _set_sqlite_pragmas(engine, pragmas: dict):
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def get_read_only_url(url: str):
+    """Return a read-only URL for the same SQLite file, or None."""
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite":
+        return None
+    database = url.database
+    if not database or database == ":memory:" or database.startswith("file:"):
+        return None
+    return f"sqlite:///file:{database}?mode=ro&uri=true"
+
+
+def create_db_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: str = DATABASE_PROFILE,
+                     read_only: bool = False):
+    """Create the sync engine for ``url`` tuned with the named profile."""
+    name = make_url(url).get_backend_name()
+    if name not in SUPPORTED_DATABASES:
+        # Mejor fallar al arrancar que a mitad de una transacción
+        raise ValueError(
+            f"Unsupported database {name!r}, "
+            f"expected one of {', '.join(SUPPORTED_DATABASES)}")
+    settings = get_profile_settings(url, profile)
+    if get_backend(url) == "sqlite":
+        db_engine = create_engine(url, connect_args={"check_same_thread": False})
+        if read_only:
+            # The journal mode is a property of the file and can't be
+            # changed from a read-only connection
+            settings.pop("journal_mode", None)
+            settings["query_only"] = "ON"
+        _set_sqlite_pragmas(db_engine, settings)
+    else:
+        db_engine = create_engine(url, poolclass=QueuePool, **settings)
+    # Lo que pidió este engine, para get_database_diagnostics
+    db_engine.profile = profile
+    db_engine.profile_settings = settings
+    return db_engine
+
+
+def get_async_url(url: str) -> str:
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver known for {url.get_backend_name()!r}")
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def create_async_db_engine(url: str = SQLALCHEMY_DATABASE_URL, profile: str = DATABASE_PROFILE):
+    """Async counterpart of ``create_db_engine``; ``url`` is the sync URL."""
+    settings = get_profile_settings(url, profile)
+    async_url = os.getenv("ASYNC_DATABASE_URL") or get_async_url(url)
+    if get_backend(url) == "sqlite":
+        db_engine = create_async_engine(async_url)
+        _set_sqlite_pragmas(db_engine.sync_engine, settings)
+    else:
+        db_engine = create_async_engine(async_url, **settings)
+    return db_engine
+
+
+def get_database_diagnostics(db_engine=None) -> dict:
+    """Describe the profile of an engine and what the database reports live.
+
+    ``db_engine`` must come from ``create_db_engine``, which records the
+    profile and the settings it applied (for a read-only SQLite engine,
+    without journal_mode and with query_only). For SQLite the PRAGMAs are
+    read back from a pooled connection, so this shows what connections
+    are actually running with, not just what was requested.
+    """
+    db_engine = db_engine or engine
+    url = db_engine.url.render_as_string(hide_password=True)
+    backend = get_backend(url)
+    settings = db_engine.profile_settings
+
+    if backend == "sqlite":
+        with db_engine.connect() as conn:
+            live = {
+                name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+                for name in settings
+            }
+    else:
+        pool = db_engine.pool
+        live = {
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "status": pool.status(),
+        }
+
+    return {
+        "url": url,
+        "dialect": db_engine.dialect.name,
+        "backend": backend,
+        "profile": db_engine.profile,
+        "settings": settings,
+        "live": live,
+        "read_url": read_engine.url.render_as_string(hide_password=True),
+    }
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+_read_url = SQLALCHEMY_READ_DATABASE_URL or get_read_only_url(SQLALCHEMY_DATABASE_URL)
+read_engine = create_db_engine(_read_url, read_only=True) if _read_url else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+async_engine = create_async_db_engine()
+# expire_on_commit=False so objects stay readable after commit without
+# triggering lazy loads, which are not allowed on an AsyncSession
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 # Dependency
@@ -20,3 +229,17 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """Session for routes that only read; never commit through it."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
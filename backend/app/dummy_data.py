@@ -1,16 +1,20 @@
 from sqlalchemy.orm import Session
-from . import models, schemas
-from .auth import get_password_hash
+from . import models, passwords, schemas
 from datetime import datetime, timedelta
 import random
-from .crud import create_user, create_customer, create_item, create_sale
+from .crud import (bump_table_versions, create_user, create_customer, create_item,
+                   create_sale, rebuild_customer_balances, rebuild_item_sales_counters,
+                   rebuild_sales_rollup)
 from .schemas import UserCreate, CustomerCreate, ItemCreate, SaleCreate
 from .database import SessionLocal, engine
 
 
 def create_dummy_data():
-    # Eliminar todas las tablas y recrearlas
-    models.Base.metadata.drop_all(bind=engine)
+    # Eliminar todas las tablas y recrearlas; las versiones se conservan
+    # para que ningún ETag o caché anterior vuelva a coincidir
+    tables = [table for table in models.Base.metadata.sorted_tables
+              if table.name != models.TableVersion.__tablename__]
+    models.Base.metadata.drop_all(bind=engine, tables=tables)
     models.Base.metadata.create_all(bind=engine)
 
     db = SessionLocal()
@@ -55,11 +59,13 @@ def create_dummy_data():
             }
         ]
 
-        for user_data in users:
+        # Los hashes se calculan en paralelo en el pool de contraseñas
+        hashes = passwords.hash_passwords([user_data["password"] for user_data in users])
+        for user_data, hashed_password in zip(users, hashes):
             user = models.User(
                 username=user_data["username"],
                 email=user_data["email"],
-                hashed_password=get_password_hash(user_data["password"]),
+                hashed_password=hashed_password,
                 is_admin=user_data["is_admin"]
             )
             db.add(user)
@@ -457,6 +463,11 @@ def create_dummy_data():
             sale = create_random_sale()
             db.add(sale)
         db.commit()
+        rebuild_sales_rollup(db)
+        rebuild_item_sales_counters(db)
+        rebuild_customer_balances(db)
+        bump_table_versions(db, *(table.name for table in tables))
+        db.commit()
 
         return {
             "message": "Datos de prueba creados exitosamente",
@@ -0,0 +1,220 @@
+"""Reorder forecast (/items/reorder-forecast).
+
+Daily demand per item is kept as an items x days NumPy matrix covering
+the last MAX_WINDOW_DAYS days, filled from sale_items. Each request only
+reads the lines added since the previous one (sale_items.id above the
+last id seen) and shifts the matrix when the day changes. The whole
+matrix is rebuilt every FORECAST_REBUILD_SECONDS, or sooner after a sale
+is edited or deleted, since those change lines already counted.
+
+For every item, with d the mean daily demand over the window and s its
+standard deviation:
+
+    days of cover    = stock / d
+    safety stock     = SAFETY_FACTOR * s * sqrt(lead time)
+    reorder quantity = d * (lead time + cover days) + safety stock - stock
+"""
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import Date, String, cast, func, select, type_coerce
+
+from . import models
+
+MAX_WINDOW_DAYS = 90
+FORECAST_REBUILD_SECONDS = float(os.getenv("FORECAST_REBUILD_SECONDS", "3600"))
+# Unas 95% de las veces la demanda durante el plazo de entrega queda cubierta
+SAFETY_FACTOR = 1.65
+
+
+def _sale_day(dialect: str):
+    if dialect == "sqlite":
+        # Texto 'YYYY-MM-DD', que NumPy convierte sin pasar por objetos date
+        return func.date(models.Sale.created_at)
+    return cast(models.Sale.created_at, Date)
+
+
+def _sold_since(dialect: str, start: date):
+    column = models.Sale.created_at
+    if dialect == "sqlite":
+        # Comparar el texto guardado, como en timeseries
+        return type_coerce(column, String) >= start.isoformat()
+    return column >= datetime.combine(start, datetime.min.time())
+
+
+def _day_numbers(values) -> np.ndarray:
+    return np.array(values, dtype="datetime64[D]").astype(np.int64)
+
+
+class DemandMatrix:
+    """Units sold per item (row = item id) and day, for the last days."""
+
+    def __init__(self, today: date, days: int = MAX_WINDOW_DAYS):
+        self.days = days
+        self.today = today
+        self.units = np.zeros((0, days), dtype=np.int32)
+        self.last_line_id = 0
+        self.built_at = time.monotonic()
+
+    @property
+    def first_day(self) -> date:
+        return self.today - timedelta(days=self.days - 1)
+
+    def _add(self, item_ids, days, quantities):
+        item_ids = np.asarray(item_ids, dtype=np.int64)
+        columns = _day_numbers(days) - _day_numbers([self.first_day])[0]
+        quantities = np.asarray(quantities, dtype=np.int32)
+        # Líneas de días fuera de la ventana (ventas con fecha antigua)
+        inside = (columns >= 0) & (columns < self.days)
+        item_ids, columns, quantities = item_ids[inside], columns[inside], quantities[inside]
+        if not len(item_ids):
+            return
+        rows = int(item_ids.max()) + 1
+        if rows > len(self.units):
+            grown = np.zeros((max(rows, 2 * len(self.units)), self.days), dtype=np.int32)
+            grown[:len(self.units)] = self.units
+            self.units = grown
+        np.add.at(self.units, (item_ids, columns), quantities)
+
+    def build(self, db):
+        """Fill the matrix from every sale line in the window."""
+        dialect = db.get_bind().dialect.name
+        # El id se lee primero, así las líneas nuevas no se cuentan dos veces
+        self.last_line_id = db.scalar(select(func.max(models.SaleItem.id))) or 0
+        day = _sale_day(dialect)
+        rows = db.execute(
+            select(models.SaleItem.item_id, day, func.sum(models.SaleItem.quantity))
+            .join(models.Sale, models.Sale.id == models.SaleItem.sale_id)
+            .where(_sold_since(dialect, self.first_day),
+                   models.SaleItem.id <= self.last_line_id)
+            .group_by(models.SaleItem.item_id, day)
+        ).all()
+        if rows:
+            self._add(*zip(*rows))
+        self.built_at = time.monotonic()
+
+    def advance(self, today: date):
+        """Move the window to end on ``today``, dropping the oldest days."""
+        shift = (today - self.today).days
+        if shift <= 0:
+            return
+        if shift >= self.days:
+            self.units[:] = 0
+        else:
+            self.units[:, :-shift] = self.units[:, shift:]
+            self.units[:, -shift:] = 0
+        self.today = today
+
+    def refresh(self, db):
+        """Add the sale lines inserted since the last build or refresh."""
+        rows = db.execute(
+            select(models.SaleItem.id, models.SaleItem.item_id,
+                   _sale_day(db.get_bind().dialect.name), models.SaleItem.quantity)
+            .join(models.Sale, models.Sale.id == models.SaleItem.sale_id)
+            .where(models.SaleItem.id > self.last_line_id)
+        ).all()
+        if rows:
+            line_ids, item_ids, days, quantities = zip(*rows)
+            self._add(item_ids, days, quantities)
+            self.last_line_id = max(line_ids)
+
+
+_matrix = None
+_lock = threading.Lock()
+
+
+def invalidate():
+    """Rebuild the matrix on the next request (sale edited or deleted)."""
+    global _matrix
+    with _lock:
+        _matrix = None
+
+
+def _current_matrix(db, today: date) -> DemandMatrix:
+    global _matrix
+    if _matrix is None or time.monotonic() - _matrix.built_at > FORECAST_REBUILD_SECONDS:
+        _matrix = DemandMatrix(today)
+        _matrix.build(db)
+    else:
+        _matrix.advance(today)
+        _matrix.refresh(db)
+    return _matrix
+
+
+def demand_totals(db, window_days: int, today: date = None):
+    """
+    Units sold and sum of squared daily units per item id over the last
+    ``window_days`` days, as two arrays indexed by item id.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    with _lock:
+        units = _current_matrix(db, today).units[:, -window_days:]
+        return (units.sum(axis=1, dtype=np.int64),
+                np.square(units, dtype=np.int64).sum(axis=1))
+
+
+def reorder_forecast(db, window_days: int = 28, lead_time_days: int = 7,
+                     cover_days: int = 14, limit: int = 100, only_reorder: bool = False):
+    """
+    Demand, days of cover and suggested reorder quantity for every item.
+
+    Args:
+        db: Database session
+        window_days: Days of history for the moving average (1 to 90)
+        lead_time_days: Days a supplier takes to deliver
+        cover_days: Days of demand a reorder should cover after delivery
+        limit: Maximum number of items returned
+        only_reorder: Return only items with a reorder quantity
+
+    Returns:
+        List of dicts (id, name, stock, daily_demand, days_of_cover,
+        reorder_quantity), the items running out first at the top.
+        days_of_cover is None for items without demand in the window.
+    """
+    if not 1 <= window_days <= MAX_WINDOW_DAYS:
+        raise ValueError(f"window_days must be between 1 and {MAX_WINDOW_DAYS}")
+    if lead_time_days < 0 or cover_days < 0:
+        raise ValueError("lead_time_days and cover_days must not be negative")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+
+    sums, squares = demand_totals(db, window_days)
+    items = db.execute(select(models.Item.id, models.Item.name, models.Item.stock)).all()
+    if not items:
+        return []
+    ids, names, stock = zip(*items)
+    ids = np.array(ids, dtype=np.int64)
+    stock = np.array([s or 0 for s in stock], dtype=np.float64)
+
+    # Items que nunca se vendieron no tienen fila en la matriz
+    known = ids < len(sums)
+    item_sums = np.zeros(len(ids))
+    item_squares = np.zeros(len(ids))
+    item_sums[known] = sums[ids[known]]
+    item_squares[known] = squares[ids[known]]
+    demand = item_sums / window_days
+    deviation = np.sqrt(np.maximum(item_squares / window_days - demand ** 2, 0))
+
+    with np.errstate(divide="ignore"):
+        cover = np.where(demand > 0, stock / demand, np.inf)
+    safety_stock = SAFETY_FACTOR * deviation * np.sqrt(lead_time_days)
+    target = demand * (lead_time_days + cover_days) + safety_stock
+    reorder = np.ceil(np.maximum(target - stock, 0)).astype(np.int64)
+
+    candidates = np.flatnonzero(reorder > 0) if only_reorder else np.arange(len(ids))
+    # Menos días de cobertura primero; a igualdad, más unidades a pedir
+    order = candidates[np.lexsort((ids[candidates], -reorder[candidates], cover[candidates]))]
+    return [
+        {
+            "id": int(ids[i]),
+            "name": names[i],
+            "stock": int(stock[i]),
+            "daily_demand": float(demand[i]),
+            "days_of_cover": None if np.isinf(cover[i]) else float(cover[i]),
+            "reorder_quantity": int(reorder[i]),
+        }
+        for i in order[:limit].tolist()
+    ]
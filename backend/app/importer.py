@@ -0,0 +1,89 @@
+"""Catalog import shared by POST /items/import and ``python -m app.cli``.
+
+Records (dicts from CSV rows or JSON documents) are validated as
+``ItemCreate``, grouped into chunks and written with ``crud.upsert_items``.
+"""
+from pydantic import ValidationError
+
+from . import crud, schemas
+
+IMPORT_KEYS = ("name", "sku")
+# Keep the response small when a whole file is rejected
+MAX_REPORTED_ERRORS = 1000
+
+
+def item_from_record(record: dict) -> schemas.ItemCreate:
+    # Celdas vacías de un CSV equivalen a valores ausentes
+    record = {key: value for key, value in record.items()
+              if not (isinstance(value, str) and value.strip() == "")}
+    return schemas.ItemCreate.model_validate(record)
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in error.errors())
+
+
+class ItemImport:
+    """Accumulates validated records into chunks and tracks the counts."""
+
+    def __init__(self, key: str = "name", chunk_size: int = 1000):
+        if key not in IMPORT_KEYS:
+            raise ValueError(f"key must be one of {', '.join(IMPORT_KEYS)}")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        self.key = key
+        self.chunk_size = chunk_size
+        self.chunk = []
+        self.inserted = 0
+        self.updated = 0
+        self.rejected = 0
+        self.errors = []
+
+    def reject(self, index: int, error: str):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"index": index, "error": error})
+
+    def add(self, index: int, record: dict = None, error: str = None):
+        """Add a record; returns a full chunk to write, or None."""
+        if error is None:
+            try:
+                item = item_from_record(record)
+                if getattr(item, self.key) is None:
+                    error = f"{self.key} is required"
+                else:
+                    self.chunk.append((index, item))
+            except ValidationError as e:
+                error = _validation_message(e)
+            except (AttributeError, TypeError):
+                error = "Expected an object"
+        if error is not None:
+            self.reject(index, error)
+        if len(self.chunk) >= self.chunk_size:
+            return self.take_chunk()
+        return None
+
+    def take_chunk(self):
+        chunk, self.chunk = self.chunk, []
+        return chunk
+
+    def write(self, db, chunk):
+        if not chunk:
+            return
+        try:
+            counts = crud.upsert_items(db, [item for _, item in chunk], key=self.key)
+        except Exception as e:
+            for index, _ in chunk:
+                self.reject(index, str(e))
+            return
+        self.inserted += counts["inserted"]
+        self.updated += counts["updated"]
+
+    def result(self) -> dict:
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
@@ -1,33 +1,56 @@
-from datetime import datetime, timedelta
-from fastapi import FastAPI, Depends, HTTPException, status
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
+from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from typing import List
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import ValidationError
+from typing import List, Optional
 import logging
 import traceback
-from sqlalchemy import func, or_
+from sqlalchemy import func
 import os
-from dotenv import load_dotenv
+import sys
 
-from . import crud, models, schemas, auth, dummy_data
-from .database import engine, get_db, SessionLocal
+# analytics, forecast y timeseries importan NumPy: se importan en las rutas
+# que los usan para no cargarlo en cada worker al arrancar
+from . import (cli, conditional, crud, crud_async, dashboard, importer,
+               models, principal_cache, schemas, auth, stats_cache, streaming)
+from .database import engine, get_db, get_read_db, get_async_db, get_database_diagnostics
 from .auth import get_current_active_user, get_current_admin_user, get_current_user
+from .pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+# Migrar y crear el admin al arrancar; con AUTO_MIGRATE=0 se hace antes
+# con `python -m app.cli bootstrap` y los workers arrancan sin tocar el esquema
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "1") == "1"
+# Tienda columnar en memoria para /analytics (ver app/analytics.py)
+ANALYTICS_STORE = os.getenv("ANALYTICS_STORE", "0") == "1"
 
-# Configuración de JWT
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+def _invalidate_forecast():
+    # La matriz de demanda solo existe si /items/reorder-forecast ya
+    # importó forecast
+    forecast = sys.modules.get(f"{__package__}.forecast")
+    if forecast is not None:
+        forecast.invalidate()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if AUTO_MIGRATE:
+        await run_in_threadpool(cli.bootstrap)
+    # La carga sigue en segundo plano
+    if ANALYTICS_STORE:
+        from . import analytics
+        analytics.start()
+    yield
 
 # Configuración de CORS
 origins = [
@@ -40,7 +63,8 @@ origins = [
 app = FastAPI(
     title="Stock App API",
     description="API for managing stock portfolio and market data",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -52,32 +76,10 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
-# Use auth module's configuration
-oauth2_scheme = auth.oauth2_scheme
-pwd_context = auth.pwd_context
-
-# Create default admin user if not exists
-
-
-def create_default_admin():
-    db = SessionLocal()
-    try:
-        admin = crud.get_user_by_username(db, "admin")
-        if not admin:
-            crud.create_user(
-                db,
-                schemas.UserCreate(
-                    username="admin",
-                    password="admin",
-                    email="admin@example.com",
-                    is_admin=True
-                )
-            )
-    finally:
-        db.close()
-
-
-create_default_admin()
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    # Cursor of the next page for keyset pagination, absent on the last page
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
 
 @app.post("/token", response_model=schemas.Token)
@@ -86,7 +88,8 @@ async def login_for_access_token(
     db: Session = Depends(get_db)
 ):
     try:
-        user = crud.authenticate_user(
+        # bcrypt corre en el pool de contraseñas, sin bloquear el event loop
+        user = await auth.authenticate_user(
             db, form_data.username, form_data.password)
         if not user:
             raise HTTPException(
@@ -100,7 +103,8 @@ async def login_for_access_token(
                 detail="Usuario desactivado. Por favor contacte al administrador.",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        access_token = auth.create_access_token(data={"sub": user.username})
+        access_token = auth.create_access_token(
+            data={"sub": user.username, "ver": user.token_version or 0})
         return {
             "access_token": access_token,
             "token_type": "bearer",
@@ -192,10 +196,15 @@ def delete_stock(
 
 
 @app.get("/users/me", response_model=schemas.User)
-async def read_users_me(
+def read_users_me(
+    db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
-    return current_user
+    # La caché solo guarda lo necesario para autorizar; el perfil se lee entero
+    db_user = crud.get_user(db, user_id=current_user.id)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return db_user
 
 
 @app.get("/users/", response_model=List[schemas.User])
@@ -287,13 +296,24 @@ def create_customer(
 
 @app.get("/customers/", response_model=List[schemas.Customer])
 def read_customers(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     search: str = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: models.User = Depends(auth.get_current_active_user),
+    _etag: None = Depends(conditional.etag("customers"))
 ):
-    customers = crud.get_customers(db, skip=skip, limit=limit, search=search)
+    # skip se mantiene por compatibilidad; sin skip se pagina por cursor
+    if skip:
+        return crud.get_customers(db, skip=skip, limit=limit, search=search)
+    try:
+        customers, next_cursor = crud.get_customers_page(
+            db, limit=limit, cursor=cursor, search=search)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
     return customers
 
 
@@ -340,42 +360,35 @@ def create_item(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
+    if item.sku and crud.get_item_by_sku(db, item.sku):
+        raise HTTPException(status_code=400, detail="SKU already registered")
     return crud.create_item(db=db, item=item)
 
 
 @app.get("/items/", response_model=List[schemas.Item])
 def read_items(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     search: str = "",
     sort_by: str = None,
     sort_order: str = "asc",
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: models.User = Depends(auth.get_current_active_user),
+    _etag: None = Depends(conditional.etag("items"))
 ):
     try:
-        query = db.query(models.Item)
-
-        if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                or_(
-                    models.Item.name.ilike(search_term),
-                    models.Item.description.ilike(search_term)
-                )
-            )
-
-        # Apply sorting if sort_by is provided
-        if sort_by:
-            column = getattr(models.Item, sort_by, None)
-            if column is not None:
-                if sort_order == "desc":
-                    query = query.order_by(column.desc())
-                else:
-                    query = query.order_by(column.asc())
-
-        items = query.offset(skip).limit(limit).all()
+        if skip:
+            return crud.get_items(db, skip=skip, limit=limit, search=search,
+                                  sort_by=sort_by, sort_order=sort_order)
+        items, next_cursor = crud.get_items_page(
+            db, limit=limit, cursor=cursor, search=search,
+            sort_by=sort_by, sort_order=sort_order)
+        set_next_cursor(response, next_cursor)
         return items
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error al obtener items: {str(e)}")
         raise HTTPException(
@@ -387,25 +400,86 @@ def read_items(
 @app.get("/items/low-stock", response_model=List[schemas.Item])
 def get_low_stock_items(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_active_user)
+    current_user: models.User = Depends(get_current_active_user),
+    _etag: None = Depends(conditional.etag("items", "configurations"))
 ):
-    # Obtener el umbral configurado
-    config = crud.get_configuration(db, "low_stock_threshold")
-    # Valor por defecto si no hay configuración
-    threshold = int(config.value) if config else 3
+    threshold = crud.get_low_stock_threshold(db)
 
     # Obtener items con stock bajo
-    items = db.query(models.Item).filter(models.Item.stock < threshold).all()
-    return items
+    return crud.get_low_stock_items(db, threshold)
+
+
+@app.get("/items/reorder-forecast", response_model=List[schemas.ReorderForecast])
+def get_reorder_forecast(
+    window_days: int = 28,
+    lead_time_days: int = 7,
+    cover_days: int = 14,
+    limit: int = 100,
+    only_reorder: bool = False,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Moving-average daily demand over the last window_days, days of stock
+    left and suggested reorder quantity per item, the items that run out
+    first at the top.
+    """
+    from . import forecast
+
+    try:
+        return forecast.reorder_forecast(
+            db, window_days=window_days, lead_time_days=lead_time_days,
+            cover_days=cover_days, limit=limit, only_reorder=only_reorder)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/items/import", response_model=schemas.ItemImportResult)
+async def import_items(
+    request: Request,
+    key: str = "name",
+    chunk_size: int = 1000,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Bulk catalog import: insert or update items matched by name or sku.
+
+    The body is CSV with a header row (Content-Type: text/csv), a JSON
+    array or NDJSON of ItemCreate records. Rows are written in
+    transactions of chunk_size items.
+    """
+    try:
+        item_import = importer.ItemImport(key=key, chunk_size=chunk_size)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if streaming.is_csv(request):
+        records = streaming.iter_csv_records(request)
+    else:
+        records = streaming.iter_records(request)
+
+    try:
+        async for index, record, error in records:
+            chunk = item_import.add(index, record, error)
+            if chunk:
+                await run_in_threadpool(item_import.write, db, chunk)
+    except streaming.InvalidBodyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be UTF-8")
+    await run_in_threadpool(item_import.write, db, item_import.take_chunk())
+
+    return item_import.result()
 
 
 @app.get("/items/{item_id}", response_model=schemas.Item)
-def read_item(
+async def read_item(
     item_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
-    db_item = crud.get_item(db, item_id=item_id)
+    db_item = await crud_async.get_item(db, item_id=item_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return db_item
@@ -438,45 +512,57 @@ def delete_item(
 
 @app.get("/sales/", response_model=List[schemas.Sale])
 def get_sales(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(auth.get_current_active_user),
+    _etag: None = Depends(conditional.etag(
+        "sales", "sale_items", "items", "customers", "payments", "users", db_dependency=get_read_db))
 ):
-    logger.info("="*50)
-    logger.info("Fetching sales...")
     try:
-        sales = crud.get_sales(db, skip=skip, limit=limit)
-        logger.info(f"Found {len(sales)} sales")
-        for sale in sales:
-            logger.info(f"Sale ID: {sale.id}")
-            logger.info(
-                f"Customer: {sale.customer.name if sale.customer else 'No customer'}")
-            logger.info(
-                f"User: {sale.user.username if sale.user else 'No user'}")
-            logger.info(f"Items: {len(sale.items)}")
-            logger.info(f"Total: {sale.total_amount}")
-            logger.info(f"Created at: {sale.created_at}")
-            logger.info(f"Paid status: {sale.paid}")
-            logger.info(f"Payments count: {len(sale.payments)}")
-            if sale.payments:
-                logger.info("Payments details:")
-                for payment in sale.payments:
-                    logger.info(f"  - Payment ID: {payment.id}")
-                    logger.info(f"    Amount: {payment.amount}")
-                    logger.info(f"    Date: {payment.payment_date}")
-                    logger.info(f"    Description: {payment.description}")
-                    logger.info(f"    Sale ID: {payment.sale_id}")
-                    logger.info(f"    Customer ID: {payment.customer_id}")
-            logger.info("-"*30)
-        logger.info("="*50)
+        if skip:
+            sales = crud.get_sales(db, skip=skip, limit=limit)
+        else:
+            sales, next_cursor = crud.get_sales_page(
+                db, limit=limit, cursor=cursor)
+            set_next_cursor(response, next_cursor)
         return sales
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching sales: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/sales/summary", response_model=List[schemas.SaleSummary])
+def get_sales_summary(
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(auth.get_current_active_user),
+    _etag: None = Depends(conditional.etag(
+        "sales", "sale_items", "customers", "users", db_dependency=get_read_db))
+):
+    """
+    Flat sales rows for list views: one column-level query, no nested
+    items or payments. Same pagination as /sales/.
+    """
+    if skip:
+        return crud.get_sales_summary(db, skip=skip, limit=limit)
+    try:
+        rows, next_cursor = crud.get_sales_summary_page(
+            db, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
+    return rows
+
+
 @app.post("/sales/", response_model=schemas.Sale)
 def create_sale(
     sale: schemas.SaleCreate,
@@ -492,26 +578,89 @@ def create_sale(
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
     logger.info(f"Customer found: {customer.name}")
 
-    # Validar stock antes de crear la venta
-    for item_data in sale.items:
-        item = crud.get_item(db, item_data.item_id)
-        if not item:
-            raise HTTPException(
-                status_code=404, detail=f"Producto con ID {item_data.item_id} no encontrado")
-
-        if item.stock < item_data.quantity:
-            raise HTTPException(
-                status_code=400, detail=f"Stock insuficiente para el producto {item.name}")
-
-    # Crear la venta con el usuario actual
-    db_sale = crud.create_sale(
-        db, sale, current_user.id if current_user else None)
+    # Crear la venta con el usuario actual; crud valida productos y stock
+    try:
+        db_sale = crud.create_sale(
+            db, sale, current_user.id if current_user else None)
+    except crud.ItemNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except crud.InsufficientStockError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     logger.info(f"Sale created with ID: {db_sale.id}")
+    if ANALYTICS_STORE:
+        from . import analytics
+        analytics.add_sales([db_sale.id])
     logger.info("Sale created successfully")
     logger.info("="*50)
     return db_sale
 
 
+@app.post("/sales/bulk", response_model=schemas.BulkSaleResult)
+async def create_sales_bulk(
+    request: Request,
+    chunk_size: int = 500,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """
+    Bulk ingestion of sales, e.g. backfills from offline terminals.
+
+    The body is a JSON array of SaleCreate records, or NDJSON
+    (Content-Type: application/x-ndjson) which is parsed while it streams
+    in. Records are inserted in transactions of chunk_size sales; each
+    record gets its own result.
+    """
+    if chunk_size < 1:
+        raise HTTPException(status_code=400, detail="chunk_size must be positive")
+
+    user_id = current_user.id if current_user else None
+    results = []
+    chunk = []
+
+    async def flush(chunk):
+        try:
+            chunk_results = await run_in_threadpool(crud.create_sales_bulk, db, chunk, user_id)
+        except Exception as e:
+            logger.error(f"Error in bulk sales chunk: {str(e)}")
+            results.extend(
+                {"index": index, "status": "rejected", "error": str(e)}
+                for index, _ in chunk)
+            return
+        # Ya confirmadas: nada de lo que sigue puede marcarlas como rechazadas
+        results.extend(chunk_results)
+        if ANALYTICS_STORE:
+            from . import analytics
+            await run_in_threadpool(analytics.add_sales, [
+                result["sale_id"] for result in chunk_results if result["status"] == "created"])
+
+    try:
+        async for index, record, error in streaming.iter_records(request):
+            if error is None:
+                try:
+                    chunk.append((index, schemas.SaleCreate.model_validate(record)))
+                except ValidationError as e:
+                    error = "; ".join(
+                        f"{'.'.join(map(str, err['loc']))}: {err['msg']}"
+                        for err in e.errors())
+            if error is not None:
+                results.append({"index": index, "status": "rejected", "error": error})
+            if len(chunk) >= chunk_size:
+                await flush(chunk)
+                chunk = []
+    except streaming.InvalidBodyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if chunk:
+        await flush(chunk)
+
+    results.sort(key=lambda result: result["index"])
+    created = sum(1 for result in results if result["status"] == "created")
+    return {
+        "created": created,
+        "rejected": len(results) - created,
+        "results": results,
+    }
+
+
 @app.get("/sales/{sale_id}", response_model=schemas.Sale)
 def read_sale(
     sale_id: int,
@@ -533,6 +682,10 @@ def delete_sale(
     db_sale = crud.delete_sale(db, sale_id=sale_id)
     if db_sale is None:
         raise HTTPException(status_code=404, detail="Sale not found")
+    if ANALYTICS_STORE:
+        from . import analytics
+        analytics.sync_sales([sale_id])
+    _invalidate_forecast()
     return db_sale
 
 
@@ -546,6 +699,10 @@ def update_sale(
         db_sale = crud.update_sale(db, sale_id, sale)
         if db_sale is None:
             raise HTTPException(status_code=404, detail="Venta no encontrada")
+        if ANALYTICS_STORE:
+            from . import analytics
+            analytics.sync_sales([sale_id])
+        _invalidate_forecast()
         return db_sale
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -565,8 +722,17 @@ def load_dummy_data(current_user: models.User = Depends(get_current_user)):
             detail="Solo los administradores pueden cargar datos de prueba"
         )
 
+    # Solo para desarrollo: no se importa al arrancar
+    from . import dummy_data
+
     try:
         result = dummy_data.create_dummy_data()
+        if ANALYTICS_STORE:
+            from . import analytics
+            analytics.start(reload=True)
+        _invalidate_forecast()
+        # Los usuarios se recrean con otros ids
+        principal_cache.cache.clear()
         return result
     except Exception as e:
         logging.error(f"Error al cargar datos de prueba: {str(e)}")
@@ -578,39 +744,19 @@ def load_dummy_data(current_user: models.User = Depends(get_current_user)):
 
 @app.get("/stats/top-products", response_model=List[schemas.TopProduct])
 def get_top_products(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    limit: int = 3,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_admin_user),
+    versions: tuple = Depends(conditional.etag("items", db_dependency=get_read_db))
 ):
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
     try:
-        # Obtener los 3 productos más vendidos
-        top_products = db.query(
-            models.Item.id,
-            models.Item.name,
-            func.sum(models.SaleItem.quantity).label('total_quantity'),
-            func.sum(models.SaleItem.quantity *
-                     models.SaleItem.unit_price).label('total_amount')
-        ).join(
-            models.SaleItem,
-            models.Item.id == models.SaleItem.item_id
-        ).group_by(
-            models.Item.id,
-            models.Item.name
-        ).order_by(
-            func.sum(models.SaleItem.quantity).desc()
-        ).limit(3).all()
-
-        # Convertir los resultados a diccionarios
-        result = [
-            {
-                "id": item.id,
-                "name": item.name,
-                "total_quantity": item.total_quantity,
-                "total_amount": float(item.total_amount)
-            }
-            for item in top_products
-        ]
-
-        return result
+        # Productos más vendidos, según los contadores de cada item
+        return stats_cache.cache.get_or_compute(
+            ("top-products", limit), ["items"],
+            lambda: crud.get_top_products(db, limit=limit),
+            versions=versions)
     except Exception as e:
         logging.error(f"Error al obtener productos más vendidos: {str(e)}")
         raise HTTPException(
@@ -621,25 +767,18 @@ def get_top_products(
 
 @app.get("/stats/monthly", response_model=schemas.MonthlyStats)
 def get_monthly_stats(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_admin_user),
+    versions: tuple = Depends(conditional.etag(
+        "daily_sales_rollup", db_dependency=get_read_db, daily=True))
 ):
     try:
-        # Obtener la fecha de hace un mes
-        one_month_ago = datetime.now() - timedelta(days=30)
-
-        # Obtener estadísticas del último mes
-        monthly_stats = db.query(
-            func.count(models.Sale.id).label('total_sales'),
-            func.sum(models.Sale.total_amount).label('total_income')
-        ).filter(
-            models.Sale.created_at >= one_month_ago
-        ).first()
-
-        return {
-            "total_sales": monthly_stats.total_sales or 0,
-            "total_income": float(monthly_stats.total_income or 0)
-        }
+        # Últimos 30 días contando hoy, leídos del resumen diario de ventas
+        start = datetime.now(timezone.utc).date() - timedelta(days=29)
+        return stats_cache.cache.get_or_compute(
+            ("monthly", start), ["daily_sales_rollup"],
+            lambda: crud.get_sales_totals(db, start=start),
+            versions=versions)
     except Exception as e:
         logging.error(f"Error al obtener estadísticas mensuales: {str(e)}")
         raise HTTPException(
@@ -648,16 +787,106 @@ def get_monthly_stats(
         )
 
 
+@app.get("/stats/timeseries", response_model=List[schemas.TimeseriesPoint])
+def get_sales_timeseries(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    bucket: str = "day",
+    group_by: str = "none",
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_admin_user),
+    versions: tuple = Depends(conditional.etag(
+        "sales", "sale_items", "items", "users", db_dependency=get_read_db,
+        daily=True))
+):
+    """
+    Sale count, revenue and units per day, week or month between from and
+    to (inclusive, UTC; by default the last 30 days), optionally split by
+    seller or item.
+    """
+    from . import timeseries
+
+    to_date = to_date or datetime.now(timezone.utc).date()
+    from_date = from_date or to_date - timedelta(days=29)
+    try:
+        return stats_cache.cache.get_or_compute(
+            ("timeseries", from_date, to_date, bucket, group_by),
+            ["sales", "sale_items", "items", "users"],
+            lambda: timeseries.sales_timeseries(
+                db, from_date, to_date, bucket=bucket, group_by=group_by),
+            versions=versions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/dashboard", response_model=schemas.Dashboard)
+async def get_dashboard(
+    response: Response,
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Counts, last 30 days, top products, low stock and top debtors in one
+    response. The widgets are queried concurrently and the result is
+    cached for a few seconds.
+    """
+    try:
+        data = await dashboard.get_dashboard()
+    except Exception as e:
+        logging.error(f"Error al obtener el dashboard: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener el dashboard: {str(e)}"
+        )
+    response.headers["Cache-Control"] = f"private, max-age={int(dashboard.DASHBOARD_CACHE_SECONDS)}"
+    return data
+
+
+@app.get("/analytics/sales", response_model=List[schemas.AnalyticsRow])
+def get_sales_analytics(
+    group_by: str = "none",
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    order_by: str = "revenue",
+    limit: Optional[int] = None,
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Lines, sales, units and revenue per item, customer, seller or day (or
+    overall with group_by=none) from the in-memory analytics store. With
+    limit, only the top groups by order_by. Days are UTC and inclusive.
+    """
+    if ANALYTICS_STORE:
+        from . import analytics
+    if not ANALYTICS_STORE or not analytics.is_ready():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analytics store is disabled or still loading")
+    try:
+        return analytics.store.aggregate(
+            group_by, start=from_date, end=to_date, order_by=order_by, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.get("/stock-updates/", response_model=List[schemas.StockUpdate])
 def read_stock_updates(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    current_user: models.User = Depends(auth.get_current_active_user),
+    _etag: None = Depends(conditional.etag("stock_updates", "items"))
 ):
     try:
-        stock_updates = crud.get_stock_updates(db, skip=skip, limit=limit)
+        if skip:
+            return crud.get_stock_updates(db, skip=skip, limit=limit)
+        stock_updates, next_cursor = crud.get_stock_updates_page(
+            db, limit=limit, cursor=cursor)
+        set_next_cursor(response, next_cursor)
         return stock_updates
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting stock updates: {str(e)}")
         raise HTTPException(
@@ -678,40 +907,43 @@ def create_stock_update(
     return db_stock_update
 
 
-@app.get("/stats/top-debtors", response_model=List[schemas.TopDebtor])
-def get_top_debtors(
+@app.post("/stock-updates/bulk", response_model=List[schemas.ItemStockLevel])
+def create_stock_updates_bulk(
+    stock_updates: schemas.StockUpdateBulkCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    current_user: models.User = Depends(auth.get_current_active_user)
 ):
+    """
+    Apply all the lines of a delivery or stock count in one transaction and
+    return the new stock level of every affected item.
+    """
+    if not stock_updates.updates:
+        raise HTTPException(status_code=400, detail="No stock updates given")
     try:
-        # Obtener los 5 clientes con mayor deuda
-        top_debtors = db.query(
-            models.Customer.id,
-            models.Customer.name,
-            func.sum(models.Sale.total_amount).label('total_debt')
-        ).join(
-            models.Sale,
-            models.Customer.id == models.Sale.customer_id
-        ).filter(
-            models.Sale.paid == False
-        ).group_by(
-            models.Customer.id,
-            models.Customer.name
-        ).order_by(
-            func.sum(models.Sale.total_amount).desc()
-        ).limit(5).all()
-
-        # Convertir los resultados a diccionarios
-        result = [
-            {
-                "id": debtor.id,
-                "name": debtor.name,
-                "total_debt": float(debtor.total_debt)
-            }
-            for debtor in top_debtors
-        ]
+        levels = crud.create_stock_updates_bulk(db, stock_updates.updates)
+    except crud.ItemNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
-        return result
+    threshold = crud.get_low_stock_threshold(db)
+    return [{**level, "low_stock": level["stock"] < threshold} for level in levels]
+
+
+@app.get("/stats/top-debtors", response_model=List[schemas.TopDebtor])
+def get_top_debtors(
+    limit: int = 5,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_admin_user),
+    versions: tuple = Depends(conditional.etag(
+        "customers", crud.CUSTOMER_BALANCES, db_dependency=get_read_db))
+):
+    if limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    try:
+        # Clientes con mayor saldo pendiente
+        return stats_cache.cache.get_or_compute(
+            ("top-debtors", limit), ["customers", crud.CUSTOMER_BALANCES],
+            lambda: crud.get_top_debtors(db, limit=limit),
+            versions=versions)
     except Exception as e:
         logging.error(f"Error al obtener clientes con mayor deuda: {str(e)}")
         raise HTTPException(
@@ -723,8 +955,10 @@ def get_top_debtors(
 @app.get("/customers/{customer_id}/payments/", response_model=List[schemas.Payment])
 def get_customer_payments(
     customer_id: int,
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
@@ -733,7 +967,60 @@ def get_customer_payments(
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
 
-    return crud.get_customer_payments(db, customer_id=customer_id, skip=skip, limit=limit)
+    if skip:
+        return crud.get_customer_payments(db, customer_id=customer_id, skip=skip, limit=limit)
+    try:
+        payments, next_cursor = crud.get_customer_payments_page(
+            db, customer_id=customer_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
+    return payments
+
+
+@app.get("/customers/{customer_id}/balance", response_model=schemas.CustomerBalance)
+def get_customer_balance(
+    customer_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(auth.get_current_active_user),
+    _etag: None = Depends(conditional.etag("customers", crud.CUSTOMER_BALANCES))
+):
+    """Account totals of a customer: charged, paid and outstanding balance."""
+    balance = crud.get_customer_balance(db, customer_id)
+    if balance is None:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return balance
+
+
+@app.get("/customers/{customer_id}/statement", response_model=List[schemas.StatementEntry])
+def get_customer_statement(
+    customer_id: int,
+    response: Response,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(auth.get_current_active_user),
+    _etag: None = Depends(conditional.etag(
+        "sales", "payments", crud.CUSTOMER_BALANCES, db_dependency=get_read_db))
+):
+    """
+    Sales and payments of a customer between from and to (inclusive, UTC)
+    in date order, each with the running balance. The first page starts
+    with the opening balance; further pages via the X-Next-Cursor header.
+    """
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+    if crud.get_customer_balance(db, customer_id) is None:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    try:
+        entries, next_cursor = crud.get_customer_statement(
+            db, customer_id, start=from_date, end=to_date, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_next_cursor(response, next_cursor)
+    return entries
 
 
 @app.get("/customers/{customer_id}/pending-sales/", response_model=List[schemas.Sale])
@@ -788,11 +1075,11 @@ def create_payment(
 
         # Si hay una venta asociada, verificar que existe
         if payment.sale_id:
-            sale = crud.get_sale(db, payment.sale_id)
-            if not sale:
+            owner_id = crud.get_sale_owner(db, payment.sale_id)
+            if owner_id is None:
                 raise HTTPException(status_code=404, detail="Sale not found")
             # Verificar que la venta pertenece al cliente
-            if sale.customer_id != payment.customer_id:
+            if owner_id != payment.customer_id:
                 raise HTTPException(
                     status_code=400,
                     detail="The sale does not belong to the specified customer"
@@ -815,8 +1102,8 @@ def get_low_stock_threshold(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_admin_user)
 ):
-    config = crud.get_configuration(db, "low_stock_threshold")
-    if not config:
+    threshold = crud.get_configuration_value(db, "low_stock_threshold")
+    if threshold is None:
         # Si no existe la configuración, crear con valor por defecto
         config = crud.create_or_update_configuration(
             db,
@@ -824,7 +1111,8 @@ def get_low_stock_threshold(
             "3",
             "Umbral mínimo de stock para alertas"
         )
-    return {"threshold": int(config.value)}
+        threshold = int(config.value)
+    return {"threshold": threshold}
 
 
 @app.post("/config/low-stock-threshold", response_model=schemas.LowStockThreshold)
@@ -842,6 +1130,28 @@ def update_low_stock_threshold(
     return {"threshold": int(config.value)}
 
 
+@app.get("/diagnostics/database", response_model=schemas.DatabaseDiagnostics)
+def get_database_diagnostics_endpoint(
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Show the database performance profile in use and the settings the
+    database reports for live connections.
+    """
+    return get_database_diagnostics(engine)
+
+
+@app.get("/diagnostics/stats-cache", response_model=schemas.StatsCacheMetrics)
+def get_stats_cache_metrics(
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    """
+    Hits, misses, coalesced misses (waited for another request's query),
+    evictions, expirations and invalidations of the /stats/* cache.
+    """
+    return stats_cache.cache.metrics()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
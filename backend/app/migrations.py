@@ -0,0 +1,67 @@
+"""Bring an existing database up to date with ``models``.
+
+``Base.metadata.create_all`` only creates missing tables. Columns and
+indexes added to tables that already exist (e.g. in a deployed
+``sql_app.db``) are created here as well, and derived tables are filled
+from the existing data when they are first created.
+"""
+import logging
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from . import crud, models
+
+logger = logging.getLogger(__name__)
+
+
+def _column_ddl(column, dialect):
+    ddl = f"{column.name} {column.type.compile(dialect=dialect)}"
+    default = column.default
+    if default is not None and default.is_scalar:
+        value = default.arg
+        if isinstance(value, bool):
+            value = int(value)
+        ddl += f" DEFAULT {value!r}" if isinstance(value, str) else f" DEFAULT {value}"
+    return ddl
+
+
+# Derived tables ("table") and columns ("table.column") and the function
+# that rebuilds them from the source data
+BACKFILLS = {
+    "daily_sales_rollup": crud.rebuild_sales_rollup,
+    "items.units_sold": crud.rebuild_item_sales_counters,
+    "sales.amount_paid": crud.rebuild_sale_amounts_paid,
+    "customers.balance": crud.rebuild_customer_balances,
+}
+
+
+def upgrade(engine):
+    existing_tables = set(inspect(engine).get_table_names())
+    models.Base.metadata.create_all(bind=engine)
+
+    inspector = inspect(engine)
+    added = set()
+    with engine.begin() as conn:
+        for table in models.Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    logger.info("Adding column %s.%s", table.name, column.name)
+                    added.add(f"{table.name}.{column.name}")
+                    conn.exec_driver_sql(
+                        f"ALTER TABLE {table.name} "
+                        f"ADD COLUMN {_column_ddl(column, engine.dialect)}")
+
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+    # A fresh database has nothing to backfill
+    if existing_tables:
+        added.update(table for table in models.Base.metadata.tables
+                     if table not in existing_tables)
+    for name, backfill in BACKFILLS.items():
+        if name in added:
+            logger.info("Backfilling %s", name)
+            with Session(engine) as db:
+                backfill(db)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from .database import Base
@@ -14,6 +14,8 @@ class User(Base):
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False)
+    # Se incrementa al cambiar la contraseña o desactivar: invalida los tokens emitidos
+    token_version = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -29,6 +31,12 @@ class Customer(Base):
     email = Column(String, nullable=True)
     phone = Column(String)
     address = Column(String)
+    # Account totals, maintained by the sale and payment write paths.
+    # balance is what the customer still owes: the unpaid part of the
+    # sales not marked as paid, minus payments not tied to a sale.
+    total_charged = Column(Float, nullable=False, default=0)
+    total_paid = Column(Float, nullable=False, default=0)
+    balance = Column(Float, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -36,15 +44,26 @@ class Customer(Base):
     sales = relationship("Sale", back_populates="customer")
     payments = relationship("Payment", back_populates="customer")
 
+    __table_args__ = (
+        Index("ix_customers_name_id", "name", "id"),
+        # Top debtors
+        Index("ix_customers_balance_id", "balance", "id"),
+    )
+
 
 class Item(Base):
     __tablename__ = "items"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
+    # Optional external code, used as upsert key by the catalog import
+    sku = Column(String, unique=True, index=True, nullable=True)
     description = Column(Text)
     price = Column(Float)
     stock = Column(Integer, default=0)
+    # Running totals of sale_items, maintained by the sale write paths
+    units_sold = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True),
                         server_default=func.now(), onupdate=func.now())
@@ -52,16 +71,26 @@ class Item(Base):
     # Add relationship to stock updates
     stock_updates = relationship("StockUpdate", back_populates="item")
 
+    __table_args__ = (
+        Index("ix_items_name_id", "name", "id"),
+        # Top products
+        Index("ix_items_units_sold_id", "units_sold", "id"),
+        # Low stock
+        Index("ix_items_stock_id", "stock", "id"),
+    )
+
 
 class Sale(Base):
     __tablename__ = "sales"
 
     id = Column(Integer, primary_key=True, index=True)
-    customer_id = Column(Integer, ForeignKey("customers.id"))
+    customer_id = Column(Integer, ForeignKey("customers.id"), index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     total_amount = Column(Float)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     paid = Column(Boolean, default=False)
+    # Sum of the payments on this sale, maintained by crud.create_payment
+    amount_paid = Column(Float, nullable=False, default=0)
 
     # Relationships
     customer = relationship("Customer", back_populates="sales")
@@ -70,12 +99,19 @@ class Sale(Base):
                          cascade="all, delete-orphan")
     payments = relationship("Payment", back_populates="sale")
 
+    __table_args__ = (
+        # Sort key of the cursor pagination in /sales/
+        Index("ix_sales_created_at_id", "created_at", "id"),
+        # Customer account statement
+        Index("ix_sales_customer_id_created_at_id", "customer_id", "created_at", "id"),
+    )
+
 
 class SaleItem(Base):
     __tablename__ = "sale_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    sale_id = Column(Integer, ForeignKey("sales.id"))
+    sale_id = Column(Integer, ForeignKey("sales.id"), index=True)
     item_id = Column(Integer, ForeignKey("items.id"))
     quantity = Column(Integer)
     unit_price = Column(Float)
@@ -86,6 +122,17 @@ class SaleItem(Base):
     item = relationship("Item")
 
 
+class DailySalesRollup(Base):
+    """Sales totals per day (UTC), kept up to date by crud in the same
+    transaction as the sale, so date-range stats don't scan sales."""
+    __tablename__ = "daily_sales_rollup"
+
+    day = Column(Date, primary_key=True)
+    sale_count = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+
+
 class StockUpdate(Base):
     __tablename__ = "stock_updates"
 
@@ -97,13 +144,15 @@ class StockUpdate(Base):
     # Add relationship to item
     item = relationship("Item", back_populates="stock_updates")
 
+    __table_args__ = (Index("ix_stock_updates_created_at_id", "created_at", "id"),)
+
 
 class Payment(Base):
     __tablename__ = "payments"
 
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("customers.id"))
-    sale_id = Column(Integer, ForeignKey("sales.id"), nullable=True)
+    sale_id = Column(Integer, ForeignKey("sales.id"), nullable=True, index=True)
     amount = Column(Float, nullable=False)
     description = Column(String, nullable=True)
     payment_date = Column(DateTime, default=datetime.utcnow)
@@ -112,6 +161,11 @@ class Payment(Base):
     customer = relationship("Customer", back_populates="payments")
     sale = relationship("Sale", back_populates="payments")
 
+    __table_args__ = (
+        Index("ix_payments_customer_id_payment_date_id",
+              "customer_id", "payment_date", "id"),
+    )
+
 
 class Configuration(Base):
     __tablename__ = "configurations"
@@ -122,3 +176,15 @@ class Configuration(Base):
     description = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class TableVersion(Base):
+    """Change counter per table, bumped in the same transaction as the
+    write, so every process can tell whether its cached copy is stale.
+    A few keys cover part of a table instead, e.g. crud.CUSTOMER_BALANCES."""
+    __tablename__ = "table_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    # Momento del último cambio, para Last-Modified
+    updated_at = Column(DateTime(timezone=True))
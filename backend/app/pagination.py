@@ -0,0 +1,160 @@
+"""Keyset (cursor) pagination.
+
+Instead of ``OFFSET``, each page continues after the sort key of the last
+row of the previous page, so page 5000 costs the same index seek as
+page 1. The sort key always ends with the primary key to make it unique,
+e.g. ``(created_at, id)`` or ``(name, id)``. The first column may be
+NULL: NULLs sort before every value in ascending order and after them in
+descending order, on every backend.
+
+Cursors are opaque to clients: a base64url encoded JSON list with the
+sort (columns and direction) and the sort key values of the last row. A
+cursor is rejected under a different sort than the one that issued it.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from sqlalchemy import DateTime, String, and_, tuple_, type_coerce
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Tope del parámetro limit de las rutas paginadas
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        raise InvalidCursorError("Invalid cursor")
+    return value
+
+
+def encode_cursor(values, sort: str = None) -> str:
+    payload = [_encode_value(v) for v in values]
+    if sort is not None:
+        payload.insert(0, sort)
+    payload = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int, sort: str = None) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursorError("Invalid cursor")
+    if sort is not None:
+        # Un cursor de otra ordenación saltaría filas o las repetiría
+        if not isinstance(values, list) or not values or values[0] != sort:
+            raise InvalidCursorError("Invalid cursor")
+        values = values[1:]
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorError("Invalid cursor")
+    return [_decode_value(v) for v in values]
+
+
+def _sort_key(column):
+    # SQLite stores DATETIME as text, in more than one format depending on
+    # whether the value came from CURRENT_TIMESTAMP or from Python, while a
+    # bound datetime is always rendered with microseconds. Comparing the
+    # raw stored value keeps the cursor consistent with ORDER BY.
+    if isinstance(column.type, DateTime):
+        return type_coerce(column, String)
+    return column
+
+
+def sort_signature(keys, descending: bool = False) -> str:
+    """Sort identifier stored in the cursors of a ``paginate`` sort."""
+    return ",".join(str(key) for key in keys) + (":desc" if descending else ":asc")
+
+
+def _after(sort_keys, values, descending: bool, nullable: bool) -> list:
+    """Filters of the rows after ``values``, in the order they are read.
+
+    A row comparison with NULL is NULL, so with a nullable first column
+    the NULL block is read by its own query, instead of an OR that would
+    keep the index from serving the ORDER BY.
+    """
+    def compare(keys, vals):
+        if descending:
+            return tuple_(*keys) < tuple_(*vals)
+        return tuple_(*keys) > tuple_(*vals)
+
+    if not nullable:
+        return [compare(sort_keys, values)]
+    first = sort_keys[0]
+    if values[0] is None:
+        nulls = and_(first.is_(None), compare(sort_keys[1:], values[1:]))
+        # Ascendente: los NULL van primero y después siguen los valores
+        return [nulls] if descending else [nulls, first.is_not(None)]
+    # Descendente: los NULL van al final, después de los valores
+    after = compare(sort_keys, values)
+    return [after, first.is_(None)] if descending else [after]
+
+
+def paginate(query, keys, cursor: str = None, limit: int = 100, descending: bool = False):
+    """Return ``(rows, next_cursor)`` for one page of an ORM query.
+
+    ``keys`` are the columns of the sort key, ending with the primary key;
+    only the first one may be NULL.
+    ``next_cursor`` is None when there are no more rows.
+    """
+    sort_keys = [_sort_key(key) for key in keys]
+    nullable = len(keys) > 1 and bool(getattr(keys[0], "nullable", False))
+    sort = sort_signature(keys, descending)
+
+    if cursor:
+        values = decode_cursor(cursor, len(sort_keys), sort=sort)
+        filters = _after(sort_keys, values, descending, nullable)
+    else:
+        filters = [None]
+
+    # Entity queries return the entities; column queries return one dict
+    # per row, without the sort key columns added here
+    single_entity = len(query.column_descriptions) == 1
+    labels = [f"_cursor_{i}" for i in range(len(sort_keys))]
+
+    order = [key.desc() if descending else key.asc() for key in sort_keys]
+    if nullable:
+        if query.session.get_bind().dialect.name == "mysql":
+            # MySQL no admite NULLS FIRST/LAST: (col IS NULL) va delante
+            is_null = sort_keys[0].is_(None)
+            order.insert(0, is_null.asc() if descending else is_null.desc())
+        else:
+            order[0] = order[0].nulls_last() if descending else order[0].nulls_first()
+    query = query.add_columns(
+        *[key.label(label) for key, label in zip(sort_keys, labels)]
+    ).order_by(*order)
+
+    rows = []
+    for condition in filters:
+        if len(rows) >= limit:
+            break
+        page = query if condition is None else query.filter(condition)
+        rows.extend(page.limit(limit - len(rows)).all())
+
+    next_cursor = None
+    if limit and len(rows) == limit:
+        next_cursor = encode_cursor(rows[-1][-len(sort_keys):], sort=sort)
+    if single_entity:
+        return [row[0] for row in rows], next_cursor
+    return [
+        {key: value for key, value in row._mapping.items() if key not in labels}
+        for row in rows
+    ], next_cursor
@@ -0,0 +1,71 @@
+"""Password hashing and verification outside the event loop.
+
+bcrypt takes tens to hundreds of milliseconds per call on purpose. Every
+hash and verification runs in a dedicated thread pool of HASH_WORKERS
+threads (bcrypt releases the GIL), so concurrent logins use at most that
+many cores and never block the event loop. Async callers wait without
+holding a thread; a burst of logins queues in the pool instead of
+freezing other requests.
+
+The cost is BCRYPT_ROUNDS. A stored hash with any other cost verifies as
+usual and is replaced with one at the current cost on the next
+successful login (verify_password returns the new hash).
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# min = max = default: needs_update marca cualquier otro coste
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(HASH_WORKERS, thread_name_prefix="password-hash")
+    return _executor
+
+
+def hash_password(password: str) -> str:
+    """Hash at the current cost, blocking the calling thread."""
+    return _pool().submit(pwd_context.hash, password).result()
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash several passwords in parallel, in order."""
+    return list(_pool().map(pwd_context.hash, passwords))
+
+
+def verify_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """
+    Check a password, blocking the calling thread.
+
+    Returns:
+        (valid, new_hash); new_hash is set when the stored hash should be
+        replaced because the cost policy changed
+    """
+    return _pool().submit(pwd_context.verify_and_update, password, hashed).result()
+
+
+async def verify_password_async(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Same as verify_password, awaiting the pool instead of blocking."""
+    return await asyncio.wrap_future(
+        _pool().submit(pwd_context.verify_and_update, password, hashed))
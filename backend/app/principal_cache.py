@@ -0,0 +1,113 @@
+"""In-process cache of authenticated users for auth.get_current_user.
+
+Tokens carry the user's token_version ("ver" claim); cached principals are
+keyed by (username, token_version) and kept at most AUTH_CACHE_SECONDS,
+the least recently used dropped past AUTH_CACHE_SIZE entries.
+crud.update_user and delete_user bump the "users" row of table_versions
+in the same transaction and drop the user from this process' cache, so a
+deactivation applies on the next request. Other processes check that
+version at most once every AUTH_CACHE_POLL_SECONDS and empty their cache
+when it changed. A password change or deactivation also bumps the user's
+token_version, which revokes the tokens issued before it.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+from sqlalchemy import select
+
+from . import models
+
+AUTH_CACHE_SECONDS = float(os.getenv("AUTH_CACHE_SECONDS", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+AUTH_CACHE_POLL_SECONDS = float(os.getenv("AUTH_CACHE_POLL_SECONDS", "5"))
+USERS_TABLE = models.User.__tablename__
+
+
+class Principal(NamedTuple):
+    """The fields of a user the route dependencies need."""
+    id: int
+    username: str
+    is_active: bool
+    is_admin: bool
+    token_version: int
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(user.id, user.username, bool(user.is_active), bool(user.is_admin),
+                   user.token_version or 0)
+
+
+def _read_version(db) -> int:
+    return db.scalar(
+        select(models.TableVersion.version)
+        .where(models.TableVersion.table_name == USERS_TABLE)
+    ) or 0
+
+
+class PrincipalCache:
+    def __init__(self, ttl_seconds: float = AUTH_CACHE_SECONDS,
+                 max_size: int = AUTH_CACHE_SIZE,
+                 poll_seconds: float = AUTH_CACHE_POLL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        # (username, token_version) -> (principal, expires_at), LRU al final
+        self._entries = OrderedDict()
+        self._version = None
+        self._checked_at = 0.0
+
+    def _refresh(self, db, now: float):
+        if self._version is not None and now - self._checked_at < self.poll_seconds:
+            return
+        version = _read_version(db)
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            self._checked_at = now
+
+    def get(self, db, username: str, token_version: int):
+        """Cached principal for a token, or None if it must be read from the database."""
+        now = time.monotonic()
+        self._refresh(db, now)
+        key = (username, token_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            principal, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return principal
+
+    def put(self, principal: Principal):
+        # Solo usuarios activos: los inactivos se rechazan leyendo la base
+        if not principal.is_active:
+            return
+        key = (principal.username, principal.token_version)
+        with self._lock:
+            self._entries[key] = (principal, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *usernames: str):
+        """Drop the given users, e.g. after this process updated or deleted them."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] in usernames]:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop every entry and check the version again on the next read."""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+
+cache = PrincipalCache()
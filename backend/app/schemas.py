@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional, List
+from datetime import date, datetime
+from typing import Any, Dict, Optional, List, Union
 
 
 class UserBase(BaseModel):
@@ -84,6 +84,7 @@ class Customer(CustomerBase):
 # Item schemas
 class ItemBase(BaseModel):
     name: str
+    sku: Optional[str] = None
     description: Optional[str] = None
     price: float
     stock: int
@@ -102,6 +103,19 @@ class Item(ItemBase):
         from_attributes = True
 
 
+# Import schemas
+class ImportRecordError(BaseModel):
+    index: int
+    error: str
+
+
+class ItemImportResult(BaseModel):
+    inserted: int
+    updated: int
+    rejected: int
+    errors: List[ImportRecordError]
+
+
 # SaleItem schemas
 class SaleItemBase(BaseModel):
     item_id: int
@@ -168,12 +182,38 @@ class Sale(SaleBase):
     customer: Customer
     user: User
     paid: bool
+    amount_paid: float = 0
     payments: List[Payment]
 
     class Config:
         from_attributes = True
 
 
+class SaleSummary(BaseModel):
+    id: int
+    created_at: datetime
+    customer_id: Optional[int] = None
+    customer_name: Optional[str] = None
+    seller_username: Optional[str] = None
+    total_amount: float
+    paid: bool
+    line_count: int
+    amount_paid: float
+
+
+class BulkSaleRecordResult(BaseModel):
+    index: int
+    status: str
+    sale_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkSaleResult(BaseModel):
+    created: int
+    rejected: int
+    results: List[BulkSaleRecordResult]
+
+
 class TopProduct(BaseModel):
     id: int
     name: str
@@ -187,6 +227,16 @@ class TopProduct(BaseModel):
 class MonthlyStats(BaseModel):
     total_sales: int
     total_income: float
+    total_units: int = 0
+
+
+class TimeseriesPoint(BaseModel):
+    bucket: date
+    key: Optional[int] = None
+    label: Optional[str] = None
+    sale_count: int
+    revenue: float
+    units: int
 
 
 class StockUpdateBase(BaseModel):
@@ -207,6 +257,26 @@ class StockUpdate(StockUpdateBase):
         from_attributes = True
 
 
+class StockUpdateBulkCreate(BaseModel):
+    updates: List[StockUpdateCreate]
+
+
+class ItemStockLevel(BaseModel):
+    id: int
+    name: str
+    stock: int
+    low_stock: bool
+
+
+class ReorderForecast(BaseModel):
+    id: int
+    name: str
+    stock: int
+    daily_demand: float
+    days_of_cover: Optional[float] = None
+    reorder_quantity: int
+
+
 class TopDebtor(BaseModel):
     id: int
     name: str
@@ -216,6 +286,54 @@ class TopDebtor(BaseModel):
         from_attributes = True
 
 
+class AnalyticsRow(BaseModel):
+    key: Optional[Union[int, date]] = None
+    lines: int
+    sales: Optional[int] = None
+    quantity: int
+    revenue: float
+
+
+class DashboardCounts(BaseModel):
+    total_customers: int
+    total_items: int
+    total_sales: int
+    total_revenue: float
+
+
+class LowStockSummary(BaseModel):
+    threshold: int
+    count: int
+    items: List[ItemStockLevel]
+
+
+class Dashboard(BaseModel):
+    generated_at: datetime
+    counts: DashboardCounts
+    monthly: MonthlyStats
+    top_products: List[TopProduct]
+    low_stock: LowStockSummary
+    top_debtors: List[TopDebtor]
+
+
+class CustomerBalance(BaseModel):
+    customer_id: int
+    total_charged: float
+    total_paid: float
+    balance: float
+
+
+class StatementEntry(BaseModel):
+    kind: str  # "opening", "sale" or "payment"
+    id: Optional[int] = None
+    entry_date: Optional[datetime] = None
+    description: Optional[str] = None
+    sale_id: Optional[int] = None
+    debit: float
+    credit: float
+    balance: float
+
+
 class ConfigurationBase(BaseModel):
     key: str
     value: str
@@ -237,3 +355,25 @@ class Configuration(ConfigurationBase):
 
 class LowStockThreshold(BaseModel):
     threshold: int
+
+
+class StatsCacheMetrics(BaseModel):
+    hits: int
+    misses: int
+    coalesced: int
+    evictions: int
+    expirations: int
+    invalidations: int
+    entries: int
+    max_size: int
+    ttl_seconds: float
+
+
+class DatabaseDiagnostics(BaseModel):
+    url: str
+    dialect: str
+    backend: str
+    profile: str
+    settings: Dict[str, Any]
+    live: Dict[str, Any]
+    read_url: Optional[str] = None
@@ -0,0 +1,142 @@
+"""In-process response cache for the /stats/* aggregates.
+
+Each entry declares the tables it was computed from. crud publishes the
+tables every committed write changed (crud.on_tables_changed) and the
+entries that depend on any of them are dropped at once. Concurrent misses
+of the same key wait for a single computation instead of running the
+query once each.
+
+Other processes don't see this process' commits. Callers therefore pass
+the table versions they read (the ETag dependency returns them) and an
+entry computed against other versions is a miss, so a cached value
+never goes out under the ETag of newer data. Entries also expire after
+STATS_CACHE_SECONDS; the least recently used are evicted past
+STATS_CACHE_SIZE entries.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from . import crud
+
+STATS_CACHE_SECONDS = float(os.getenv("STATS_CACHE_SECONDS", "60"))
+STATS_CACHE_SIZE = int(os.getenv("STATS_CACHE_SIZE", "256"))
+
+
+class _Flight:
+    """A computation in progress that other requests for the key wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class StatsCache:
+    def __init__(self, ttl_seconds: float = STATS_CACHE_SECONDS,
+                 max_size: int = STATS_CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # key -> (value, tables, expires_at, versions), LRU al final
+        self._entries = OrderedDict()
+        self._flights = {}
+        # Se incrementa en cada invalidación de la tabla: un cálculo que
+        # empezó antes no se guarda, podría haber leído datos viejos
+        self._generations = {}
+        self._metrics = dict.fromkeys(
+            ("hits", "misses", "coalesced", "evictions", "expirations", "invalidations"), 0)
+
+    def get_or_compute(self, key, tables, compute, versions=None):
+        """
+        Cached value of ``key``, or the result of ``compute()``.
+
+        Args:
+            key: Hashable key, including every parameter of the result
+            tables: Tables the value is computed from
+            compute: Function that computes the value
+            versions: Hashable table versions read before computing, e.g.
+                what conditional.etag returns; an entry stored with other
+                versions is not used
+
+        Returns:
+            The value; the same object for every caller until invalidated
+        """
+        now = time.monotonic()
+        leader = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, _, expires_at, entry_versions = entry
+                if entry_versions != versions:
+                    # Otro proceso escribió: este proceso no se enteró
+                    del self._entries[key]
+                    self._metrics["invalidations"] += 1
+                elif expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._metrics["hits"] += 1
+                    return value
+                else:
+                    del self._entries[key]
+                    self._metrics["expirations"] += 1
+
+            # Solo se espera a un cálculo hecho con las mismas versiones
+            flight_key = (key, versions)
+            flight = self._flights.get(flight_key)
+            if flight is not None:
+                self._metrics["coalesced"] += 1
+            else:
+                self._metrics["misses"] += 1
+                flight = self._flights[flight_key] = _Flight()
+                generations = [self._generations.get(table, 0) for table in tables]
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[flight_key]
+                current = [self._generations.get(table, 0) for table in tables]
+                if flight.error is None and current == generations:
+                    self._entries[key] = (flight.value, frozenset(tables),
+                                          time.monotonic() + self.ttl_seconds, versions)
+                    while len(self._entries) > self.max_size:
+                        self._entries.popitem(last=False)
+                        self._metrics["evictions"] += 1
+            flight.done.set()
+        return flight.value
+
+    def invalidate(self, tables):
+        """Drop every entry computed from any of ``tables``."""
+        tables = set(tables)
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [key for key, (_, depends_on, _, _) in self._entries.items()
+                     if depends_on & tables]
+            for key in stale:
+                del self._entries[key]
+            self._metrics["invalidations"] += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {**self._metrics, "entries": len(self._entries),
+                    "max_size": self.max_size, "ttl_seconds": self.ttl_seconds}
+
+
+cache = StatsCache()
+crud.on_tables_changed(cache.invalidate)
@@ -0,0 +1,92 @@
+"""Incremental parsing of bulk request bodies.
+
+Bulk endpoints accept either a JSON array or NDJSON (one JSON document
+per line, ``Content-Type: application/x-ndjson``); some also accept CSV
+with a header row (``Content-Type: text/csv``). NDJSON and CSV bodies are
+parsed as they arrive, so a large upload never has to fit in memory.
+"""
+import csv
+import json
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_CONTENT_TYPES = ("text/csv", "application/csv")
+
+
+class InvalidBodyError(ValueError):
+    pass
+
+
+def _content_type(request) -> str:
+    return request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+
+def is_ndjson(request) -> bool:
+    return _content_type(request) in NDJSON_CONTENT_TYPES
+
+
+def is_csv(request) -> bool:
+    return _content_type(request) in CSV_CONTENT_TYPES
+
+
+async def iter_lines(request):
+    """Yield the decoded lines of the request body as they are received."""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8")
+    if buffer:
+        yield buffer.decode("utf-8")
+
+
+async def iter_records(request):
+    """
+    Yield ``(index, record, error)`` for each record of a JSON array or
+    NDJSON body. ``error`` is a message for NDJSON lines that aren't valid
+    JSON, in which case ``record`` is None. An invalid JSON array raises
+    InvalidBodyError, since no record can be recovered from it.
+    """
+    if is_ndjson(request):
+        index = 0
+        async for line in iter_lines(request):
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line), None
+            except ValueError as e:
+                yield index, None, f"Invalid JSON: {e}"
+            index += 1
+        return
+
+    try:
+        records = json.loads(await request.body())
+    except ValueError as e:
+        raise InvalidBodyError(f"Invalid JSON: {e}")
+    if not isinstance(records, list):
+        raise InvalidBodyError("Expected a JSON array or an NDJSON body")
+    for index, record in enumerate(records):
+        yield index, record, None
+
+
+async def iter_csv_records(request):
+    """
+    Yield ``(index, record, error)`` for each row of a CSV body, with the
+    first line as header. Rows are parsed line by line, so quoted values
+    can't contain newlines.
+    """
+    header = None
+    index = 0
+    async for line in iter_lines(request):
+        line = line.rstrip("\r")
+        if not line.strip():
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield index, None, f"Expected {len(header)} columns, got {len(values)}"
+        else:
+            yield index, dict(zip(header, values)), None
+        index += 1
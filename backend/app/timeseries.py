@@ -0,0 +1,208 @@
+"""Sales time series for charts (/stats/timeseries).
+
+Sale count, revenue and units per day, week (starting on Monday) or month,
+optionally split by seller or item. Buckets are computed in SQL on
+SQLite and PostgreSQL; on other databases the facts are fetched as
+columns and aggregated with NumPy. The ungrouped series is read from
+daily_sales_rollup, so its cost doesn't depend on the number of sales.
+"""
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+from sqlalchemy import Date, String, cast, func, literal, null, select, type_coerce
+
+from . import models
+
+BUCKETS = ("day", "week", "month")
+GROUP_BYS = ("none", "seller", "item")
+
+
+def _sql_bucket(dialect: str, column, bucket: str):
+    """SQL expression truncating ``column`` to the bucket, or None."""
+    if dialect == "sqlite":
+        if bucket == "day":
+            return func.date(column)
+        if bucket == "week":
+            # Lunes de la semana: el próximo domingo menos seis días
+            return func.date(column, "weekday 0", "-6 days")
+        return func.strftime("%Y-%m-01", column)
+    if dialect == "postgresql":
+        return cast(func.date_trunc(bucket, column), Date)
+    return None
+
+
+def _created_between(dialect: str, start: date, end: date):
+    column = models.Sale.created_at
+    if dialect == "sqlite":
+        # Comparar el texto guardado, como en pagination._sort_key
+        column = type_coerce(column, String)
+        return (column >= start.isoformat()) & (column < (end + timedelta(days=1)).isoformat())
+    return ((column >= datetime.combine(start, time.min))
+            & (column < datetime.combine(end + timedelta(days=1), time.min)))
+
+
+def _facts(dialect: str, start: date, end: date, group_by: str):
+    """
+    SELECT of the facts to aggregate, with columns ``period``, ``key``,
+    ``sales`` (a count to add up, or a sale id to count once per group for
+    items), ``revenue`` and ``units``.
+    """
+    if group_by == "none":
+        rollup = models.DailySalesRollup
+        return select(
+            rollup.day.label("period"),
+            null().label("key"),
+            rollup.sale_count.label("sales"),
+            rollup.revenue.label("revenue"),
+            rollup.units.label("units"),
+        ).where(rollup.day >= start, rollup.day <= end)
+
+    if group_by == "seller":
+        units = select(func.coalesce(func.sum(models.SaleItem.quantity), 0)).where(
+            models.SaleItem.sale_id == models.Sale.id).scalar_subquery()
+        return select(
+            models.Sale.created_at.label("period"),
+            models.Sale.user_id.label("key"),
+            literal(1).label("sales"),
+            models.Sale.total_amount.label("revenue"),
+            units.label("units"),
+        ).where(_created_between(dialect, start, end))
+
+    return select(
+        models.Sale.created_at.label("period"),
+        models.SaleItem.item_id.label("key"),
+        models.SaleItem.sale_id.label("sales"),
+        models.SaleItem.subtotal.label("revenue"),
+        models.SaleItem.quantity.label("units"),
+    ).join(models.Sale, models.Sale.id == models.SaleItem.sale_id).where(
+        _created_between(dialect, start, end))
+
+
+def _aggregate_sql(db, facts, bucket_expression, group_by: str):
+    facts = facts.subquery()
+    bucket = bucket_expression(facts.c.period).label("bucket")
+    if group_by == "item":
+        sales = func.count(facts.c.sales.distinct())
+    else:
+        sales = func.sum(facts.c.sales)
+    rows = db.execute(
+        select(bucket, facts.c.key, sales, func.sum(facts.c.revenue), func.sum(facts.c.units))
+        .group_by(bucket, facts.c.key)
+        .order_by(bucket, facts.c.key)
+    ).all()
+    return [
+        {
+            "bucket": row[0] if isinstance(row[0], date) else date.fromisoformat(row[0]),
+            "key": row[1],
+            "sale_count": int(row[2] or 0),
+            "revenue": float(row[3] or 0),
+            "units": int(row[4] or 0),
+        }
+        for row in rows
+    ]
+
+
+def _numpy_buckets(periods, bucket: str):
+    days = periods.astype("datetime64[D]")
+    if bucket == "day":
+        return days
+    if bucket == "week":
+        # El día 0 (1970-01-01) fue jueves: se retrocede hasta el lunes
+        return days - (days.astype(np.int64) + 3) % 7
+    return days.astype("datetime64[M]").astype("datetime64[D]")
+
+
+def _aggregate_numpy(db, facts, bucket: str, group_by: str):
+    rows = db.execute(facts).all()
+    if not rows:
+        return []
+    period, key, sales, revenue, units = zip(*rows)
+
+    periods = np.array(
+        [p.replace(tzinfo=None) if isinstance(p, datetime) else p for p in period],
+        dtype="datetime64[us]")
+    buckets = _numpy_buckets(periods, bucket).astype(np.int64)
+    keys = np.array([-1 if k is None else k for k in key], dtype=np.int64)
+    revenue = np.array(revenue, dtype=np.float64)
+    units = np.array(units, dtype=np.int64)
+
+    groups, inverse = np.unique(np.stack([buckets, keys]), axis=1, return_inverse=True)
+    inverse = inverse.ravel()
+    size = groups.shape[1]
+    if group_by == "item":
+        # Ventas distintas por grupo: tripletas únicas (bucket, item, venta)
+        triples = np.unique(np.stack([buckets, keys, np.array(sales, dtype=np.int64)]), axis=1)
+        _, sale_counts = np.unique(triples[:2], axis=1, return_counts=True)
+    else:
+        sale_counts = np.bincount(inverse, weights=np.array(sales, dtype=np.float64),
+                                  minlength=size)
+    revenue_sums = np.bincount(inverse, weights=revenue, minlength=size)
+    unit_sums = np.bincount(inverse, weights=units, minlength=size)
+
+    bucket_dates = groups[0].astype("datetime64[D]").tolist()
+    return [
+        {
+            "bucket": bucket_dates[i],
+            "key": None if groups[1, i] == -1 else int(groups[1, i]),
+            "sale_count": int(sale_counts[i]),
+            "revenue": float(revenue_sums[i]),
+            "units": int(unit_sums[i]),
+        }
+        for i in range(size)
+    ]
+
+
+def _labels(db, group_by: str, keys):
+    if group_by == "seller":
+        column, label = models.User.id, models.User.username
+    else:
+        column, label = models.Item.id, models.Item.name
+    return dict(db.execute(select(column, label).where(column.in_(keys))).all())
+
+
+def sales_timeseries(db, start: date, end: date, bucket: str = "day",
+                     group_by: str = "none", method: str = None):
+    """
+    Sales per bucket between two days (inclusive, UTC).
+
+    Args:
+        db: Database session
+        start: First day
+        end: Last day
+        bucket: "day", "week" or "month"
+        group_by: "none", "seller" or "item"
+        method: "sql" or "numpy"; by default SQL when the dialect supports it
+
+    Returns:
+        List of dicts (bucket, key, label, sale_count, revenue, units)
+        ordered by bucket and key. Buckets without sales are omitted.
+    """
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    if group_by not in GROUP_BYS:
+        raise ValueError(f"group_by must be one of {', '.join(GROUP_BYS)}")
+    if start > end:
+        raise ValueError("from must not be after to")
+
+    dialect = db.get_bind().dialect.name
+    facts = _facts(dialect, start, end, group_by)
+    sql_supported = _sql_bucket(dialect, facts.selected_columns.period, bucket) is not None
+    if method is None:
+        method = "sql" if sql_supported else "numpy"
+
+    if method == "sql":
+        if not sql_supported:
+            raise ValueError(f"SQL buckets are not supported on {dialect}")
+        points = _aggregate_sql(
+            db, facts, lambda column: _sql_bucket(dialect, column, bucket), group_by)
+    elif method == "numpy":
+        points = _aggregate_numpy(db, facts, bucket, group_by)
+    else:
+        raise ValueError("method must be sql or numpy")
+
+    labels = {}
+    if group_by != "none":
+        labels = _labels(db, group_by, {p["key"] for p in points if p["key"] is not None})
+    for point in points:
+        point["label"] = labels.get(point["key"])
+    return points
@@ -0,0 +1,106 @@
+"""Analytics store: load time, memory and query latency.
+
+The load and the SQL comparison use a seeded database; the memory and
+latency figures use synthetic lines appended straight to the store.
+
+    python -m benchmarks.bench_analytics --sales 200000 --lines 10000000
+"""
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.analytics import COLUMNS, SalesFactStore
+from app.database import create_db_engine
+
+from .common import report, seed_database, temp_database_path, timer
+
+
+def synthetic_lines(count, days=730, items=50000, customers=100000, seed=42):
+    """Random lines, in sales of 1 to 5 consecutive lines."""
+    rng = np.random.default_rng(seed)
+    sale_id = np.cumsum(rng.random(count) < 1 / 3).astype(np.int32)
+    sales = int(sale_id[-1]) + 1
+    per_sale = {
+        "customer_id": rng.integers(1, customers + 1, sales),
+        "user_id": rng.integers(1, 6, sales),
+        "day": np.sort(rng.integers(0, days, sales)) + _day(date.today() - timedelta(days=days)),
+    }
+    quantity = rng.integers(1, 10, count)
+    unit_price = np.round(rng.uniform(1, 500, count), 2)
+    columns = {
+        "sale_id": sale_id,
+        "item_id": rng.integers(1, items + 1, count),
+        "quantity": quantity,
+        "unit_price": unit_price,
+        "subtotal": quantity * unit_price,
+        **{name: values[sale_id] for name, values in per_sale.items()},
+    }
+    return {name: columns[name].astype(dtype) for name, dtype in COLUMNS.items()}
+
+
+def _day(value):
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=200000)
+    parser.add_argument("--lines", type=int, default=10000000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), sales=args.sales)
+    session_factory = sessionmaker(autoflush=False,
+                                   bind=create_db_engine(f"sqlite:///{path}"))
+    store = SalesFactStore()
+    with session_factory() as db:
+        with timer() as t:
+            store.load(db)
+        report(f"load {len(store)} lines from the database", 1, t["elapsed"])
+
+        with timer() as t:
+            for _ in range(args.repeat):
+                db.query(
+                    models.SaleItem.item_id, func.sum(models.SaleItem.subtotal)
+                ).group_by(models.SaleItem.item_id).order_by(
+                    func.sum(models.SaleItem.subtotal).desc()).limit(10).all()
+        report("SQL: top 10 items by revenue", args.repeat, t["elapsed"])
+    with timer() as t:
+        for _ in range(args.repeat):
+            store.aggregate("item", order_by="revenue", limit=10)
+    report("store: top 10 items by revenue", args.repeat, t["elapsed"])
+
+    store = SalesFactStore()
+    lines = synthetic_lines(args.lines)
+    with timer() as t:
+        store.append(lines)
+    report(f"append {args.lines} synthetic lines", 1, t["elapsed"])
+    print(f"memory: {store.nbytes / 2**20:.0f} MiB "
+          f"({store.nbytes / len(store):.0f} bytes per line)")
+
+    last_month = date.today() - timedelta(days=30)
+    queries = {
+        "totals, all time": dict(),
+        "totals, last 30 days": dict(start=last_month),
+        "top 10 items by revenue": dict(group_by="item", limit=10),
+        "top 10 customers by sales": dict(group_by="customer", order_by="sales", limit=10),
+        "per seller, last 30 days": dict(group_by="seller", start=last_month),
+        "per day, all time": dict(group_by="day"),
+    }
+    for label, kwargs in queries.items():
+        with timer() as t:
+            for _ in range(args.repeat):
+                store.aggregate(**kwargs)
+        report(label, args.repeat, t["elapsed"])
+
+    with timer() as t:
+        store.remove_sales([1, 2, 3])
+    report("remove 3 sales", 1, t["elapsed"])
+
+
+if __name__ == "__main__":
+    main()
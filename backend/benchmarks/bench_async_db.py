@@ -0,0 +1,86 @@
+"""Compare throughput of the sync and async database stacks.
+
+Runs the same CRUD calls concurrently, once through ``crud`` on a thread
+pool sized like Starlette's default (40 threads) and once through
+``crud_async`` on the event loop.
+
+    python -m benchmarks.bench_async_db --requests 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, crud_async
+
+from .common import report, seed_database, temp_database_path, timer
+
+THREADPOOL_SIZE = 40
+
+
+def run_sync(path, operation, requests):
+    engine = create_engine(f"sqlite:///{path}",
+                           connect_args={"check_same_thread": False})
+    session_factory = sessionmaker(autoflush=False, bind=engine)
+
+    def call(i):
+        with session_factory() as db:
+            operation(db, i)
+
+    # crud.get_sales prints every sale; keep that out of the terminal
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=THREADPOOL_SIZE) as pool, timer() as t:
+            list(pool.map(call, range(requests)))
+    engine.dispose()
+    return t["elapsed"]
+
+
+async def run_async(path, operation, requests, concurrency):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(engine, autoflush=False,
+                                         expire_on_commit=False)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(i):
+        async with semaphore, session_factory() as db:
+            await operation(db, i)
+
+    with timer() as t:
+        await asyncio.gather(*(call(i) for i in range(requests)))
+    await engine.dispose()
+    return t["elapsed"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--sales", type=int, default=5000)
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), sales=args.sales)
+    items = 500
+
+    cases = [
+        ("get_item",
+         lambda db, i: crud.get_item(db, i % items + 1),
+         lambda db, i: crud_async.get_item(db, i % items + 1)),
+        ("get_sales(limit=20)",
+         lambda db, i: crud.get_sales(db, skip=i % 100, limit=20),
+         lambda db, i: crud_async.get_sales(db, skip=i % 100, limit=20)),
+    ]
+    for name, sync_op, async_op in cases:
+        elapsed = run_sync(path, sync_op, args.requests)
+        report(f"sync  {name}", args.requests, elapsed)
+        elapsed = asyncio.run(
+            run_async(path, async_op, args.requests, args.concurrency))
+        report(f"async {name}", args.requests, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Sales ingestion rate: one create_sale per sale vs create_sales_bulk.
+
+    python -m benchmarks.bench_bulk_sales --sales 5000 --chunk-size 500
+"""
+import argparse
+import random
+
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, schemas
+from app.database import create_db_engine
+
+from .common import report, seed_database, temp_database_path, timer
+
+
+def random_sales(count, customers, items, seed=7):
+    rng = random.Random(seed)
+    return [
+        schemas.SaleCreate(
+            customer_id=rng.randint(1, customers),
+            total_amount=10,
+            items=[schemas.SaleItemCreate(item_id=item_id, quantity=1, unit_price=2)
+                   for item_id in rng.sample(range(1, items + 1), rng.randint(1, 5))],
+        )
+        for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
+    customers, items = 100, 500
+    sales = random_sales(args.sales, customers, items)
+
+    path = seed_database(temp_database_path(), customers=customers, items=items, sales=0)
+    session_factory = sessionmaker(autoflush=False,
+                                   bind=create_db_engine(f"sqlite:///{path}"))
+    single = sales[:max(args.sales // 10, 1)]
+    with timer() as t:
+        for sale in single:
+            with session_factory() as db:
+                crud.create_sale(db, sale, user_id=1)
+    report("create_sale, one per request", len(single), t["elapsed"])
+
+    path = seed_database(temp_database_path(), customers=customers, items=items, sales=0)
+    session_factory = sessionmaker(autoflush=False,
+                                   bind=create_db_engine(f"sqlite:///{path}"))
+    indexed = list(enumerate(sales))
+    created = 0
+    with timer() as t, session_factory() as db:
+        for start in range(0, len(indexed), args.chunk_size):
+            results = crud.create_sales_bulk(
+                db, indexed[start:start + args.chunk_size], user_id=1)
+            created += sum(1 for r in results if r["status"] == "created")
+    report(f"create_sales_bulk, chunks of {args.chunk_size}", created, t["elapsed"])
+
+
+if __name__ == "__main__":
+    main()
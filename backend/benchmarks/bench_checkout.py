@@ -0,0 +1,70 @@
+"""Checkout latency by basket size, and correctness under parallel workers.
+
+    python -m benchmarks.bench_checkout --workers 16
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models, schemas
+from app.database import create_db_engine
+
+from .common import seed_database, temp_database_path, timer
+
+REPEAT = 20
+
+
+def basket(item_ids, quantity=1):
+    return schemas.SaleCreate(
+        customer_id=1,
+        total_amount=len(item_ids) * quantity,
+        items=[schemas.SaleItemCreate(item_id=i, quantity=quantity, unit_price=1)
+               for i in item_ids],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--stock", type=int, default=100)
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), items=1000, sales=1000)
+    engine = create_db_engine(f"sqlite:///{path}")
+    session_factory = sessionmaker(autoflush=False, bind=engine)
+
+    print(f"{'lines':>6} {'ms/sale':>10}")
+    for size in (1, 10, 50, 200):
+        with timer() as t:
+            for i in range(REPEAT):
+                with session_factory() as db:
+                    crud.create_sale(db, basket(range(1, size + 1)), user_id=1)
+        print(f"{size:>6} {t['elapsed'] / REPEAT * 1000:>10.2f}")
+
+    # Many workers race for the last units of one item
+    with session_factory() as db:
+        db.query(models.Item).filter(models.Item.id == 1).update(
+            {"stock": args.stock})
+        db.commit()
+
+    def buy(_):
+        with session_factory() as db:
+            try:
+                crud.create_sale(db, basket([1]), user_id=1)
+                return True
+            except crud.InsufficientStockError:
+                return False
+
+    attempts = args.stock * 2
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        sold = sum(pool.map(buy, range(attempts)))
+    with session_factory() as db:
+        stock = crud.get_item(db, 1).stock
+    print(f"{attempts} parallel checkouts for {args.stock} units: "
+          f"{sold} sold, {stock} left in stock")
+    assert sold == args.stock and stock == 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Polling /items/: full responses vs If-None-Match revalidation (304).
+
+    python -m benchmarks.bench_conditional_get --items 5000 --limit 500
+"""
+import argparse
+from typing import List
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app import auth, conditional, crud, schemas
+from app.database import create_db_engine, get_db
+
+from .common import report, seed_database, temp_database_path, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), items=args.items, sales=10)
+    engine = create_db_engine(f"sqlite:///{path}")
+    session_factory = sessionmaker(autoflush=False, bind=engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    def get_bench_db():
+        with session_factory() as db:
+            yield db
+
+    # La misma ruta que /items/ en app.main, sin el resto de la aplicación
+    app = FastAPI()
+
+    @app.get("/items/", response_model=List[schemas.Item])
+    def read_items(limit: int = 100, db=Depends(get_db),
+                   current_user=Depends(auth.get_current_active_user),
+                   _etag: None = Depends(conditional.etag("items"))):
+        return crud.get_items_page(db, limit=limit)[0]
+
+    app.dependency_overrides[get_db] = get_bench_db
+    token = auth.create_access_token(data={"sub": "user1", "ver": 0})
+    headers = {"Authorization": f"Bearer {token}"}
+    url = f"/items/?limit={args.limit}"
+
+    with TestClient(app) as client:
+        first = client.get(url, headers=headers)
+        etag = first.headers["ETag"]
+        for label, request_headers in [
+            ("full response", headers),
+            ("If-None-Match (304)", {**headers, "If-None-Match": etag}),
+        ]:
+            statements.clear()
+            received = 0
+            with timer() as t:
+                for _ in range(args.requests):
+                    response = client.get(url, headers=request_headers)
+                    received += len(response.content)
+            report(label, args.requests, t["elapsed"])
+            print(f"  status {response.status_code}, "
+                  f"{received / args.requests / 1024:.1f} KiB and "
+                  f"{len(statements) / args.requests:.2f} queries per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Configuration reads: one query per read vs the in-process cache.
+
+    python -m benchmarks.bench_config_cache --reads 10000
+"""
+import argparse
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app import config_cache, crud
+from app.database import create_db_engine
+
+from .common import report, seed_database, temp_database_path, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reads", type=int, default=10000)
+    parser.add_argument("--poll-seconds", type=float, default=0.5)
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), sales=10)
+    engine = create_db_engine(f"sqlite:///{path}")
+    session_factory = sessionmaker(autoflush=False, bind=engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    with session_factory() as db:
+        crud.create_or_update_configuration(db, "low_stock_threshold", "5")
+
+        statements.clear()
+        with timer() as t:
+            for _ in range(args.reads):
+                int(crud.get_configuration(db, "low_stock_threshold").value)
+        report(f"query per read ({len(statements)} queries)", args.reads, t["elapsed"])
+
+        statements.clear()
+        with timer() as t:
+            for _ in range(args.reads):
+                crud.get_low_stock_threshold(db)
+        report(f"cached ({len(statements)} queries)", args.reads, t["elapsed"])
+
+        # Otro proceso: su propia caché, que solo ve la versión en la base
+        other = config_cache.ConfigCache(poll_seconds=args.poll_seconds)
+        other.get(db, "low_stock_threshold")
+        crud.create_or_update_configuration(db, "low_stock_threshold", "9")
+        written = time.monotonic()
+        while other.get(db, "low_stock_threshold") != 9:
+            time.sleep(0.01)
+        print(f"another process saw the change after {time.monotonic() - written:.2f} s "
+              f"(poll interval {args.poll_seconds} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Account statement of a big customer: the old per-sale calls vs
+/customers/{id}/statement.
+
+    python -m benchmarks.bench_customer_statement --customers 10 --sales 200000
+"""
+import argparse
+import random
+
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, schemas
+from app.database import create_db_engine
+
+from .common import report, seed_database, temp_database_path, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=10)
+    parser.add_argument("--sales", type=int, default=200000)
+    parser.add_argument("--payments", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), customers=args.customers, sales=args.sales)
+    session_factory = sessionmaker(autoflush=False,
+                                   bind=create_db_engine(f"sqlite:///{path}"))
+    rng = random.Random(42)
+    customer_id = 1
+
+    with session_factory() as db:
+        for _ in range(args.payments):
+            crud.create_payment(db, schemas.PaymentCreate(
+                customer_id=customer_id, amount=round(rng.uniform(1, 500), 2)))
+
+        with timer() as t:
+            # Lo que hacía AccountStatement.jsx: ventas pendientes, pagos y
+            # una llamada a /sales/{id} por venta abierta
+            pending = crud.get_pending_sales_by_customer(db, customer_id, limit=args.page_size)
+            crud.get_customer_payments(db, customer_id, limit=args.page_size)
+            for sale in pending:
+                crud.get_sale(db, sale.id)
+        report(f"pending + payments + {len(pending)} sales", 1, t["elapsed"])
+
+        with timer() as t:
+            entries, cursor = crud.get_customer_statement(
+                db, customer_id, limit=args.page_size)
+        report("statement, first page", 1, t["elapsed"])
+
+        pages = 1
+        with timer() as t:
+            while cursor:
+                entries, cursor = crud.get_customer_statement(
+                    db, customer_id, limit=args.page_size, cursor=cursor)
+                pages += 1
+        report(f"statement, remaining pages", pages - 1, t["elapsed"])
+        print(f"closing balance {entries[-1]['balance']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
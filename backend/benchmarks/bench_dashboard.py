@@ -0,0 +1,57 @@
+"""Dashboard load: the old list downloads vs /dashboard widgets.
+
+    python -m benchmarks.bench_dashboard --sales 200000 --repeat 10
+"""
+import argparse
+import asyncio
+
+from sqlalchemy.orm import sessionmaker
+
+from app import dashboard, models
+from app.database import create_db_engine
+
+from .common import report, seed_database, temp_database_path, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=200000)
+    parser.add_argument("--customers", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), customers=args.customers, items=args.items,
+                         sales=args.sales)
+    session_factory = sessionmaker(autoflush=False,
+                                   bind=create_db_engine(f"sqlite:///{path}"))
+    print(f"{args.sales} sales, {args.customers} customers, {args.items} items")
+
+    with session_factory() as db:
+        with timer() as t:
+            for _ in range(args.repeat):
+                # Lo que hacía Dashboard.jsx: listas completas para contarlas
+                db.query(models.Customer).all()
+                db.query(models.Item).all()
+                sales = db.query(models.Sale).all()
+                sum(sale.total_amount for sale in sales)
+                db.expunge_all()
+        report("full lists (customers, items, sales)", args.repeat, t["elapsed"])
+
+        with timer() as t:
+            for _ in range(args.repeat):
+                for widget in dashboard.WIDGETS.values():
+                    widget(db)
+        report("widgets, one session, sequential", args.repeat, t["elapsed"])
+
+    async def concurrent():
+        for _ in range(args.repeat):
+            await dashboard.build_dashboard(session_factory)
+
+    with timer() as t:
+        asyncio.run(concurrent())
+    report("widgets, one session each, concurrent", args.repeat, t["elapsed"])
+
+
+if __name__ == "__main__":
+    main()
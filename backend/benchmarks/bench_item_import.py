@@ -0,0 +1,66 @@
+"""Catalog import rate: one create_item per row vs chunked upsert_items.
+
+    python -m benchmarks.bench_item_import --items 100000 --chunk-size 1000
+"""
+import argparse
+
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, importer
+from app.database import create_db_engine
+
+from .common import report, seed_database, temp_database_path, timer
+
+
+def catalog_records(count, price=10):
+    return [
+        {"name": f"Producto {i}", "sku": f"SKU-{i:07d}", "description": "",
+         "price": str(price), "stock": "25"}
+        for i in range(count)
+    ]
+
+
+def import_records(session_factory, records, key, chunk_size):
+    item_import = importer.ItemImport(key=key, chunk_size=chunk_size)
+    with session_factory() as db:
+        for index, record in enumerate(records):
+            chunk = item_import.add(index, record)
+            if chunk:
+                item_import.write(db, chunk)
+        item_import.write(db, item_import.take_chunk())
+    return item_import.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), customers=0, items=0, sales=0)
+    session_factory = sessionmaker(autoflush=False,
+                                   bind=create_db_engine(f"sqlite:///{path}"))
+    single = [importer.item_from_record(r)
+              for r in catalog_records(max(args.items // 100, 1))]
+    with timer() as t:
+        for item in single:
+            with session_factory() as db:
+                crud.create_item(db, item)
+    report("create_item, one per request", len(single), t["elapsed"])
+
+    for key in importer.IMPORT_KEYS:
+        path = seed_database(temp_database_path(), customers=0, items=0, sales=0)
+        session_factory = sessionmaker(autoflush=False,
+                                       bind=create_db_engine(f"sqlite:///{path}"))
+        with timer() as t:
+            result = import_records(session_factory, catalog_records(args.items),
+                                    key, args.chunk_size)
+        report(f"import by {key}, insert", result["inserted"], t["elapsed"])
+        with timer() as t:
+            result = import_records(session_factory, catalog_records(args.items, price=12),
+                                    key, args.chunk_size)
+        report(f"import by {key}, update", result["updated"], t["elapsed"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Login burst: bcrypt on the event loop vs the password pool, with the
+latency of a cheap request served while the logins are in flight.
+
+    BCRYPT_ROUNDS=12 python -m benchmarks.bench_login --logins 20
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import Depends, FastAPI, Form, HTTPException
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+
+from app import auth, crud, models, passwords
+from app.database import create_db_engine, get_db
+
+from .common import seed_database, temp_database_path
+
+
+def build_app(session_factory):
+    app = FastAPI()
+
+    def get_bench_db():
+        with session_factory() as db:
+            yield db
+
+    @app.post("/token-inline")
+    async def login_inline(username: str = Form(), password: str = Form(),
+                           db=Depends(get_db)):
+        # Lo que hacía /token: verificar bcrypt dentro del event loop. La
+        # conexión se suelta igual que en auth.authenticate_user; si no, una
+        # ráfaga mayor que el pool se queda bloqueada en el checkout
+        user = crud.get_user_by_username(db, username)
+        if user:
+            db.expunge(user)
+        db.rollback()
+        if not user or not passwords.pwd_context.verify(password, user.hashed_password):
+            raise HTTPException(status_code=401)
+        return {"id": user.id}
+
+    @app.post("/token")
+    async def login(username: str = Form(), password: str = Form(), db=Depends(get_db)):
+        user = await auth.authenticate_user(db, username, password)
+        if not user:
+            raise HTTPException(status_code=401)
+        return {"id": user.id}
+
+    @app.get("/ping")
+    async def ping():
+        return {}
+
+    app.dependency_overrides[get_db] = get_bench_db
+    return app
+
+
+async def burst(client, url, logins):
+    # Mientras el event loop está bloqueado no se atiende ningún ping
+    served_at = []
+    running = True
+
+    async def pinger():
+        while running:
+            (await client.get("/ping")).raise_for_status()
+            served_at.append(time.perf_counter())
+            await asyncio.sleep(0.005)
+
+    task = asyncio.create_task(pinger())
+    start = time.perf_counter()
+    responses = await asyncio.gather(*[
+        client.post(url, data={"username": f"user{i % 5}", "password": "secret"})
+        for i in range(logins)
+    ])
+    end = time.perf_counter()
+    running = False
+    await task
+    for response in responses:
+        response.raise_for_status()
+    times = [start] + [t for t in served_at if t <= end] + [end]
+    return end - start, len(times) - 2, max(b - a for a, b in zip(times, times[1:]))
+
+
+async def run(app, logins):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label, url in [("bcrypt on the event loop", "/token-inline"),
+                           ("password pool", "/token")]:
+            elapsed, pings, stall = await burst(client, url, logins)
+            print(f"{label:<26} {logins / elapsed:7.1f} logins/s  "
+                  f"{pings} pings served during the burst, "
+                  f"longest stall {stall * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=20)
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), sales=10)
+    session_factory = sessionmaker(autoflush=False,
+                                   bind=create_db_engine(f"sqlite:///{path}"))
+    with session_factory() as db:
+        db.execute(update(models.User).values(
+            hashed_password=passwords.hash_password("secret")))
+        db.commit()
+    print(f"BCRYPT_ROUNDS={passwords.BCRYPT_ROUNDS}, HASH_WORKERS={passwords.HASH_WORKERS}")
+
+    asyncio.run(run(build_app(session_factory), args.logins))
+
+
+if __name__ == "__main__":
+    main()
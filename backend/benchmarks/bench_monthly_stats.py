@@ -0,0 +1,56 @@
+"""/stats/monthly cost: aggregate over sales vs read daily_sales_rollup.
+
+    python -m benchmarks.bench_monthly_stats --sales 200000 --repeat 50
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.database import create_db_engine
+
+from .common import report, seed_database, temp_database_path, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), sales=args.sales, max_lines=3)
+    session_factory = sessionmaker(autoflush=False,
+                                   bind=create_db_engine(f"sqlite:///{path}"))
+    print(f"{args.sales} sales over two years")
+
+    with session_factory() as db:
+        one_month_ago = datetime.now() - timedelta(days=30)
+        with timer() as t:
+            for _ in range(args.repeat):
+                db.query(
+                    func.count(models.Sale.id),
+                    func.sum(models.Sale.total_amount)
+                ).filter(models.Sale.created_at >= one_month_ago).first()
+        report("scan sales, last 30 days", args.repeat, t["elapsed"])
+
+        start = datetime.now(timezone.utc).date() - timedelta(days=30)
+        with timer() as t:
+            for _ in range(args.repeat):
+                crud.get_sales_totals(db, start=start)
+        report("daily_sales_rollup, last 30 days", args.repeat, t["elapsed"])
+
+        with timer() as t:
+            for _ in range(args.repeat):
+                db.query(func.count(models.Sale.id), func.sum(models.Sale.total_amount)).first()
+        report("scan sales, all time", args.repeat, t["elapsed"])
+
+        with timer() as t:
+            for _ in range(args.repeat):
+                crud.get_sales_totals(db, start=start - timedelta(days=730))
+        report("daily_sales_rollup, all time", args.repeat, t["elapsed"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Compare OFFSET and keyset (cursor) pagination at increasing depth.
+
+    python -m benchmarks.bench_pagination --customers 200000 --limit 50
+"""
+import argparse
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.pagination import encode_cursor, sort_signature
+
+from .common import seed_database, temp_database_path, timer
+
+REPEAT = 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--customers", type=int, default=200_000)
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), customers=args.customers,
+                         items=10, sales=10)
+    engine = create_engine(f"sqlite:///{path}")
+    db = sessionmaker(bind=engine)()
+    db.execute(select(models.Customer.id).limit(1)).all()  # warm up
+
+    print(f"{'page':>8} {'offset ms':>10} {'cursor ms':>10}")
+    last_page = args.customers // args.limit - 1
+    for page in (1, 10, 100, 1000, last_page):
+        skip = (page - 1) * args.limit
+        with timer() as t:
+            for _ in range(REPEAT):
+                rows = crud.get_customers(db, skip=skip, limit=args.limit)
+        offset_ms = t["elapsed"] / REPEAT * 1000
+
+        # Cursor pointing just before the same page
+        cursor = None
+        if skip:
+            previous = crud.get_customers(db, skip=skip - 1, limit=1)[0]
+            cursor = encode_cursor(
+                [previous.name, previous.id],
+                sort=sort_signature([models.Customer.name, models.Customer.id]))
+        with timer() as t:
+            for _ in range(REPEAT):
+                page_rows, _ = crud.get_customers_page(
+                    db, limit=args.limit, cursor=cursor)
+        cursor_ms = t["elapsed"] / REPEAT * 1000
+
+        assert [c.id for c in rows] == [c.id for c in page_rows]
+        print(f"{page:>8} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Authenticated request latency: user query per request vs the principal cache.
+
+    python -m benchmarks.bench_principal_cache --requests 5000
+"""
+import argparse
+import statistics
+import time
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app import auth, principal_cache
+from app.database import create_db_engine, get_db
+
+from .common import seed_database, temp_database_path
+
+
+def _latencies(client, headers, requests):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        client.get("/ping", headers=headers).raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _report(label, latencies, queries):
+    cuts = statistics.quantiles(latencies, n=100)
+    print(f"{label:<28} p50 {cuts[49] * 1000:7.3f} ms  p99 {cuts[98] * 1000:7.3f} ms  "
+          f"{queries / len(latencies):.2f} queries/request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), sales=10)
+    engine = create_db_engine(f"sqlite:///{path}")
+    session_factory = sessionmaker(autoflush=False, bind=engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    def get_bench_db():
+        with session_factory() as db:
+            yield db
+
+    # Un endpoint barato: solo la autenticación cuesta algo
+    app = FastAPI()
+
+    @app.get("/ping")
+    def ping(current_user=Depends(auth.get_current_active_user)):
+        return {"id": current_user.id}
+
+    app.dependency_overrides[get_db] = get_bench_db
+    token = auth.create_access_token(data={"sub": "user1", "ver": 0})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with TestClient(app) as client:
+        for label, cache in [
+            # ttl 0: cada petición vuelve a leer el usuario, como antes
+            ("query per request", principal_cache.PrincipalCache(ttl_seconds=0)),
+            ("principal cache", principal_cache.PrincipalCache()),
+        ]:
+            auth.principal_cache = cache
+            _latencies(client, headers, 100)
+            statements.clear()
+            _report(label, _latencies(client, headers, args.requests), len(statements))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""/items/reorder-forecast: demand matrix build, incremental refresh and
+forecast, against one demand query per item.
+
+    python -m benchmarks.bench_reorder_forecast --items 100000 --sales 500000
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, forecast, models, schemas
+from app.database import create_db_engine
+
+from .common import report, seed_database, temp_database_path, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--sales", type=int, default=500000)
+    parser.add_argument("--new-sales", type=int, default=1000)
+    parser.add_argument("--sample", type=int, default=200,
+                        help="Items queried one by one to extrapolate the per-item approach")
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), items=args.items, sales=args.sales)
+    session_factory = sessionmaker(autoflush=False,
+                                   bind=create_db_engine(f"sqlite:///{path}"))
+    print(f"{args.items} items, {args.sales} sales over two years")
+
+    with session_factory() as db:
+        start = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=28)
+        with timer() as t:
+            for item_id in range(1, args.sample + 1):
+                db.query(func.coalesce(func.sum(models.SaleItem.quantity), 0)).join(
+                    models.Sale).filter(models.SaleItem.item_id == item_id,
+                                        models.Sale.created_at >= start).scalar()
+        per_item = t["elapsed"] / args.sample
+        report(f"one query per item ({args.sample} items)", args.sample, t["elapsed"])
+        print(f"  extrapolated to {args.items} items: {per_item * args.items:.1f} s")
+
+        with timer() as t:
+            forecast.reorder_forecast(db)
+        report("forecast, cold (builds the matrix)", 1, t["elapsed"])
+        with timer() as t:
+            forecast.reorder_forecast(db)
+        report("forecast, warm", 1, t["elapsed"])
+
+        new_sales = [
+            (index, schemas.SaleCreate(customer_id=1, total_amount=10, items=[
+                schemas.SaleItemCreate(item_id=index % args.items + 1, quantity=2,
+                                       unit_price=5)]))
+            for index in range(args.new_sales)
+        ]
+        crud.create_sales_bulk(db, new_sales, user_id=1)
+        with timer() as t:
+            forecast.reorder_forecast(db)
+        report(f"forecast after {args.new_sales} new sales", 1, t["elapsed"])
+
+        refreshed = forecast.demand_totals(db, forecast.MAX_WINDOW_DAYS)
+        forecast.invalidate()
+        rebuilt = forecast.demand_totals(db, forecast.MAX_WINDOW_DAYS)
+        size = min(len(refreshed[0]), len(rebuilt[0]))
+        same = all(np.array_equal(a[:size], b[:size]) for a, b in zip(refreshed, rebuilt))
+        print(f"incremental refresh matches a rebuild: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Compare the old and current sales listing on a large database.
+
+The old path (reproduced here) joinedloads customer, user, items->item
+and payments in one query, counts all sales, compiles the statement with
+literal binds and prints every sale; the route then logged each sale
+again. The current paths are ``crud.get_sales`` / ``crud.get_sales_page``
+and the flat ``crud.get_sales_summary_page`` behind /sales/summary.
+
+    python -m benchmarks.bench_sales_listing --sales 100000
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import joinedload, sessionmaker
+
+from app import crud, models, schemas
+
+from .common import seed_database, temp_database_path, timer
+
+logger = logging.getLogger("bench")
+
+
+def legacy_get_sales(db, skip=0, limit=100):
+    total_sales = db.query(models.Sale).count()
+    print(f"\nTotal sales in database: {total_sales}")
+    query = (
+        db.query(models.Sale)
+        .options(
+            joinedload(models.Sale.customer),
+            joinedload(models.Sale.user),
+            joinedload(models.Sale.items).joinedload(models.SaleItem.item),
+            joinedload(models.Sale.payments)
+        )
+        .order_by(models.Sale.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )
+    print(f"\nSQL Query: {query.statement.compile(compile_kwargs={'literal_binds': True})}")
+    sales = query.all()
+    for sale in sales:
+        for line in (sale.id, sale.customer.name, sale.user.username,
+                     len(sale.items), sale.total_amount, sale.created_at,
+                     sale.paid, len(sale.payments)):
+            print(line)
+            logger.info(line)
+    return sales
+
+
+def run(session_factory, list_sales, schema, requests, limit):
+    payload = b""
+    with contextlib.redirect_stdout(io.StringIO()), timer() as t:
+        for i in range(requests):
+            with session_factory() as db:
+                sales = list_sales(db, i, limit)
+                payload = json.dumps(
+                    [schema.model_validate(sale).model_dump(mode="json")
+                     for sale in sales]).encode()
+    return t["elapsed"], len(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, stream=io.StringIO())
+
+    path = seed_database(temp_database_path(), customers=1000, items=2000,
+                         sales=args.sales)
+    engine = create_engine(f"sqlite:///{path}")
+    session_factory = sessionmaker(autoflush=False, bind=engine)
+
+    cases = [
+        ("legacy joinedload + count + prints", schemas.Sale,
+         lambda db, i, limit: legacy_get_sales(db, skip=i * limit, limit=limit)),
+        ("crud.get_sales (selectinload)", schemas.Sale,
+         lambda db, i, limit: crud.get_sales(db, skip=i * limit, limit=limit)),
+        ("crud.get_sales_page (first page)", schemas.Sale,
+         lambda db, i, limit: crud.get_sales_page(db, limit=limit)[0]),
+        ("crud.get_sales_summary_page", schemas.SaleSummary,
+         lambda db, i, limit: crud.get_sales_summary_page(db, limit=limit)[0]),
+    ]
+    for name, schema, list_sales in cases:
+        elapsed, size = run(session_factory, list_sales, schema,
+                            args.requests, args.limit)
+        print(f"{name:<40} {elapsed / args.requests * 1000:8.2f} ms/request"
+              f"  {size / 1024:8.1f} KiB/page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Cold start: import time of app.main and time until a uvicorn worker
+answers its first request, migrating in the lifespan or bootstrapped first.
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+from .common import temp_database_path
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _env(path, **extra):
+    return {**os.environ, "DATABASE_URL": f"sqlite:///{path}", **extra}
+
+
+def import_times(path):
+    """Self and cumulative microseconds per module from -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, env=_env(path), capture_output=True, text=True, check=True)
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(own), int(cumulative))
+    return modules
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def first_response(path, auto_migrate, timeout=60):
+    """Seconds from launching uvicorn until GET / answers."""
+    port = _free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=_env(path, AUTO_MIGRATE=auto_migrate),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                    return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("uvicorn did not answer in time")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    # La base no existe: importar app.main no debe crearla
+    path = temp_database_path()
+    modules = import_times(path)
+    print(f"import app.main: {modules['app.main'][1] / 1000:.0f} ms, "
+          f"database created: {os.path.exists(path)}")
+    for name, (own, cumulative) in sorted(
+            modules.items(), key=lambda m: m[1][1], reverse=True)[1:args.top + 1]:
+        print(f"  {name:<40} {cumulative / 1000:8.1f} ms  (self {own / 1000:.1f} ms)")
+
+    bootstrapped = temp_database_path()
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-m", "app.cli", "bootstrap"],
+                   cwd=BACKEND_DIR, env=_env(bootstrapped), check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    print(f"python -m app.cli bootstrap: {time.perf_counter() - start:.2f} s")
+
+    scenarios = [
+        # Cada arranque contra una base nueva: migración y bcrypt del admin
+        ("AUTO_MIGRATE=1, new database", "1", temp_database_path),
+        # Base ya preparada con `python -m app.cli bootstrap`
+        ("AUTO_MIGRATE=0, bootstrapped", "0", lambda: bootstrapped),
+    ]
+
+    for label, auto_migrate, database in scenarios:
+        times = [first_response(database(), auto_migrate) for _ in range(args.runs)]
+        print(f"{label:<32} first response  median {statistics.median(times):.2f} s  "
+              f"min {min(times):.2f} s  ({args.runs} runs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""/stats/* aggregates: 50 concurrent requests with and without the stats
+cache, then the cost of a hit and of an invalidation.
+
+    python -m benchmarks.bench_stats_cache --sales 200000 --concurrency 50
+"""
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, schemas, stats_cache, timeseries
+from app.database import create_db_engine
+
+from .common import report, seed_database, temp_database_path, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=200000)
+    parser.add_argument("--customers", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--hits", type=int, default=100000)
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), customers=args.customers, sales=args.sales)
+    engine = create_db_engine(f"sqlite:///{path}")
+    session_factory = sessionmaker(autoflush=False, bind=engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    print(f"{args.sales} sales, {args.customers} customers")
+
+    today = datetime.now(timezone.utc).date()
+    stats = {
+        "top-debtors": (["customers", crud.CUSTOMER_BALANCES],
+                        lambda db: crud.get_top_debtors(db, limit=5)),
+        "timeseries": (["sales", "sale_items", "items", "users"],
+                       lambda db: timeseries.sales_timeseries(
+                           db, today - timedelta(days=364), today, bucket="month")),
+    }
+
+    for name, (tables, query) in stats.items():
+        for label, cache in [("no cache", None), ("stats cache", stats_cache.StatsCache())]:
+            barrier = threading.Barrier(args.concurrency)
+
+            def request():
+                with session_factory() as db:
+                    barrier.wait()
+                    if cache is None:
+                        return query(db)
+                    return cache.get_or_compute(name, tables, lambda: query(db))
+
+            statements.clear()
+            with timer() as t:
+                with ThreadPoolExecutor(args.concurrency) as pool:
+                    for future in [pool.submit(request) for _ in range(args.concurrency)]:
+                        future.result()
+            report(f"{name}, {label} ({len(statements)} queries)",
+                   args.concurrency, t["elapsed"])
+
+    cache = stats_cache.StatsCache()
+    with session_factory() as db:
+        tables, query = stats["top-debtors"]
+        cache.get_or_compute("top-debtors", tables, lambda: query(db))
+        with timer() as t:
+            for _ in range(args.hits):
+                cache.get_or_compute("top-debtors", tables, lambda: query(db))
+        report("top-debtors, hit", args.hits, t["elapsed"])
+
+        crud.on_tables_changed(cache.invalidate)
+        crud.create_payment(db, schemas.PaymentCreate(customer_id=1, amount=1))
+        print(f"after a payment: {cache.metrics()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""/stats/timeseries cost for a two-year range, SQL buckets vs NumPy.
+
+    python -m benchmarks.bench_timeseries --sales 200000 --repeat 5
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import sessionmaker
+
+from app import timeseries
+from app.database import create_db_engine
+
+from .common import report, seed_database, temp_database_path, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), sales=args.sales)
+    session_factory = sessionmaker(autoflush=False,
+                                   bind=create_db_engine(f"sqlite:///{path}"))
+    end = datetime.now(timezone.utc).date()
+    start = end - timedelta(days=730)
+    print(f"{args.sales} sales over two years")
+
+    with session_factory() as db:
+        for group_by in timeseries.GROUP_BYS:
+            for method in ("sql", "numpy"):
+                with timer() as t:
+                    for _ in range(args.repeat):
+                        points = timeseries.sales_timeseries(
+                            db, start, end, bucket="day", group_by=group_by, method=method)
+                report(f"daily by {group_by}, {method} ({len(points)} pts)",
+                       args.repeat, t["elapsed"])
+
+
+if __name__ == "__main__":
+    main()
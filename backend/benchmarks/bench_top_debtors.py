@@ -0,0 +1,55 @@
+"""/stats/top-debtors cost: GROUP BY over unpaid sales vs customers.balance.
+
+    python -m benchmarks.bench_top_debtors --sales 200000 --repeat 20
+"""
+import argparse
+
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.database import create_db_engine
+
+from .common import report, seed_database, temp_database_path, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=200000)
+    parser.add_argument("--customers", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), customers=args.customers, sales=args.sales)
+    session_factory = sessionmaker(autoflush=False,
+                                   bind=create_db_engine(f"sqlite:///{path}"))
+
+    with session_factory() as db:
+        print(f"{args.sales} sales, {args.customers} customers")
+        with timer() as t:
+            for _ in range(args.repeat):
+                db.query(
+                    models.Customer.id,
+                    models.Customer.name,
+                    func.sum(models.Sale.total_amount)
+                ).join(
+                    models.Sale, models.Customer.id == models.Sale.customer_id
+                ).filter(
+                    models.Sale.paid == False
+                ).group_by(
+                    models.Customer.id, models.Customer.name
+                ).order_by(func.sum(models.Sale.total_amount).desc()).limit(5).all()
+        report("group by unpaid sales, top 5", args.repeat, t["elapsed"])
+
+        with timer() as t:
+            for _ in range(args.repeat):
+                crud.get_top_debtors(db, limit=5)
+        report("customers.balance, top 5", args.repeat, t["elapsed"])
+
+        with timer() as t:
+            drifted = crud.verify_customer_balances(db)
+        report(f"reconcile balances ({len(drifted)} drifted)", 1, t["elapsed"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""/stats/top-products cost: GROUP BY over sale_items vs the item counters.
+
+    python -m benchmarks.bench_top_products --sales 200000 --repeat 20
+"""
+import argparse
+
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, models
+from app.database import create_db_engine
+
+from .common import report, seed_database, temp_database_path, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=200000)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = seed_database(temp_database_path(), items=args.items, sales=args.sales)
+    session_factory = sessionmaker(autoflush=False,
+                                   bind=create_db_engine(f"sqlite:///{path}"))
+
+    with session_factory() as db:
+        lines = db.query(func.count(models.SaleItem.id)).scalar()
+        print(f"{lines} sale lines, {args.items} items")
+        with timer() as t:
+            for _ in range(args.repeat):
+                db.query(
+                    models.Item.id,
+                    models.Item.name,
+                    func.sum(models.SaleItem.quantity),
+                    func.sum(models.SaleItem.quantity * models.SaleItem.unit_price)
+                ).join(
+                    models.SaleItem, models.Item.id == models.SaleItem.item_id
+                ).group_by(
+                    models.Item.id, models.Item.name
+                ).order_by(func.sum(models.SaleItem.quantity).desc()).limit(3).all()
+        report("group by sale_items, top 3", args.repeat, t["elapsed"])
+
+        for limit in (3, 100):
+            with timer() as t:
+                for _ in range(args.repeat):
+                    crud.get_top_products(db, limit=limit)
+            report(f"item counters, top {limit}", args.repeat, t["elapsed"])
+
+        with timer() as t:
+            drifted = crud.verify_item_sales_counters(db)
+        report(f"verify counters ({len(drifted)} drifted)", 1, t["elapsed"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Helpers shared by the benchmark scripts.
+
+Benchmarks never touch ``sql_app.db``: each one builds a throwaway SQLite
+database with synthetic data in a temporary directory.
+"""
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app import crud, models
+
+
+def temp_database_path(name="bench.db"):
+    return os.path.join(tempfile.mkdtemp(prefix="stock-app-bench-"), name)
+
+
+def seed_database(path, customers=100, items=500, sales=1000, max_lines=5, seed=42):
+    """Create the schema in ``path`` and fill it with random data."""
+    rng = random.Random(seed)
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(bind=engine)
+    now = datetime.now()
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"username": f"user{i}", "hashed_password": "x", "is_active": True,
+             "is_admin": i == 0}
+            for i in range(5)
+        ])
+        conn.execute(insert(models.Customer), [
+            {"name": f"Customer {i:06d}", "email": f"customer{i}@example.com",
+             "phone": str(i), "address": f"Street {i}"}
+            for i in range(customers)
+        ])
+        conn.execute(insert(models.Item), [
+            {"name": f"Item {i:06d}", "description": "Benchmark item",
+             "price": round(rng.uniform(1, 500), 2), "stock": 1_000_000}
+            for i in range(items)
+        ])
+
+        sale_rows = []
+        line_rows = []
+        line_id = 0
+        for sale_id in range(1, sales + 1):
+            total = 0.0
+            for item_id in rng.sample(range(1, items + 1), rng.randint(1, max_lines)):
+                quantity = rng.randint(1, 5)
+                unit_price = round(rng.uniform(1, 500), 2)
+                line_id += 1
+                line_rows.append({
+                    "id": line_id, "sale_id": sale_id, "item_id": item_id,
+                    "quantity": quantity, "unit_price": unit_price,
+                    "subtotal": quantity * unit_price,
+                })
+                total += quantity * unit_price
+            sale_rows.append({
+                "id": sale_id,
+                "customer_id": rng.randint(1, customers),
+                "user_id": rng.randint(1, 5),
+                "total_amount": total,
+                "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 730)),
+                "paid": rng.random() < 0.7,
+            })
+            if len(line_rows) >= 50_000:
+                conn.execute(insert(models.Sale), sale_rows)
+                conn.execute(insert(models.SaleItem), line_rows)
+                sale_rows, line_rows = [], []
+        if sale_rows:
+            conn.execute(insert(models.Sale), sale_rows)
+        if line_rows:
+            conn.execute(insert(models.SaleItem), line_rows)
+
+    # Tablas derivadas que crud mantiene al vender
+    with Session(engine) as db:
+        crud.rebuild_sales_rollup(db)
+        crud.rebuild_item_sales_counters(db)
+        crud.rebuild_customer_balances(db)
+
+    engine.dispose()
+    return path
+
+
+@contextmanager
+def timer():
+    result = {}
+    start = time.perf_counter()
+    yield result
+    result["elapsed"] = time.perf_counter() - start
+
+
+def report(label, operations, elapsed):
+    print(f"{label:<40} {operations:>8} ops  {elapsed:8.3f} s  "
+          f"{operations / elapsed:10.1f} ops/s")
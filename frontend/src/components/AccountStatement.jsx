@@ -12,7 +12,9 @@ const AccountStatement = () => {
   const [customers, setCustomers] = useState([]);
   const [selectedCustomer, setSelectedCustomer] = useState(null);
   const [sales, setSales] = useState([]);
-  const [payments, setPayments] = useState([]);
+  const [entries, setEntries] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [balance, setBalance] = useState(null);
   const [dateRange, setDateRange] = useState(null);
   const [loading, setLoading] = useState(false);
   const [isPaymentModalVisible, setIsPaymentModalVisible] = useState(false);
@@ -27,7 +29,8 @@ const AccountStatement = () => {
   useEffect(() => {
     if (selectedCustomer) {
       fetchCustomerSales();
-      fetchCustomerPayments();
+      fetchStatement();
+      fetchCustomerBalance();
     }
   }, [selectedCustomer, dateRange]);
 
@@ -63,21 +66,38 @@ const AccountStatement = () => {
     }
   };
 
-  const fetchCustomerPayments = async () => {
+  // Movimientos (ventas y pagos) con saldo acumulado, paginados por cursor
+  const fetchStatement = async (cursor = null) => {
     if (!selectedCustomer) return;
-    
+
     try {
-      const response = await api.get(`/customers/${selectedCustomer}/payments/`);
-      setPayments(response.data);
+      const params = { limit: 100 };
+      // El rango va también con el cursor: el servidor rechaza un cursor
+      // de otro rango
+      if (dateRange) {
+        params.from = dateRange[0].format('YYYY-MM-DD');
+        params.to = dateRange[1].format('YYYY-MM-DD');
+      }
+      if (cursor) {
+        params.cursor = cursor;
+      }
+      const response = await api.get(`/customers/${selectedCustomer}/statement`, { params });
+      setEntries(cursor ? [...entries, ...response.data] : response.data);
+      setNextCursor(response.headers['x-next-cursor'] || null);
     } catch (error) {
-      console.error('Error fetching payments:', error);
+      console.error('Error fetching statement:', error);
     }
   };
 
-  const calculateTotalDebt = () => {
-    const totalSales = sales.reduce((total, sale) => total + sale.total_amount, 0);
-    const totalPayments = payments.reduce((total, payment) => total + payment.amount, 0);
-    return totalSales - totalPayments;
+  const fetchCustomerBalance = async () => {
+    if (!selectedCustomer) return;
+
+    try {
+      const response = await api.get(`/customers/${selectedCustomer}/balance`);
+      setBalance(response.data);
+    } catch (error) {
+      console.error('Error fetching balance:', error);
+    }
   };
 
   const handlePaymentSubmit = async (values) => {
@@ -93,7 +113,8 @@ const AccountStatement = () => {
       setIsPaymentModalVisible(false);
       paymentForm.resetFields();
       fetchCustomerSales();
-      fetchCustomerPayments();
+      fetchStatement();
+      fetchCustomerBalance();
     } catch (error) {
       console.error('Error creating payment:', error);
       message.error('Error al registrar el pago');
@@ -152,23 +173,46 @@ const AccountStatement = () => {
     },
   ];
 
-  const paymentColumns = [
+  const entryColumns = [
     {
       title: 'Fecha',
-      dataIndex: 'payment_date',
-      key: 'payment_date',
-      render: (date) => dayjs(date).format('DD/MM/YYYY HH:mm'),
+      dataIndex: 'entry_date',
+      key: 'entry_date',
+      render: (date) => (date ? dayjs(date).format('DD/MM/YYYY HH:mm') : ''),
     },
     {
-      title: 'Monto',
-      dataIndex: 'amount',
-      key: 'amount',
-      render: (amount) => `$${amount.toFixed(2)}`,
+      title: 'Concepto',
+      key: 'concept',
+      render: (_, record) => {
+        if (record.kind === 'opening') return 'Saldo inicial';
+        if (record.kind === 'sale') {
+          return (
+            <Button type="link" onClick={() => handleViewSale(record.id)} icon={<EyeOutlined />}>
+              Venta #{record.id}
+            </Button>
+          );
+        }
+        const sale = record.sale_id ? ` (venta #${record.sale_id})` : '';
+        return `${record.description || 'Pago'}${sale}`;
+      },
     },
     {
-      title: 'Descripción',
-      dataIndex: 'description',
-      key: 'description',
+      title: 'Debe',
+      dataIndex: 'debit',
+      key: 'debit',
+      render: (amount) => (amount ? `$${amount.toFixed(2)}` : ''),
+    },
+    {
+      title: 'Haber',
+      dataIndex: 'credit',
+      key: 'credit',
+      render: (amount) => (amount ? `$${amount.toFixed(2)}` : ''),
+    },
+    {
+      title: 'Saldo',
+      dataIndex: 'balance',
+      key: 'balance',
+      render: (amount) => `$${amount.toFixed(2)}`,
     },
   ];
 
@@ -220,7 +264,7 @@ const AccountStatement = () => {
                 {customers.find(c => c.id === selectedCustomer)?.name}
               </Descriptions.Item>
               <Descriptions.Item label="Total Deuda">
-                ${calculateTotalDebt().toFixed(2)}
+                ${(balance?.balance ?? 0).toFixed(2)}
               </Descriptions.Item>
               <Descriptions.Item label="Cantidad de Ventas">
                 {sales.length}
@@ -239,13 +283,18 @@ const AccountStatement = () => {
           />
         </Card>
 
-        <Card title="Historial de Pagos">
+        <Card title="Movimientos">
           <Table
-            columns={paymentColumns}
-            dataSource={payments}
-            rowKey="id"
-            pagination={{ pageSize: 10 }}
+            columns={entryColumns}
+            dataSource={entries}
+            rowKey={(record) => `${record.kind}-${record.id}`}
+            pagination={false}
           />
+          {nextCursor && (
+            <Button style={{ marginTop: 16 }} onClick={() => fetchStatement(nextCursor)}>
+              Cargar más
+            </Button>
+          )}
         </Card>
       </Space>
 
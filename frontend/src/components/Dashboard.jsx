@@ -30,7 +30,9 @@ const Dashboard = () => {
   const [monthlyStats, setMonthlyStats] = useState(null);
   const [topProducts, setTopProducts] = useState([]);
   const [lowStockItems, setLowStockItems] = useState([]);
+  const [lowStockCount, setLowStockCount] = useState(0);
   const [topDebtors, setTopDebtors] = useState([]);
+  const [error, setError] = useState(null);
 
   const formatCurrency = (value) => {
     if (value >= 1000000) {
@@ -41,67 +43,29 @@ const Dashboard = () => {
     return `$${value.toFixed(2)}`;
   };
 
-  const fetchStats = async () => {
+  const fetchDashboard = async () => {
     try {
-      const token = localStorage.getItem('token');
-      const headers = {
-        'Authorization': `Bearer ${token}`
-      };
+      // Una sola petición con todos los datos del dashboard
+      const { data } = await api.get('/dashboard');
 
-      // Obtener estadísticas de clientes
-      const customersResponse = await fetch('http://localhost:8000/customers/', { headers });
-      const customers = await customersResponse.json();
-
-      // Obtener estadísticas de productos
-      const itemsResponse = await fetch('http://localhost:8000/items/', { headers });
-      const items = await itemsResponse.json();
-
-      // Obtener estadísticas de ventas
-      const salesResponse = await fetch('http://localhost:8000/sales/', { headers });
-      const sales = await salesResponse.json();
-
-      // Calcular el total de ingresos
-      const totalRevenue = sales.reduce((sum, sale) => sum + sale.total_amount, 0);
-
-      setStats({
-        total_customers: customers.length,
-        total_items: items.length,
-        total_sales: sales.length,
-        total_revenue: totalRevenue
-      });
+      setStats(data.counts);
+      setMonthlyStats(data.monthly);
+      setTopProducts(data.top_products);
+      setLowStockItems(data.low_stock.items);
+      setLowStockCount(data.low_stock.count);
+      setTopDebtors(data.top_debtors);
     } catch (error) {
-      console.error('Error fetching stats:', error);
+      console.error('Error fetching dashboard data:', error);
+      setError('Error al cargar el dashboard');
     } finally {
       setLoading(false);
     }
   };
 
   useEffect(() => {
-    fetchStats();
-  }, []);
-
-  useEffect(() => {
-    fetchData();
+    fetchDashboard();
   }, []);
 
-  const fetchData = async () => {
-    try {
-      const [statsRes, productsRes, lowStockRes, debtorsRes] = await Promise.all([
-        api.get('/stats/monthly'),
-        api.get('/stats/top-products'),
-        api.get('/items/low-stock'),
-        api.get('/stats/top-debtors')
-      ]);
-
-      setMonthlyStats(statsRes.data);
-      setTopProducts(productsRes.data);
-      setLowStockItems(lowStockRes.data);
-      setTopDebtors(debtorsRes.data);
-    } catch (error) {
-      console.error('Error fetching dashboard data:', error);
-    }
-  };
-
   if (loading) {
     return (
       <div style={{ display: 'flex', justifyContent: 'center', alignItems: 'center', height: '100vh' }}>
@@ -215,13 +179,13 @@ const Dashboard = () => {
 
       <Row gutter={[16, 16]} style={{ marginTop: '24px' }}>
         <Col span={24}>
-          <MonthlyStats />
+          <MonthlyStats stats={monthlyStats} error={error} />
         </Col>
       </Row>
 
       <Row gutter={[16, 16]} style={{ marginTop: '24px' }}>
         <Col span={24}>
-          <TopProducts />
+          <TopProducts products={topProducts} error={error} />
         </Col>
       </Row>
 
@@ -250,7 +214,7 @@ const Dashboard = () => {
           <Card>
             <Statistic
               title="Productos con Stock Bajo"
-              value={lowStockItems.length}
+              value={lowStockCount}
               prefix={<WarningOutlined />}
               valueStyle={{ color: '#cf1322' }}
             />
@@ -1,29 +1,9 @@
-import React, { useState, useEffect } from 'react';
+import React from 'react';
 import { Card, Statistic, Spin } from 'antd';
 import { ShoppingCartOutlined, DollarOutlined } from '@ant-design/icons';
-import { api } from '../services/api';
-
-const MonthlyStats = () => {
-  const [stats, setStats] = useState(null);
-  const [loading, setLoading] = useState(true);
-  const [error, setError] = useState(null);
-
-  useEffect(() => {
-    const fetchStats = async () => {
-      try {
-        const response = await api.get('/stats/monthly');
-        setStats(response.data);
-      } catch (err) {
-        console.error('Error fetching monthly stats:', err);
-        setError('Error al cargar estadísticas mensuales');
-      } finally {
-        setLoading(false);
-      }
-    };
-
-    fetchStats();
-  }, []);
 
+// Los datos llegan del Dashboard (/dashboard), que hace una sola petición
+const MonthlyStats = ({ stats, loading = false, error = null }) => {
   const formatCurrency = (value) => {
     if (value >= 1000000) {
       return `$${(value / 1000000).toFixed(1)}M`;
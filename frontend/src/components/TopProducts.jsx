@@ -1,28 +1,8 @@
-import React, { useState, useEffect } from 'react';
+import React from 'react';
 import { Card, Table, Spin } from 'antd';
-import { api } from '../services/api';
-
-const TopProducts = () => {
-  const [products, setProducts] = useState([]);
-  const [loading, setLoading] = useState(true);
-  const [error, setError] = useState(null);
-
-  useEffect(() => {
-    const fetchTopProducts = async () => {
-      try {
-        const response = await api.get('/stats/top-products');
-        setProducts(response.data);
-      } catch (err) {
-        console.error('Error fetching top products:', err);
-        setError('Error al cargar productos más vendidos');
-      } finally {
-        setLoading(false);
-      }
-    };
-
-    fetchTopProducts();
-  }, []);
 
+// Los datos llegan del Dashboard (/dashboard), que hace una sola petición
+const TopProducts = ({ products = [], loading = false, error = null }) => {
   const columns = [
     {
       title: 'Producto',
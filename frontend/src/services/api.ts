@@ -192,6 +192,13 @@ export const createStockUpdate = async (stockUpdate: { item_id: number; quantity
     return response.data;
 };
 
+export const createStockUpdatesBulk = async (
+    updates: { item_id: number; quantity: number }[]
+): Promise<{ id: number; name: string; stock: number; low_stock: boolean }[]> => {
+    const response = await api.post('/stock-updates/bulk', { updates });
+    return response.data;
+};
+
 export const getItems = async (): Promise<Item[]> => {
     console.log('Fetching items from API...');
     try {